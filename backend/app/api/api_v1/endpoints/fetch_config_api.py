@@ -3,7 +3,7 @@
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -182,9 +182,9 @@ async def manual_fetch_rss(
             )
             )
         
-        # 2. 获取用户订阅列表
-        subscriptions = subscription_service.get_user_subscriptions(user_id)
-        total_count = len(subscriptions.subscriptions)
+        # 2. 获取用户全部活跃订阅（只取拉取需要的ID和URL）
+        subscriptions = list(subscription_service.iter_active_feed_subscriptions(user_id))
+        total_count = len(subscriptions)
         
         if total_count == 0:
             return ManualFetchResponse(
@@ -194,7 +194,7 @@ async def manual_fetch_rss(
             )
         
         # 3. 执行统一的RSS拉取流程
-        result = await _perform_unified_fetch(user_id, subscriptions.subscriptions)
+        result = await _perform_unified_fetch(user_id, subscriptions)
         
         # 4. 记录拉取结果
         limit_service.record_fetch_result(
@@ -231,7 +231,7 @@ async def manual_fetch_rss(
         raise HTTPException(status_code=500, detail=f"手动拉取失败: {str(e)}")
 
 # 统一的拉取执行函数
-async def _perform_unified_fetch(user_id: int, subscriptions: list) -> Dict[str, Any]:
+async def _perform_unified_fetch(user_id: int, subscriptions: List[Tuple[int, str]]) -> Dict[str, Any]:
     """
     执行统一的RSS拉取流程
     使用RSSContentService进行完整的拉取→解析→存储流程
@@ -248,46 +248,24 @@ async def _perform_unified_fetch(user_id: int, subscriptions: list) -> Dict[str,
         
         logger.info(f"开始批量拉取RSS内容: {total_count}个订阅源, user_id={user_id}")
         
-        for i, subscription in enumerate(subscriptions, 1):
-            try:
-                logger.info(f"处理订阅 {i}/{total_count}: {subscription.custom_name or subscription.rss_url}")
-                
-                # 检查订阅源是否处于活跃状态
-                if not subscription.is_active:
-                    logger.info(f"⏸️ 跳过非活跃订阅源: {subscription.custom_name or subscription.rss_url}")
-                    failed_subscriptions.append({
-                        'subscription_id': subscription.id,
-                        'name': subscription.custom_name or subscription.rss_url,
-                        'error': '订阅源已禁用'
-                    })
-                    continue
-                
-                # 使用RSSContentService进行完整的拉取→解析→存储流程
-                result = await rss_content_service.fetch_and_store_rss_content(
-                    subscription_id=subscription.id,
-                    rss_url=subscription.rss_url,
-                    user_id=user_id
-                )
-                
-                if result.get('success', False):
-                    success_count += 1
-                    processed_contents.extend(result.get('processed_items', []))
-                    logger.info(f"✅ 订阅拉取成功: {subscription.custom_name or subscription.rss_url}")
-                else:
-                    failed_subscriptions.append({
-                        'subscription_id': subscription.id,
-                        'name': subscription.custom_name or subscription.rss_url,
-                        'error': result.get('error', '未知错误')
-                    })
-                    logger.warning(f"❌ 订阅拉取失败: {subscription.custom_name or subscription.rss_url}, 错误: {result.get('error')}")
-                
-            except Exception as e:
+        # 使用RSSContentService并发执行拉取→解析→存储流程（调用方只传入活跃订阅）
+        results = await rss_content_service.fetch_and_store_many(
+            subscriptions=subscriptions,
+            user_id=user_id
+        )
+        
+        for (subscription_id, rss_url), result in zip(subscriptions, results):
+            if result.get('success', False):
+                success_count += 1
+                processed_contents.extend(result.get('processed_items', []))
+                logger.info(f"✅ 订阅拉取成功: {rss_url} ({result.get('elapsed')}s)")
+            else:
                 failed_subscriptions.append({
-                    'subscription_id': subscription.id,
-                    'name': subscription.custom_name or subscription.rss_url,
-                    'error': str(e)
+                    'subscription_id': subscription_id,
+                    'name': rss_url,
+                    'error': result.get('error', '未知错误')
                 })
-                logger.error(f"❌ 订阅处理异常: {subscription.custom_name or subscription.rss_url}, 异常: {str(e)}")
+                logger.warning(f"❌ 订阅拉取失败: {rss_url}, 错误: {result.get('error')}")
         
         logger.info(f"批量拉取完成: 成功 {success_count}/{total_count}")
         
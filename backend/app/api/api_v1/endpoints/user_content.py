@@ -12,7 +12,10 @@ from fastapi import APIRouter, HTTPException, status, Query, Path
 from pydantic import BaseModel
 from loguru import logger
 
+from app.core.async_database import async_db
+from app.core.pagination import CursorKey, encode_cursor, decode_cursor
 from app.services.tag_cache_service import tag_cache_service
+from app.services.content_tag_index_service import TagKind
 
 router = APIRouter()
 
@@ -54,10 +57,11 @@ class TagItem(BaseModel):
 class ContentListData(BaseModel):
     """内容列表数据模型"""
     items: List[ContentItem]
-    total: int
+    total: Optional[int] = None  # 游标翻页时不统计总数
     page: int
     limit: int
     has_next: bool
+    next_cursor: Optional[str] = None
 
 
 class UserContentResponse(BaseModel):
@@ -74,100 +78,22 @@ class UserContentService:
     def __init__(self, db_path: str = "data/rss_subscriber.db"):
         self.db_path = db_path
     
-    def get_user_content_list(
+    async def get_user_content_list(
         self, 
         user_id: int, 
         tag: Optional[str] = None, 
         page: int = 1, 
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None
     ) -> UserContentResponse:
-        """获取用户内容列表"""
+        """获取用户内容列表（查询在数据库线程池中执行，不阻塞事件循环）"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # 1. 获取用户的推荐标签（使用缓存服务）
-                cached_tags = tag_cache_service.get_user_tags_with_cache(user_id)
-                filter_tags = [TagItem(name=tag["name"], count=tag["count"]) for tag in cached_tags]
-                
-                # 2. 构建内容查询SQL（使用新的shared_contents架构）
-                base_query = """
-                    SELECT 
-                        c.id, r.subscription_id, c.title, c.original_link,
-                        c.description, c.published_at, c.created_at,
-                        r.is_favorited, c.tags, c.platform, c.feed_title,
-                        c.author, c.cover_image, c.content_type, c.summary,
-                        r.is_read, r.read_at, r.personal_tags
-                    FROM shared_contents c
-                    JOIN user_content_relations r ON c.id = r.content_id
-                    JOIN user_subscriptions us ON r.subscription_id = us.id
-                    WHERE r.user_id = ? AND r.expires_at > datetime('now')
-                """
-                
-                params = [user_id]
-                
-                # 添加标签筛选
-                if tag and tag != "全部":
-                    base_query += " AND json_extract(c.tags, '$') LIKE ?"
-                    params.append(f'%"{tag}"%')
-                
-                # 3. 获取总数
-                count_query = f"SELECT COUNT(*) FROM ({base_query})"
-                cursor.execute(count_query, params)
-                total = cursor.fetchone()[0]
-                
-                # 4. 添加排序和分页
-                content_query = base_query + " ORDER BY c.published_at DESC LIMIT ? OFFSET ?"
-                offset = (page - 1) * limit
-                params.extend([limit, offset])
-                
-                cursor.execute(content_query, params)
-                rows = cursor.fetchall()
-                
-                # 5. 处理内容数据（适配新架构字段）
-                content_items = []
-                for row in rows:
-                    # 获取媒体项（使用shared_content_media_items表）
-                    media_items = self._get_content_media_items(cursor, row[0])
-                    
-                    # 解析标签
-                    tags = json.loads(row[8]) if row[8] else []
-                    
-                    content_item = ContentItem(
-                        content_id=row[0],         # c.id
-                        subscription_id=row[1],    # r.subscription_id  
-                        title=row[2],              # c.title
-                        link=row[3],               # c.original_link
-                        description=row[4],        # c.description
-                        published_at=row[5],       # c.published_at
-                        fetched_at=row[6],         # c.created_at
-                        is_favorited=bool(row[7]), # r.is_favorited
-                        tags=tags,                 # c.tags (row[8])
-                        platform=row[9],           # c.platform
-                        source_name=row[10],       # c.feed_title
-                        author=row[11],            # c.author
-                        cover_image=row[12],       # c.cover_image
-                        content_type=row[13],      # c.content_type
-                        summary=row[14],           # c.summary
-                        media_items=media_items    # 关联查询结果
-                    )
-                    content_items.append(content_item)
-                
-                # 6. 构建响应
-                content_data = ContentListData(
-                    items=content_items,
-                    total=total,
-                    page=page,
-                    limit=limit,
-                    has_next=offset + len(content_items) < total
-                )
-                
-                return UserContentResponse(
-                    content=content_data,
-                    filter_tags=filter_tags,
-                    tags_updated_at=datetime.now().isoformat(),
-                    content_updated_at=datetime.now().isoformat()
-                )
+            cursor_key = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        try:
+            return await async_db.run(self._query_user_content_list, user_id, tag, page, limit, cursor_key)
                 
         except Exception as e:
             logger.error(f"获取用户内容列表失败: {e}")
@@ -176,31 +102,140 @@ class UserContentService:
                 detail=f"获取用户内容列表失败: {str(e)}"
             )
     
+    def _query_user_content_list(
+        self, 
+        conn: sqlite3.Connection, 
+        user_id: int, 
+        tag: Optional[str], 
+        page: int, 
+        limit: int,
+        cursor_key: Optional[CursorKey] = None
+    ) -> UserContentResponse:
+        """获取用户内容列表（同步查询，传入cursor_key时使用键集分页）"""
+        cursor = conn.cursor()
+        
+        # 1. 获取用户的推荐标签（使用缓存服务）
+        cached_tags = tag_cache_service.get_user_tags_with_cache(user_id)
+        filter_tags = [TagItem(name=tag["name"], count=tag["count"]) for tag in cached_tags]
+        
+        # 2. 构建内容查询SQL（使用新的shared_contents架构）
+        base_query = """
+            SELECT 
+                c.id, r.subscription_id, c.title, c.original_link,
+                c.description, c.published_at, c.created_at,
+                r.is_favorited, c.tags, c.platform, c.feed_title,
+                c.author, c.cover_image, c.content_type, c.summary,
+                r.is_read, r.read_at, r.personal_tags, r.published_at
+            FROM user_content_relations r
+            JOIN shared_contents c ON c.id = r.content_id
+            JOIN user_subscriptions us ON r.subscription_id = us.id
+            WHERE r.user_id = ? AND r.expires_at > datetime('now')
+        """
+        
+        params = [user_id]
+        
+        # 添加标签筛选（标签倒排索引上的点查）
+        if tag and tag != "全部":
+            base_query += """
+                AND EXISTS (
+                    SELECT 1 FROM content_tags ct
+                    WHERE ct.content_id = r.content_id
+                      AND ct.kind = ?
+                      AND ct.tag_id = (SELECT id FROM tag_dictionary WHERE name = ?)
+                )
+            """
+            params.extend([TagKind.TAG, tag.strip()])
+        
+        # 3. 页码分页时获取总数；游标分页不统计，避免每页都扫描全部内容
+        total = None
+        offset = 0
+        if cursor_key:
+            base_query += " AND (r.published_at, r.content_id, r.subscription_id) < (?, ?, ?)"
+            params.extend(cursor_key)
+        else:
+            count_query = f"SELECT COUNT(*) FROM ({base_query})"
+            cursor.execute(count_query, params)
+            total = cursor.fetchone()[0]
+            offset = (page - 1) * limit
+        
+        # 4. 按索引顺序排序，多取一条判断是否还有下一页
+        content_query = base_query + (
+            " ORDER BY r.published_at DESC, r.content_id DESC, r.subscription_id DESC LIMIT ? OFFSET ?"
+        )
+        params.extend([limit + 1, offset])
+        
+        cursor.execute(content_query, params)
+        rows = cursor.fetchall()
+        
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][18], rows[-1][0], rows[-1][1]) if has_next else None
+        
+        # 5. 整页媒体项一次查询加载（使用shared_content_media_items表）
+        media_by_content = self._get_media_items_by_content(cursor, [row[0] for row in rows])
+        
+        # 6. 处理内容数据（适配新架构字段）
+        content_items = []
+        for row in rows:
+            # 解析标签
+            tags = json.loads(row[8]) if row[8] else []
+            
+            content_item = ContentItem(
+                content_id=row[0],         # c.id
+                subscription_id=row[1],    # r.subscription_id  
+                title=row[2],              # c.title
+                link=row[3],               # c.original_link
+                description=row[4],        # c.description
+                published_at=row[5],       # c.published_at
+                fetched_at=row[6],         # c.created_at
+                is_favorited=bool(row[7]), # r.is_favorited
+                tags=tags,                 # c.tags (row[8])
+                platform=row[9],           # c.platform
+                source_name=row[10],       # c.feed_title
+                author=row[11],            # c.author
+                cover_image=row[12],       # c.cover_image
+                content_type=row[13],      # c.content_type
+                summary=row[14],           # c.summary
+                media_items=media_by_content.get(row[0], [])  # 整页批量查询结果
+            )
+            content_items.append(content_item)
+        
+        # 7. 构建响应
+        content_data = ContentListData(
+            items=content_items,
+            total=total,
+            page=page,
+            limit=limit,
+            has_next=has_next,
+            next_cursor=next_cursor
+        )
+        
+        return UserContentResponse(
+            content=content_data,
+            filter_tags=filter_tags,
+            tags_updated_at=datetime.now().isoformat(),
+            content_updated_at=datetime.now().isoformat()
+        )
+    
     def _get_user_recommended_tags(self, cursor: sqlite3.Cursor, user_id: int) -> List[TagItem]:
         """获取用户推荐标签（基于用户订阅内容统计）"""
         try:
-            # 查询用户所有内容的标签统计（使用新架构）
+            # 查询用户所有内容的标签统计（基于标签倒排索引）
             query = """
                 SELECT 
-                    tag_value,
+                    d.name as tag_value,
                     COUNT(*) as tag_count
-                FROM (
-                    SELECT json_each.value as tag_value
-                    FROM shared_contents c
-                    JOIN user_content_relations r ON c.id = r.content_id
-                    JOIN json_each(c.tags) 
-                    WHERE r.user_id = ? 
-                    AND r.expires_at > datetime('now')
-                    AND c.tags IS NOT NULL 
-                    AND c.tags != 'null'
-                    AND c.tags != '[]'
-                )
-                GROUP BY tag_value
+                FROM user_content_relations r
+                JOIN content_tags ct ON ct.content_id = r.content_id AND ct.kind = ?
+                JOIN tag_dictionary d ON d.id = ct.tag_id
+                WHERE r.user_id = ? 
+                AND r.expires_at > datetime('now')
+                GROUP BY d.name
                 ORDER BY tag_count DESC
                 LIMIT 10
             """
             
-            cursor.execute(query, (user_id,))
+            cursor.execute(query, (TagKind.TAG, user_id))
             rows = cursor.fetchall()
             
             tags = []
@@ -214,33 +249,38 @@ class UserContentService:
             logger.warning(f"获取用户推荐标签失败: {e}")
             return []
     
-    def _get_content_media_items(self, cursor: sqlite3.Cursor, content_id: int) -> List[MediaItem]:
-        """获取内容的媒体项（使用新架构的shared_content_media_items表）"""
+    def _get_media_items_by_content(
+        self, 
+        cursor: sqlite3.Cursor, 
+        content_ids: List[int]
+    ) -> Dict[int, List[MediaItem]]:
+        """一次IN查询获取一页内容的媒体项，按content_id分组（使用新架构的shared_content_media_items表）"""
+        media_by_content: Dict[int, List[MediaItem]] = {}
+        if not content_ids:
+            return media_by_content
+        
         try:
-            cursor.execute("""
-                SELECT url, media_type, description, duration
+            placeholders = ','.join('?' * len(content_ids))
+            cursor.execute(f"""
+                SELECT content_id, url, media_type, description, duration
                 FROM shared_content_media_items
-                WHERE content_id = ?
-                ORDER BY sort_order
-            """, (content_id,))
-            
-            rows = cursor.fetchall()
-            media_items = []
+                WHERE content_id IN ({placeholders})
+                ORDER BY content_id, sort_order
+            """, content_ids)
             
-            for row in rows:
-                media_item = MediaItem(
-                    url=row[0],
-                    type=row[1],
-                    description=row[2],
-                    duration=row[3]
-                )
-                media_items.append(media_item)
+            for row in cursor.fetchall():
+                media_by_content.setdefault(row[0], []).append(MediaItem(
+                    url=row[1],
+                    type=row[2],
+                    description=row[3],
+                    duration=row[4]
+                ))
             
-            return media_items
+            return media_by_content
             
         except Exception as e:
             logger.warning(f"获取媒体项失败: {e}")
-            return []
+            return {}
 
 
 # 创建服务实例
@@ -252,14 +292,15 @@ async def get_user_content(
     user_id: int = Path(..., description="用户ID"),
     tag: Optional[str] = Query(None, description="标签筛选"),
     page: int = Query(1, ge=1, description="页码"),
-    limit: int = Query(20, ge=1, le=100, description="每页数量")
+    limit: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标，取上一页返回的next_cursor")
 ) -> UserContentResponse:
     """
     获取用户内容列表，支持分页和标签筛选
     
     功能特性：
     - 用户维度的内容查询（基于用户订阅）
-    - 分页支持
+    - 分页支持（页码分页，或传入cursor做游标分页，深度翻页不变慢）
     - 标签筛选（单选模式）
     - 推荐标签（基于用户内容统计）
     - 实时内容更新
@@ -267,11 +308,12 @@ async def get_user_content(
     try:
         logger.info(f"获取用户{user_id}内容列表: tag={tag}, page={page}, limit={limit}")
         
-        result = user_content_service.get_user_content_list(
+        result = await user_content_service.get_user_content_list(
             user_id=user_id,
             tag=tag,
             page=page,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         
         logger.info(f"返回内容: {len(result.content.items)}条, 总计: {result.content.total}")
@@ -300,10 +342,10 @@ async def get_user_tags(
     try:
         logger.info(f"获取用户{user_id}推荐标签")
         
-        with sqlite3.connect(user_content_service.db_path) as conn:
-            cursor = conn.cursor()
-            tags = user_content_service._get_user_recommended_tags(cursor, user_id)
-            
+        tags = await async_db.run(
+            lambda conn: user_content_service._get_user_recommended_tags(conn.cursor(), user_id)
+        )
+        
         return tags[:limit]
         
     except Exception as e:
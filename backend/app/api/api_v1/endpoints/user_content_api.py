@@ -51,6 +51,7 @@ class ContentListResponse(BaseModel):
     total: int
     has_more: bool
     filters_applied: Dict[str, Any]
+    next_cursor: Optional[str] = None
 
 
 class ContentStatsResponse(BaseModel):
@@ -126,12 +127,16 @@ async def get_user_contents(
     is_favorited: Optional[bool] = Query(None, description="收藏状态筛选"),
     content_type: Optional[str] = Query(None, description="内容类型筛选"),
     limit: int = Query(20, ge=1, le=100, description="每页数量"),
-    offset: int = Query(0, ge=0, description="偏移量"),
+    offset: int = Query(0, ge=0, description="偏移量（兼容旧版，建议使用cursor）"),
+    cursor: Optional[str] = Query(None, description="分页游标，取上一页返回的next_cursor"),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取用户内容列表
     
+    分页：第一页不传cursor，之后每页传入上一页返回的next_cursor，
+    游标分页的耗时与翻页深度无关
+    
     支持多种筛选条件：
     - platform: 平台筛选（bilibili, weibo, github等）
     - subscription_id: 订阅源筛选
@@ -152,27 +157,33 @@ async def get_user_contents(
             'is_favorited': is_favorited,
             'content_type': content_type,
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'cursor': cursor
         }
         
         # 移除None值
         filters = {k: v for k, v in filters.items() if v is not None}
         
         # 获取用户内容
-        contents = await shared_content_service.get_user_contents(user_id, **filters)
+        try:
+            page = await shared_content_service.get_user_contents_page(user_id, **filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # 计算是否还有更多内容
-        has_more = len(contents) == limit
+        contents = page['contents']
         
         logger.info(f"获取用户内容列表: user_id={user_id}, 返回{len(contents)}条")
         
         return ContentListResponse(
             contents=contents,
             total=len(contents),  # 注意：这里是当前页的数量，不是总数
-            has_more=has_more,
-            filters_applied=filters
+            has_more=page['has_more'],
+            filters_applied=filters,
+            next_cursor=page['next_cursor']
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取用户内容列表失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取内容列表失败: {str(e)}")
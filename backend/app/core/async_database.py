@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+异步数据库访问层
+为FastAPI异步接口提供非阻塞的SQLite访问：
+- 专用线程池执行所有数据库调用，事件循环不再被同步查询阻塞
+- 每个工作线程持有自己的连接（由线程池独占，不与DatabaseConnectionManager共享）
+- 一次run_in_transaction调用完整地在一个线程、一个连接上执行，协程之间的事务互相隔离
+"""
+
+import asyncio
+import functools
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class AsyncDatabase:
+    """
+    异步数据库访问层
+
+    Usage:
+        rows = await async_db.fetch_all("SELECT * FROM users WHERE id = ?", (user_id,))
+
+        def _work(conn):
+            conn.execute("UPDATE ...")
+            return conn.execute("SELECT ...").fetchall()
+        result = await async_db.run_in_transaction(_work)
+    """
+
+    def __init__(self, db_path: str = "data/rss_subscriber.db", max_workers: int = 4):
+        """
+        初始化异步数据库访问层
+
+        Args:
+            db_path: 数据库路径
+            max_workers: 线程池大小（即连接数上限）
+        """
+        self.db_path = Path(db_path).resolve()
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """延迟创建线程池（关闭后可重新创建）"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="async-db"
+                    )
+        return self._executor
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前工作线程独占的连接"""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA cache_size = 10000")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            conn.row_factory = sqlite3.Row
+            self._local.connection = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+            logger.debug(f"📊 异步数据库层创建连接: {threading.current_thread().name}")
+        return conn
+
+    def _call(self, fn: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        """在工作线程中执行（自动提交模式）"""
+        return fn(self._get_connection(), *args, **kwargs)
+
+    def _call_in_transaction(self, fn: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        """在工作线程中以事务执行"""
+        conn = self._get_connection()
+        conn.execute("BEGIN")
+        try:
+            result = fn(conn, *args, **kwargs)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在数据库线程池中执行fn(conn, *args, **kwargs)
+
+        Args:
+            fn: 接收连接作为第一个参数的同步函数
+
+        Returns:
+            fn的返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(self._call, fn, args, kwargs)
+        )
+
+    async def run_in_transaction(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在数据库线程池中以单个事务执行fn(conn, *args, **kwargs)，异常时回滚
+
+        Args:
+            fn: 接收连接作为第一个参数的同步函数
+
+        Returns:
+            fn的返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(self._call_in_transaction, fn, args, kwargs)
+        )
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        """执行查询并返回全部结果"""
+        return await self.run(lambda conn: conn.execute(query, params).fetchall())
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        """执行查询并返回第一行"""
+        return await self.run(lambda conn: conn.execute(query, params).fetchone())
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        """在事务中执行单条写语句，返回受影响行数"""
+        return await self.run_in_transaction(lambda conn: conn.execute(query, params).rowcount)
+
+    def close(self):
+        """关闭线程池和所有连接"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            closed = len(self._connections)
+            self._connections.clear()
+        # 线程池已重建，旧线程的本地连接随线程一起失效
+        self._local = threading.local()
+        logger.info(f"🔒 异步数据库层已关闭: {closed}个连接")
+
+
+# 全局异步数据库实例
+async_db = AsyncDatabase()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+游标分页工具
+内容列表按 (published_at, content_id, subscription_id) 倒序做键集分页，
+游标是上一页最后一条记录排序键的不透明编码，翻页代价与深度无关
+"""
+
+import base64
+import json
+from typing import Any, Optional, Tuple
+
+# 游标对应的排序键：(published_at, content_id, subscription_id)
+CursorKey = Tuple[str, int, int]
+
+
+def encode_cursor(published_at: Any, content_id: int, subscription_id: int) -> str:
+    """
+    把排序键编码为不透明游标
+
+    Args:
+        published_at: 发布时间（数据库中的原始值）
+        content_id: 内容ID
+        subscription_id: 订阅ID（同一内容出现在多个订阅时用于区分）
+
+    Returns:
+        str: URL安全的游标字符串
+    """
+    payload = json.dumps([str(published_at), int(content_id), int(subscription_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[CursorKey]:
+    """
+    解析游标
+
+    Args:
+        cursor: encode_cursor生成的游标，为空表示第一页
+
+    Returns:
+        Optional[CursorKey]: 排序键，cursor为空时返回None
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published_at, content_id, subscription_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(published_at), int(content_id), int(subscription_id)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+SQLite单写者分组提交队列
+所有高频写操作提交到同一个写线程，由写线程按"条数上限 + 延迟上限"分组，
+一组写操作在一个事务中提交：
+- 同一时刻只有一个写者，消除WAL写锁竞争导致的 database is locked 等待
+- 每个写操作包在独立的SAVEPOINT中，单个操作失败只回滚自身，不影响同组其他操作
+- 调用方拿到Future，组提交成功后才得到结果
+"""
+
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+@dataclass
+class WriteOperation:
+    """一个待执行的写操作"""
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    future: Future = field(default_factory=Future)
+
+
+class WriteQueue:
+    """
+    单写者分组提交队列
+
+    Usage:
+        def _insert(conn, user_id):
+            return conn.execute("INSERT ...", (user_id,)).lastrowid
+
+        relation_id = await write_queue.run(_insert, user_id)      # 异步代码
+        relation_id = write_queue.run_sync(_insert, user_id)       # 同步代码
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/rss_subscriber.db",
+        max_batch_size: int = 64,
+        max_latency_ms: float = 20.0
+    ):
+        """
+        初始化写队列
+
+        Args:
+            db_path: 数据库路径
+            max_batch_size: 每组最多合并的写操作数
+            max_latency_ms: 组内第一个操作最多等待多久再提交（毫秒）
+        """
+        self.db_path = Path(db_path).resolve()
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+
+        self._queue: "queue.Queue[Optional[WriteOperation]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {
+            'operations': 0,
+            'failed_operations': 0,
+            'commits': 0,
+            'failed_commits': 0,
+            'max_group_size': 0
+        }
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动写线程（首次提交时也会自动启动）"""
+        with self._thread_lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._writer_loop, name="sqlite-writer", daemon=True)
+            self._thread.start()
+        logger.info(f"✍️ SQLite写队列已启动: 组上限={self.max_batch_size}, 延迟上限={self.max_latency * 1000:.0f}ms")
+
+    def stop(self, timeout: float = 30):
+        """停止写线程（先提交已入队的操作）"""
+        with self._thread_lock:
+            if not self.running:
+                return
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        logger.info("🛑 SQLite写队列已停止")
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """
+        提交写操作fn(conn, *args, **kwargs)
+
+        Returns:
+            Future: 所在分组提交成功后完成
+        """
+        op = WriteOperation(fn, args, kwargs)
+
+        # 写操作内部再次提交时直接在当前事务中执行，避免写线程等待自己
+        if threading.current_thread() is self._thread:
+            try:
+                op.future.set_result(fn(self._conn, *args, **kwargs))
+            except Exception as e:
+                op.future.set_exception(e)
+            return op.future
+
+        if not self.running:
+            self.start()
+        self._queue.put(op)
+        return op.future
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """提交写操作并异步等待结果"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """提交写操作并阻塞等待结果"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建写线程独占的连接"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30.0, isolation_level=None)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA cache_size = 10000")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _collect_group(self, first: WriteOperation) -> List[Optional[WriteOperation]]:
+        """从第一个操作开始，在延迟上限内收集一组操作"""
+        group: List[Optional[WriteOperation]] = [first]
+        deadline = time.monotonic() + self.max_latency
+
+        while len(group) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                op = self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            group.append(op)
+            if op is None:
+                break
+
+        return group
+
+    def _writer_loop(self):
+        """写线程主循环"""
+        self._conn = self._connect()
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    break
+
+                group = self._collect_group(first)
+                stopping = group[-1] is None
+                self._commit_group([op for op in group if op is not None])
+                if stopping:
+                    break
+
+            # 停止前提交剩余操作
+            while True:
+                try:
+                    op = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if op is not None:
+                    self._commit_group([op])
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def _commit_group(self, group: List[WriteOperation]):
+        """在一个事务中执行一组写操作，每个操作使用独立的SAVEPOINT"""
+        conn = self._conn
+        outcomes: List[tuple] = []
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            logger.error(f"❌ 写队列开启事务失败: {e}")
+            self._stats['failed_commits'] += 1
+            for op in group:
+                op.future.set_exception(e)
+            return
+
+        for op in group:
+            conn.execute("SAVEPOINT write_op")
+            try:
+                result = op.fn(conn, *op.args, **op.kwargs)
+                conn.execute("RELEASE write_op")
+                outcomes.append((op, result, None))
+            except Exception as e:
+                conn.execute("ROLLBACK TO write_op")
+                conn.execute("RELEASE write_op")
+                outcomes.append((op, None, e))
+
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"❌ 写队列提交失败，整组回滚: {len(group)}个操作 | {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            self._stats['failed_commits'] += 1
+            for op in group:
+                op.future.set_exception(e)
+            return
+
+        self._stats['commits'] += 1
+        self._stats['operations'] += len(group)
+        self._stats['max_group_size'] = max(self._stats['max_group_size'], len(group))
+
+        for op, result, error in outcomes:
+            if error is not None:
+                self._stats['failed_operations'] += 1
+                op.future.set_exception(error)
+            else:
+                op.future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写队列统计信息"""
+        commits = self._stats['commits']
+        return {
+            'running': self.running,
+            'pending': self._queue.qsize(),
+            **self._stats,
+            'avg_group_size': round(self._stats['operations'] / commits, 2) if commits else 0
+        }
+
+
+# 全局写队列实例
+write_queue = WriteQueue()
@@ -58,6 +58,9 @@ CREATE TABLE IF NOT EXISTS user_content_relations (
     expires_at TIMESTAMP NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
+    -- 列表排序冗余字段（同shared_contents.published_at，供键集分页）
+    published_at TIMESTAMP,
+    
     -- 约束
     UNIQUE(user_id, content_id, subscription_id),
     FOREIGN KEY(user_id) REFERENCES users(user_id),
@@ -95,26 +98,22 @@ CREATE INDEX IF NOT EXISTS idx_relations_subscription ON user_content_relations(
 CREATE INDEX IF NOT EXISTS idx_relations_content ON user_content_relations(content_id);
 CREATE INDEX IF NOT EXISTS idx_relations_user_read ON user_content_relations(user_id, is_read);
 CREATE INDEX IF NOT EXISTS idx_relations_user_fav ON user_content_relations(user_id, is_favorited);
+CREATE INDEX IF NOT EXISTS idx_relations_user_feed ON user_content_relations(user_id, published_at, content_id, subscription_id, expires_at);  -- 内容列表键集分页
 
 -- 媒体项表索引
 CREATE INDEX IF NOT EXISTS idx_shared_media_content_id ON shared_content_media_items(content_id);
 CREATE INDEX IF NOT EXISTS idx_shared_media_type ON shared_content_media_items(media_type);
 
--- 5. 自动清理触发器（基于用户关系过期时间）
-CREATE TRIGGER IF NOT EXISTS cleanup_expired_relations
+-- 5. 过期清理由后台清理器（ExpiryReaper）分块执行，不再使用插入时全表清理的触发器
+
+-- 冗余排序字段兜底：未显式写入published_at的关系由触发器补齐
+CREATE TRIGGER IF NOT EXISTS fill_relation_published_at
 AFTER INSERT ON user_content_relations
+WHEN NEW.published_at IS NULL
 BEGIN
-    -- 清理过期的用户关系
-    DELETE FROM user_content_relations 
-    WHERE expires_at < datetime('now');
-    
-    -- 清理没有用户关系的孤立内容
-    DELETE FROM shared_contents 
-    WHERE id NOT IN (
-        SELECT DISTINCT content_id 
-        FROM user_content_relations 
-        WHERE expires_at > datetime('now')
-    );
+    UPDATE user_content_relations
+    SET published_at = (SELECT published_at FROM shared_contents WHERE id = NEW.content_id)
+    WHERE id = NEW.id;
 END;
 
 -- 6. 用户友好的查询视图（适配字段分离）
@@ -3,7 +3,7 @@ RSS智能订阅器后端服务主应用
 基于FastAPI的RSS聚合和智能订阅平台
 """
 
-from typing import Dict, Any, Union
+from typing import Dict, Any
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,7 +11,12 @@ from loguru import logger
 
 from app.api.api_v1.api import api_router
 from app.core.config import settings
+from app.core.async_database import async_db
+from app.core.write_queue import write_queue
 from app.services.auto_fetch_scheduler import AutoFetchScheduler
+from app.services.ai_job_worker import ai_job_worker_pool
+from app.services.expiry_reaper import expiry_reaper
+from app.services.feed_health_service import feed_health_service
 # 导入标签调度器
 from app.scheduler.tag_scheduler import tag_scheduler
 
@@ -56,12 +61,22 @@ async def startup_event() -> None:
     logger.info(f"🌐 环境: {settings.ENVIRONMENT}")
     logger.info(f"🔗 API前缀: {settings.API_V1_STR}")
     
+    # 启动SQLite单写者队列（拉取入库和AI结果写入都经由它分组提交）
+    write_queue.start()
+    
     # 启动RSS拉取调度器（使用功能完整的AutoFetchScheduler）
     global scheduler
     scheduler = AutoFetchScheduler()
     scheduler.start()
     logger.info("✅ RSS自动拉取调度器已启动")
     
+    # 启动AI预处理工作池（消费ai_processing_jobs队列）
+    ai_job_worker_pool.start()
+    logger.info("✅ AI预处理工作池已启动")
+    
+    # 启动过期内容后台清理器（分块删除过期关系和孤立内容）
+    expiry_reaper.start()
+    
     # 标签调度器已在导入时自动启动
     logger.info("✅ 标签缓存调度器已启动")
 
@@ -75,9 +90,21 @@ async def shutdown_event() -> None:
         scheduler.stop()
         logger.info("✅ RSS自动拉取调度器已停止")
     
+    ai_job_worker_pool.stop()
+    logger.info("✅ AI预处理工作池已停止")
+    
+    expiry_reaper.stop()
+    logger.info("✅ 过期内容清理器已停止")
+    
     # 关闭标签调度器
     tag_scheduler.shutdown()
     logger.info("✅ 标签缓存调度器已停止")
+    
+    # 提交剩余写操作后关闭写队列
+    write_queue.stop()
+    
+    # 关闭异步数据库访问层
+    async_db.close()
 
 
 @app.get("/")
@@ -92,14 +119,18 @@ async def root() -> Dict[str, str]:
 
 
 @app.get("/health")
-async def health_check() -> Dict[str, Union[str, bool]]:
+async def health_check() -> Dict[str, Any]:
     """健康检查接口"""
     return {
         "status": "healthy",
         "version": settings.PROJECT_VERSION,
         "service": "rss-smart-subscriber",
         "scheduler_running": scheduler.scheduler.running if scheduler else False,
-        "tag_scheduler_running": tag_scheduler.scheduler.running if tag_scheduler else False
+        "fetch_dispatch": scheduler.get_dispatch_stats() if scheduler else None,
+        "feed_health": feed_health_service.get_stats(),
+        "tag_scheduler_running": tag_scheduler.scheduler.running if tag_scheduler else False,
+        "ai_worker_running": ai_job_worker_pool.running,
+        "expiry_reaper_running": expiry_reaper.running
     }
 
 
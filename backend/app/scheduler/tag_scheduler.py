@@ -30,7 +30,7 @@ class TagScheduler:
     def _setup_jobs(self):
         """设置定时任务"""
         
-        # 任务1: 每10分钟检查并更新需要刷新的用户标签缓存
+        # 任务1: 每10分钟刷新被标记为脏的用户标签缓存（没有数据变化时只有一次空表查询）
         self.scheduler.add_job(
             func=self._update_user_tags_job,
             trigger=IntervalTrigger(minutes=10),
@@ -48,12 +48,12 @@ class TagScheduler:
             replace_existing=True
         )
         
-        # 任务3: 每小时强制更新活跃用户标签（确保数据新鲜度）
+        # 任务3: 每小时滚动标签计数时间桶（计数由写入路径增量维护，这里只处理跨过7天/30天边界的部分）
         self.scheduler.add_job(
-            func=self._force_update_active_users_job,
+            func=self._rollover_tag_buckets_job,
             trigger=IntervalTrigger(hours=1),
-            id='force_update_active_users',
-            name='强制更新活跃用户标签',
+            id='rollover_tag_buckets',
+            name='滚动标签计数时间桶',
             replace_existing=True
         )
         
@@ -64,7 +64,7 @@ class TagScheduler:
         try:
             logger.info("开始执行用户标签缓存更新任务")
             
-            # 获取需要更新的用户
+            # 获取标签计数有变化的用户
             users_need_update = tag_cache_service.get_users_need_cache_update()
             
             if not users_need_update:
@@ -91,28 +91,23 @@ class TagScheduler:
         except Exception as e:
             logger.error(f"过期缓存清理任务失败: {e}")
     
-    def _force_update_active_users_job(self):
-        """强制更新活跃用户标签任务"""
+    def _rollover_tag_buckets_job(self):
+        """标签计数时间桶滚动任务，只刷新计数发生变化的用户缓存"""
         try:
-            logger.info("开始执行活跃用户标签强制更新任务")
+            logger.info("开始执行标签计数时间桶滚动任务")
             
-            # 获取活跃用户（最近24小时有订阅的用户）
-            active_users = tag_cache_service.get_users_need_cache_update()
+            affected_users = tag_cache_service.rollover_tag_buckets()
             
-            if not active_users:
-                logger.info("没有活跃用户需要强制更新")
+            if not affected_users:
+                logger.info("没有用户的标签计数跨过时间桶边界")
                 return
             
-            # 限制每次更新的用户数量，避免性能问题
-            max_users_per_batch = 50
-            users_to_update = active_users[:max_users_per_batch]
+            result = tag_cache_service.batch_update_user_tags(affected_users)
             
-            result = tag_cache_service.batch_update_user_tags(users_to_update)
-            
-            logger.info(f"活跃用户标签强制更新完成: {result}")
+            logger.info(f"标签计数时间桶滚动完成: {result}")
             
         except Exception as e:
-            logger.error(f"活跃用户标签强制更新任务失败: {e}")
+            logger.error(f"标签计数时间桶滚动任务失败: {e}")
     
     def get_job_status(self):
         """获取任务状态"""
@@ -18,19 +18,34 @@ from pathlib import Path
 from datetime import datetime
 from loguru import logger
 
+from app.core.async_database import async_db
+from app.core.write_queue import write_queue
 from app.models.content import RSSContent
 from app.services.ai_service_manager import ai_service_manager
+from app.services.ai_result_cache_service import ai_result_cache_service
+from app.services.content_tag_index_service import content_tag_index_service
 from app.services.content_processing_utils import ContentProcessingUtils
 
 
 class AIContentProcessor:
     """AI内容预处理核心服务 - 使用统一的AIServiceManager"""
     
-    def __init__(self, db_path: str = "data/rss_subscriber.db"):
+    def __init__(
+        self,
+        db_path: str = "data/rss_subscriber.db",
+        llm_batch_size: int = 4,
+        llm_concurrency: int = 2
+    ):
         # 数据库路径
         self.db_path = db_path
         # 使用全局AI服务管理器
         self.ai_manager = ai_service_manager
+        # AI结果缓存（按内容指纹 + prompt版本）
+        self.result_cache = ai_result_cache_service
+        
+        # 批量推理配置：每次LLM调用打包的内容条数，以及同时进行的LLM调用数
+        self.llm_batch_size = max(1, llm_batch_size)
+        self.llm_concurrency = max(1, llm_concurrency)
         
         # 记录AI服务状态
         status = self.ai_manager.get_service_status()
@@ -54,25 +69,30 @@ class AIContentProcessor:
             entries: RSS内容列表（已去重）
             
         Returns:
-            List[RSSContent]: AI处理后的内容列表
+            List[RSSContent]: AI处理后且结果已写入数据库的内容列表
         """
         logger.info(f"🧠 开始AI内容处理，共{len(entries)}条")
         
         processed_entries = []
         skipped_count = 0
         
-        for i, entry in enumerate(entries, 1):
-            logger.debug(f"🔄 处理第{i}/{len(entries)}条: {entry.title[:50]}...")
-            
-            # 第1步：内容有效性验证 - 获取内容失败直接跳过
+        # 第1步：内容有效性验证 - 获取内容失败直接跳过
+        valid_entries = []
+        for entry in entries:
             if not self._validate_content_availability(entry):
                 logger.warning(f"⚠️ 内容不可用，跳过处理: {getattr(entry, 'title', 'Unknown')[:30]}...")
                 skipped_count += 1
                 continue
+            valid_entries.append(entry)
+        
+        # 第3步：AI智能处理（批量打包 + 并发调用），结果按content_id回填
+        ai_results = await self._process_with_ai_batched(valid_entries)
+        
+        for i, entry in enumerate(valid_entries, 1):
+            logger.debug(f"🔄 处理第{i}/{len(valid_entries)}条: {entry.title[:50]}...")
             
             try:
-                # 第3步：AI智能处理
-                ai_result = await self._process_with_ai(entry)
+                ai_result = ai_results.get(id(entry))
                 
                 if ai_result:
                     # AI处理成功（字段分离处理）
@@ -90,24 +110,6 @@ class AIContentProcessor:
                     
                     logger.debug(f"🔄 兜底处理完成: {entry.title[:30]}... | topics='{entry.topics}'")
                 
-                # 第5步：更新数据库AI处理结果
-                try:
-                    await self._update_ai_results_to_database(entry)
-                    logger.debug(f"💾 数据库更新完成: {entry.title[:30]}...")
-                except Exception as e:
-                    logger.warning(f"⚠️ 数据库更新失败: {e}")
-                
-                # 第6-7步：向量化处理
-                if self.vector_service:
-                    try:
-                        logger.info(f"🔮 开始向量化处理: {entry.title[:30]}...")
-                        await self._process_vectorization(entry)
-                        logger.success(f"✅ 向量化完成: {entry.title[:30]}...")
-                    except Exception as e:
-                        logger.warning(f"⚠️ 向量化失败: {e}")
-                else:
-                    logger.info("🔮 向量服务不可用，跳过向量化处理")
-                
                 processed_entries.append(entry)
                 
             except Exception as e:
@@ -116,9 +118,193 @@ class AIContentProcessor:
                 # 按照用户要求：处理失败直接跳过，等下次轮询再尝试
                 continue
         
+        # 第5步：并发提交数据库更新，写队列把同一批结果合并为一次提交
+        update_results = await asyncio.gather(
+            *(self._update_ai_results_to_database(entry) for entry in processed_entries),
+            return_exceptions=True
+        )
+        # 结果未写入数据库的条目不算处理成功，由调用方按失败重试
+        stored_entries = []
+        for entry, outcome in zip(processed_entries, update_results):
+            if isinstance(outcome, Exception):
+                logger.warning(f"⚠️ 数据库更新失败: {entry.title[:30]}... | {outcome}")
+                skipped_count += 1
+            else:
+                stored_entries.append(entry)
+        processed_entries = stored_entries
+        
+        # 第6-7步：批量向量化处理（一次编码 + 分块upsert）
+        if self.vector_service:
+            try:
+                await self._process_vectorization_batch(processed_entries)
+            except Exception as e:
+                logger.warning(f"⚠️ 批量向量化失败: {e}")
+        else:
+            logger.info("🔮 向量服务不可用，跳过向量化处理")
+        
         logger.info(f"✅ AI内容处理完成: 成功{len(processed_entries)}条，跳过{skipped_count}条")
         return processed_entries
     
+    async def _process_with_ai_batched(self, entries: List[RSSContent]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """
+        批量AI处理：先查结果缓存，未命中的按llm_batch_size打包成一次调用，最多llm_concurrency个调用并发
+        
+        Args:
+            entries: 已通过有效性验证的内容列表
+            
+        Returns:
+            Dict[int, Optional[Dict]]: id(entry) -> AI处理结果（失败为None，由调用方兜底）
+        """
+        if not entries:
+            return {}
+        
+        results: Dict[int, Optional[Dict[str, Any]]] = {}
+        
+        # 先查AI结果缓存：相同内容 + 相同prompt版本不再重复调用大模型
+        prompt_version = self.ai_manager.get_prompt_version()
+        fingerprints = {
+            id(entry): self.result_cache.fingerprint(
+                getattr(entry, 'title', '') or "",
+                getattr(entry, 'description_text', '') or getattr(entry, 'description', '') or "",
+                prompt_version
+            )
+            for entry in entries
+        }
+        cached = await asyncio.to_thread(self.result_cache.get_many, list(fingerprints.values()))
+        
+        pending = []
+        for entry in entries:
+            cached_result = cached.get(fingerprints[id(entry)])
+            if cached_result:
+                results[id(entry)] = cached_result
+            else:
+                pending.append(entry)
+        
+        if cached:
+            logger.info(f"💾 AI结果缓存命中: {len(entries) - len(pending)}/{len(entries)}条")
+        if not pending:
+            return results
+        
+        if not self.llm_service:
+            logger.info("🤖 LLM服务不可用，跳过AI处理")
+            return results
+        
+        # 缺少content_id的内容无法在批量结果中对应，单独处理
+        batchable = [entry for entry in pending if entry.content_id]
+        singles = [entry for entry in pending if not entry.content_id]
+        
+        groups = [batchable[i:i + self.llm_batch_size] for i in range(0, len(batchable), self.llm_batch_size)]
+        groups.extend([entry] for entry in singles)
+        
+        semaphore = asyncio.Semaphore(self.llm_concurrency)
+        
+        async def _run_group(group: List[RSSContent]) -> Dict[int, Optional[Dict[str, Any]]]:
+            async with semaphore:
+                if len(group) == 1:
+                    return {id(group[0]): await self._process_with_ai(group[0])}
+                return await self._process_batch_with_ai(group)
+        
+        logger.info(
+            f"🤖 批量LLM推理: {len(pending)}条内容, {len(groups)}次调用, "
+            f"每批{self.llm_batch_size}条, 并发{self.llm_concurrency}"
+        )
+        
+        fresh: Dict[int, Optional[Dict[str, Any]]] = {}
+        for group_result in await asyncio.gather(*(_run_group(group) for group in groups)):
+            fresh.update(group_result)
+        results.update(fresh)
+        
+        # 只缓存大模型成功解析的结果，兜底结果不入缓存
+        to_store = {
+            fingerprints[entry_key]: ai_result
+            for entry_key, ai_result in fresh.items() if ai_result
+        }
+        await asyncio.to_thread(self.result_cache.put_many, to_store, prompt_version)
+        return results
+    
+    async def _process_batch_with_ai(self, group: List[RSSContent]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """
+        将多条内容打包为一个结构化prompt调用LLM，并按content_id映射回各条内容
+        
+        Args:
+            group: 同一批次的内容（均包含content_id）
+            
+        Returns:
+            Dict[int, Optional[Dict]]: id(entry) -> AI处理结果，缺失或解析失败的条目为None
+        """
+        results: Dict[int, Optional[Dict[str, Any]]] = {id(entry): None for entry in group}
+        
+        try:
+            prompt_input = self.ai_manager.prepare_batch_prompt([
+                {
+                    'content_id': entry.content_id,
+                    'title': getattr(entry, 'title', '') or "",
+                    'description': getattr(entry, 'description', '') or "",
+                    'description_text': getattr(entry, 'description_text', '') or "",
+                    'author': getattr(entry, 'author', '') or "",
+                    'platform': getattr(entry, 'platform', '') or "",
+                    'feed_title': getattr(entry, 'feed_title', '') or ""
+                }
+                for entry in group
+            ])
+            logger.info(f"📋 批量Prompt组装完成: {len(group)}条, 长度: {len(prompt_input)}字符")
+            
+            response = await self._call_llm(prompt_input)
+            if not response:
+                logger.warning("⚠️ 批量LLM响应为空，整批使用兜底处理")
+                return results
+            
+            parsed = self._parse_batch_ai_response(response)
+            for entry in group:
+                results[id(entry)] = parsed.get(entry.content_id)
+            
+            missing = sum(1 for value in results.values() if value is None)
+            if missing:
+                logger.warning(f"⚠️ 批量AI结果缺失或无效{missing}条，将使用兜底处理")
+            else:
+                logger.success(f"✅ 批量AI处理成功: {len(group)}条")
+            
+        except Exception as e:
+            logger.warning(f"⚠️ 批量AI处理异常: {e}")
+        
+        return results
+    
+    def _parse_batch_ai_response(self, response: str) -> Dict[int, Dict[str, Any]]:
+        """
+        解析批量AI响应（JSON数组，每个元素带content_id）
+        
+        Returns:
+            Dict[int, Dict]: content_id -> 字段分离后的AI结果，只包含验证通过的条目
+        """
+        parsed: Dict[int, Dict[str, Any]] = {}
+        try:
+            start_idx = response.find('[')
+            end_idx = response.rfind(']') + 1
+            if start_idx < 0 or end_idx <= start_idx:
+                logger.warning("⚠️ 在批量AI响应中未找到有效的JSON数组")
+                return parsed
+            
+            items = json.loads(response[start_idx:end_idx])
+            if not isinstance(items, list):
+                return parsed
+            
+            for item in items:
+                if not isinstance(item, dict) or not self._validate_ai_result(item):
+                    continue
+                try:
+                    content_id = int(item.get('content_id'))
+                except (TypeError, ValueError):
+                    continue
+                parsed[content_id] = self._convert_ai_result_to_separated_fields(item)
+            
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ 批量AI响应JSON解析失败: {e}")
+            logger.debug(f"❌ 无法解析的响应内容: {response}")
+        except Exception as e:
+            logger.warning(f"⚠️ 批量AI响应处理失败: {e}")
+        
+        return parsed
+    
     async def _process_with_ai(self, entry: RSSContent) -> Optional[Dict[str, Any]]:
         """
         第3步：使用AI处理内容
@@ -386,8 +572,8 @@ class AIContentProcessor:
             topics = getattr(entry, 'topics', '其他')  # 单个主题字符串
             tags = entry.tags if hasattr(entry, 'tags') else '[]'  # 标签JSON数组
             
-            # 更新数据库中的AI字段（字段分离）
-            await asyncio.to_thread(self._update_shared_content_ai_fields_v2, 
+            # 更新数据库中的AI字段（字段分离），由单写者队列与同批其他结果分组提交
+            await write_queue.run(self._update_shared_content_ai_fields_v2,
                                   content_id, summary, topics, tags)
             
             logger.debug(f"💾 AI结果已更新到数据库: content_id={content_id}")
@@ -396,63 +582,58 @@ class AIContentProcessor:
             logger.error(f"❌ 更新AI结果到数据库失败: {e}")
             raise
 
-    def _update_shared_content_ai_fields_v2(self, content_id: int, summary: str, topics: str, tags: str):
-        """同步方法：更新共享内容的AI字段（字段分离版本）"""
-        try:
-            from ..core.database_manager import get_db_transaction
-            with get_db_transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE shared_contents 
-                    SET summary = ?, topics = ?, tags = ?, updated_at = ?
-                    WHERE id = ?
-                """, (summary, topics, tags, datetime.now(), content_id))
-                
-                if cursor.rowcount > 0:
-                    logger.debug(f"💾 数据库更新成功: content_id={content_id}, topics='{topics}'")
-                else:
-                    logger.warning(f"⚠️ 数据库更新无影响: content_id={content_id}")
-                    
-        except Exception as e:
-            logger.error(f"❌ 数据库更新失败: {e}")
-            raise
+    def _update_shared_content_ai_fields_v2(self, conn, content_id: int, summary: str, topics: str, tags: str):
+        """写队列操作：更新共享内容的AI字段（字段分离版本）"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE shared_contents 
+            SET summary = ?, topics = ?, tags = ?, updated_at = ?
+            WHERE id = ?
+        """, (summary, topics, tags, datetime.now(), content_id))
+        
+        if cursor.rowcount > 0:
+            # 同一事务内维护标签倒排索引
+            content_tag_index_service.index_content_tags(conn, content_id, tags, topics)
+            logger.debug(f"💾 数据库更新成功: content_id={content_id}, topics='{topics}'")
+        else:
+            logger.warning(f"⚠️ 数据库更新无影响: content_id={content_id}")
     
     async def _get_content_id_by_hash(self, content_hash: str) -> Optional[int]:
         """通过content_hash获取内容ID"""
         try:
-            from ..core.database_manager import get_db_connection
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT id FROM shared_contents WHERE content_hash = ?", (content_hash,))
-                result = cursor.fetchone()
-                return result[0] if result else None
+            result = await async_db.fetch_one("SELECT id FROM shared_contents WHERE content_hash = ?", (content_hash,))
+            return result[0] if result else None
         except Exception as e:
             logger.error(f"❌ 查询内容ID失败: {e}")
             return None
     
     async def _process_vectorization(self, entry: RSSContent):
         """
-        第6-7步：向量化处理和存储（统一向量服务）
+        第6-7步：向量化处理和存储（单条）
         
         Args:
             entry: RSS内容项
         """
+        await self._process_vectorization_batch([entry])
+    
+    async def _process_vectorization_batch(self, entries: List[RSSContent]):
+        """
+        第6-7步：批量向量化处理和存储（统一向量服务）
+        
+        Args:
+            entries: 已完成AI处理的内容列表
+        """
         if not self.vector_service:
             logger.info("🔮 向量服务不可用，跳过向量化处理")
             return
         
-        try:
-            logger.info(f"🔮 开始向量化处理: {entry.title[:30]}...")
-            
+        items = []
+        for entry in entries:
             # 准备标准化数据（直接从entry提取）
             content_id = getattr(entry, 'content_id', None)
             if not content_id:
                 logger.warning(f"⚠️ 内容缺少content_id，跳过向量化: {entry.title[:30]}...")
-                return
-            
-            title = entry.title or ""
-            summary = entry.smart_summary or ""
-            topics = getattr(entry, 'topics', '其他')  # 单个主题字符串
+                continue
             
             # 解析标签数组
             tags_list = []
@@ -465,32 +646,29 @@ class AIContentProcessor:
             except:
                 tags_list = []
             
-            # 调用统一向量服务（新接口）
-            platform = getattr(entry, 'platform', '')
-            publish_date = str(getattr(entry, 'published_at', ''))
-            original_link = getattr(entry, 'original_link', '')
-            
-            # 使用新的向量服务接口
-            await asyncio.to_thread(
-                self.vector_service.add_content_vector,
-                content_id=content_id,  # 直接传递content_id
-                title=title,
-                summary=summary,
-                topics=topics,
-                tags=tags_list,
-                platform=platform,
-                publish_date=publish_date,
-                original_link=original_link
-            )
-            
-            logger.success(f"✅ 向量化存储成功: {entry.title[:30]}... (content_id={content_id})")
+            items.append({
+                'content_id': content_id,
+                'title': entry.title or "",
+                'summary': entry.smart_summary or "",
+                'topics': getattr(entry, 'topics', '其他'),  # 单个主题字符串
+                'tags': tags_list,
+                'platform': getattr(entry, 'platform', ''),
+                'publish_date': str(getattr(entry, 'published_at', '')),
+                'original_link': getattr(entry, 'original_link', '')
+            })
+        
+        if not items:
+            return
+        
+        try:
+            logger.info(f"🔮 开始批量向量化处理: {len(items)}条")
+            stored = await asyncio.to_thread(self.vector_service.add_content_vectors, items)
+            logger.success(f"✅ 批量向量化存储成功: {stored}条")
             
         except Exception as e:
             logger.warning(f"⚠️ 向量化处理失败: {e}")
             raise
     
-
-    
     def get_service_status(self) -> Dict[str, bool]:
         """获取服务状态"""
         # 直接使用AIServiceManager的状态
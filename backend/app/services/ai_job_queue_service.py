@@ -0,0 +1,247 @@
+"""
+AI预处理任务队列服务
+基于SQLite的持久化任务队列：拉取流程只负责把需要摘要、标签和向量的内容ID入队，
+由后台工作池按租约（lease）领取处理，失败按指数退避重试
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from ..core.database_manager import get_db_connection, get_db_transaction
+
+
+class AIJobStatus:
+    """任务状态"""
+    PENDING = "pending"       # 等待处理
+    RUNNING = "running"       # 已被工作者领取（租约有效期内）
+    DONE = "done"             # 处理完成
+    FAILED = "failed"         # 超过最大尝试次数
+
+
+class AIJobQueueService:
+    """AI预处理任务队列服务"""
+
+    def __init__(
+        self,
+        db_path: str = "data/rss_subscriber.db",
+        max_attempts: int = 3,
+        retry_base_seconds: int = 60
+    ):
+        """
+        初始化任务队列
+
+        Args:
+            db_path: 数据库路径
+            max_attempts: 每个任务的最大尝试次数
+            retry_base_seconds: 重试退避的基础间隔（秒）
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self._init_queue_table()
+
+    def _init_queue_table(self):
+        """初始化任务队列表"""
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            # 每个内容至多一条任务，重复入队只会重置已结束的任务
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ai_processing_jobs (
+                    content_id INTEGER PRIMARY KEY,
+                    subscription_id INTEGER,
+                    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    available_at TIMESTAMP NOT NULL,
+                    lease_until TIMESTAMP,
+                    worker_id TEXT,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_ai_jobs_status_available
+                ON ai_processing_jobs (status, available_at)
+            """)
+
+            conn.commit()
+
+    def enqueue(self, content_ids: List[int], subscription_id: Optional[int] = None) -> int:
+        """
+        批量入队需要AI处理的内容
+
+        Args:
+            content_ids: 内容ID列表
+            subscription_id: 来源订阅ID（仅用于记录）
+
+        Returns:
+            int: 新入队或重新激活的任务数
+        """
+        if not content_ids:
+            return 0
+
+        now = datetime.now()
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                before = conn.total_changes
+                cursor.executemany("""
+                    INSERT INTO ai_processing_jobs
+                    (content_id, subscription_id, status, attempts, max_attempts, available_at, created_at, updated_at)
+                    VALUES (?, ?, 'pending', 0, ?, ?, ?, ?)
+                    ON CONFLICT(content_id) DO UPDATE SET
+                        status = 'pending',
+                        attempts = 0,
+                        available_at = excluded.available_at,
+                        lease_until = NULL,
+                        last_error = NULL,
+                        updated_at = excluded.updated_at
+                    WHERE ai_processing_jobs.status IN ('done', 'failed')
+                """, [
+                    (content_id, subscription_id, self.max_attempts, now, now, now)
+                    for content_id in content_ids
+                ])
+                enqueued = conn.total_changes - before
+
+            logger.info(f"🧾 AI任务入队: {enqueued}/{len(content_ids)}条")
+            return enqueued
+
+        except Exception as e:
+            logger.error(f"AI任务入队失败: {e}")
+            return 0
+
+    def lease(self, worker_id: str, batch_size: int = 5, lease_seconds: int = 300) -> List[Tuple[int, Optional[int]]]:
+        """
+        领取一批可处理的任务（等待中的任务，或租约已过期的运行中任务）
+
+        Args:
+            worker_id: 工作者标识
+            batch_size: 最多领取的任务数
+            lease_seconds: 租约时长（秒），超时未完成的任务会被其他工作者重新领取
+
+        Returns:
+            List[Tuple[int, Optional[int]]]: (content_id, subscription_id) 列表
+        """
+        now = datetime.now()
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                # 单条UPDATE ... RETURNING保证领取原子性，多个工作者不会拿到同一任务
+                cursor.execute("""
+                    UPDATE ai_processing_jobs
+                    SET status = 'running',
+                        attempts = attempts + 1,
+                        lease_until = ?,
+                        worker_id = ?,
+                        updated_at = ?
+                    WHERE content_id IN (
+                        SELECT content_id FROM ai_processing_jobs
+                        WHERE (status = 'pending' AND available_at <= ?)
+                           OR (status = 'running' AND lease_until < ?)
+                        ORDER BY available_at
+                        LIMIT ?
+                    )
+                    RETURNING content_id, subscription_id
+                """, (now + timedelta(seconds=lease_seconds), worker_id, now, now, now, batch_size))
+                return [(row[0], row[1]) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"领取AI任务失败: {e}")
+            return []
+
+    def complete(self, content_ids: List[int]):
+        """标记任务处理完成"""
+        if not content_ids:
+            return
+
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    UPDATE ai_processing_jobs
+                    SET status = 'done', lease_until = NULL, last_error = NULL, updated_at = ?
+                    WHERE content_id = ?
+                """, [(datetime.now(), content_id) for content_id in content_ids])
+
+        except Exception as e:
+            logger.error(f"标记AI任务完成失败: {e}")
+
+    def fail(self, content_ids: List[int], error: str):
+        """
+        标记任务失败：未超过最大尝试次数的按指数退避重新排队，否则标记为失败
+
+        Args:
+            content_ids: 内容ID列表
+            error: 失败原因
+        """
+        if not content_ids:
+            return
+
+        now = datetime.now()
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                for content_id in content_ids:
+                    cursor.execute(
+                        "SELECT attempts, max_attempts FROM ai_processing_jobs WHERE content_id = ?",
+                        (content_id,)
+                    )
+                    row = cursor.fetchone()
+                    if not row:
+                        continue
+
+                    attempts, max_attempts = row
+                    if attempts >= max_attempts:
+                        status, available_at = AIJobStatus.FAILED, now
+                        logger.warning(f"⚠️ AI任务达到最大尝试次数: content_id={content_id} | {error}")
+                    else:
+                        delay = self.retry_base_seconds * (2 ** (attempts - 1))
+                        status, available_at = AIJobStatus.PENDING, now + timedelta(seconds=delay)
+
+                    cursor.execute("""
+                        UPDATE ai_processing_jobs
+                        SET status = ?, available_at = ?, lease_until = NULL,
+                            last_error = ?, updated_at = ?
+                        WHERE content_id = ?
+                    """, (status, available_at, error[:500], now, content_id))
+
+        except Exception as e:
+            logger.error(f"标记AI任务失败状态失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT status, COUNT(*) FROM ai_processing_jobs GROUP BY status
+                """)
+                stats = {status: count for status, count in cursor.fetchall()}
+
+                cursor.execute("""
+                    SELECT MIN(available_at) FROM ai_processing_jobs WHERE status = 'pending'
+                """)
+                oldest = cursor.fetchone()[0]
+
+            return {
+                AIJobStatus.PENDING: stats.get(AIJobStatus.PENDING, 0),
+                AIJobStatus.RUNNING: stats.get(AIJobStatus.RUNNING, 0),
+                AIJobStatus.DONE: stats.get(AIJobStatus.DONE, 0),
+                AIJobStatus.FAILED: stats.get(AIJobStatus.FAILED, 0),
+                'oldest_pending_at': oldest
+            }
+
+        except Exception as e:
+            logger.error(f"获取AI任务队列统计失败: {e}")
+            return {}
+
+
+# 创建全局服务实例
+ai_job_queue_service = AIJobQueueService()
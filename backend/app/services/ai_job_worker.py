@@ -0,0 +1,203 @@
+"""
+AI预处理后台工作池
+在独立线程的事件循环中运行多个工作者，从ai_processing_jobs队列领取内容，
+执行摘要、标签和向量化处理，拉取流程不再等待LLM调用
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from .ai_job_queue_service import ai_job_queue_service
+
+
+class AIJobWorkerPool:
+    """
+    AI预处理工作池
+
+    Features:
+    - 多个工作者并发领取任务，租约过期的任务自动被重新领取
+    - 队列为空时按轮询间隔休眠，有新任务入队时可被立即唤醒
+    - 失败任务交由队列按指数退避重试
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 2,
+        batch_size: int = 5,
+        poll_interval: float = 5.0,
+        lease_seconds: int = 300
+    ):
+        """
+        初始化工作池
+
+        Args:
+            num_workers: 工作者数量
+            batch_size: 每个工作者每次领取的任务数
+            poll_interval: 队列为空时的轮询间隔（秒）
+            lease_seconds: 任务租约时长（秒）
+        """
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.queue = ai_job_queue_service
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._stats = {'processed': 0, 'succeeded': 0, 'failed': 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动工作池线程"""
+        if self.running:
+            return
+
+        self._stopping = False
+        ready = threading.Event()
+
+        def _run_loop():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            loop.call_soon(ready.set)
+            try:
+                loop.run_until_complete(asyncio.gather(*(
+                    self._worker(f"ai-worker-{os.getpid()}-{i}") for i in range(self.num_workers)
+                )))
+            finally:
+                loop.close()
+                self._loop = None
+
+        self._thread = threading.Thread(target=_run_loop, name="ai-job-workers", daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info(f"🧠 AI预处理工作池已启动: 工作者={self.num_workers}, 批量={self.batch_size}")
+
+    def stop(self, timeout: float = 30):
+        """停止工作池（等待正在处理的批次结束）"""
+        if not self.running:
+            return
+
+        self._stopping = True
+        self.notify()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        logger.info("🛑 AI预处理工作池已停止")
+
+    def notify(self):
+        """有新任务入队时唤醒空闲的工作者（线程安全）"""
+        loop, wakeup = self._loop, self._wakeup
+        if loop and wakeup and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def _worker(self, worker_id: str):
+        """单个工作者循环：领取 -> 处理 -> 确认/失败"""
+        while not self._stopping:
+            # 领取前清除唤醒标记：领取期间到达的通知会保留，不会在空领取后被清掉
+            self._wakeup.clear()
+            jobs = await asyncio.to_thread(
+                self.queue.lease, worker_id, self.batch_size, self.lease_seconds
+            )
+
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            content_ids = [content_id for content_id, _ in jobs]
+            subscription_ids = {content_id: subscription_id for content_id, subscription_id in jobs}
+
+            try:
+                succeeded = await self._process_batch(content_ids, subscription_ids)
+                failed = [content_id for content_id in content_ids if content_id not in succeeded]
+
+                await asyncio.to_thread(self.queue.complete, sorted(succeeded))
+                if failed:
+                    await asyncio.to_thread(self.queue.fail, failed, "AI处理未成功")
+
+                self._stats['processed'] += len(content_ids)
+                self._stats['succeeded'] += len(succeeded)
+                self._stats['failed'] += len(failed)
+
+            except Exception as e:
+                logger.error(f"❌ AI任务批次处理失败: {worker_id} | {e}")
+                await asyncio.to_thread(self.queue.fail, content_ids, str(e))
+                self._stats['processed'] += len(content_ids)
+                self._stats['failed'] += len(content_ids)
+
+    async def _process_batch(self, content_ids: List[int], subscription_ids: Dict[int, Optional[int]]) -> set:
+        """
+        处理一批内容的AI预处理
+
+        Returns:
+            set: 处理成功的内容ID
+        """
+        from . import rss_content_service
+        from .ai_content_processor import ai_content_processor
+        from ..models.content import RSSContent
+
+        logger.info(f"🧠 开始AI预处理: {len(content_ids)}条内容")
+
+        # 从数据库读取需要AI处理的内容
+        db_contents = await rss_content_service.shared_content_service.get_contents_by_ids(content_ids)
+        if not db_contents:
+            logger.warning("⚠️ 无法从数据库读取需要处理的内容")
+            return set()
+
+        # 从数据库记录创建RSSContent对象（包含content_id信息）
+        rss_content_objects = []
+        for db_content in db_contents:
+            try:
+                rss_content_objects.append(RSSContent(
+                    content_id=db_content['content_id'],
+                    subscription_id=subscription_ids.get(db_content['content_id']) or 0,
+                    content_hash=db_content['content_hash'],
+                    title=db_content['title'],
+                    original_link=db_content['original_link'],
+                    published_at=db_content['published_at'],
+                    description=db_content['description'],
+                    description_text=db_content['description_text'],
+                    author=db_content['author'],
+                    platform=db_content['platform'],
+                    feed_title=db_content['feed_title'],
+                    cover_image=db_content['cover_image'],
+                    content_type=db_content['content_type']
+                ))
+            except Exception as e:
+                logger.warning(f"⚠️ 数据库内容转换失败，跳过: {db_content.get('title', 'Unknown')[:30]}... | 错误: {e}")
+                continue
+
+        if not rss_content_objects:
+            logger.warning("⚠️ 没有有效的内容可供AI处理")
+            return set()
+
+        processed_entries = await ai_content_processor.process_content_intelligence(rss_content_objects)
+        succeeded = {entry.content_id for entry in processed_entries}
+
+        logger.success(f"✅ AI预处理完成: 成功{len(succeeded)}/{len(content_ids)}条")
+        return succeeded
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取工作池与队列统计信息"""
+        return {
+            'running': self.running,
+            'workers': self.num_workers,
+            **self._stats,
+            'queue': self.queue.get_stats()
+        }
+
+
+# 创建全局实例
+ai_job_worker_pool = AIJobWorkerPool()
@@ -0,0 +1,214 @@
+"""
+AI结果缓存服务
+以"标准化标题/正文哈希 + prompt模版版本"为指纹，持久化解析后的AI结果，
+相同输入（过期清理后重新入库、镜像订阅源、重复处理）不再重复调用大模型
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List
+
+from loguru import logger
+
+from ..core.database_manager import get_db_connection, get_db_transaction
+
+
+class AIResultCacheService:
+    """AI结果缓存服务（按最近使用时间淘汰）"""
+
+    def __init__(
+        self,
+        db_path: str = "data/rss_subscriber.db",
+        max_entries: int = 50000,
+        evict_every: int = 200
+    ):
+        """
+        初始化缓存服务
+
+        Args:
+            db_path: 数据库路径
+            max_entries: 缓存条目上限，超出后淘汰最久未使用的条目
+            evict_every: 每写入多少条检查一次容量
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes_since_evict = 0
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evicted': 0}
+        self._init_cache_table()
+
+    def _init_cache_table(self):
+        """初始化AI结果缓存表"""
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ai_result_cache (
+                    fingerprint VARCHAR(64) PRIMARY KEY,
+                    prompt_version VARCHAR(16) NOT NULL,
+                    result_json TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_ai_result_cache_last_used
+                ON ai_result_cache (last_used_at)
+            """)
+
+            conn.commit()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """标准化文本：去除HTML标签、合并空白、转小写"""
+        if not text:
+            return ""
+        text = re.sub(r'<[^>]+>', '', text)
+        return re.sub(r'\s+', ' ', text).strip().lower()
+
+    def fingerprint(self, title: str, description: str, prompt_version: str) -> str:
+        """
+        计算内容指纹
+
+        Args:
+            title: 标题
+            description: 正文（优先纯文本描述）
+            prompt_version: prompt模版版本
+
+        Returns:
+            str: 指纹哈希
+        """
+        payload = f"{self._normalize(title)}\x1f{self._normalize(description)}\x1f{prompt_version}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, fingerprints: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量查询缓存，命中的条目同时更新命中次数和最近使用时间
+
+        Args:
+            fingerprints: 指纹列表
+
+        Returns:
+            Dict[str, Dict]: fingerprint -> AI结果
+        """
+        unique = list(dict.fromkeys(fingerprints))
+        if not unique:
+            return {}
+
+        results: Dict[str, Dict[str, Any]] = {}
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(unique), 500):
+                    chunk = unique[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f"""
+                        SELECT fingerprint, result_json FROM ai_result_cache
+                        WHERE fingerprint IN ({placeholders})
+                    """, chunk)
+                    for fingerprint, result_json in cursor.fetchall():
+                        try:
+                            results[fingerprint] = json.loads(result_json)
+                        except json.JSONDecodeError:
+                            continue
+
+            if results:
+                with get_db_transaction() as conn:
+                    cursor = conn.cursor()
+                    now = datetime.now()
+                    cursor.executemany("""
+                        UPDATE ai_result_cache
+                        SET hits = hits + 1, last_used_at = ?
+                        WHERE fingerprint = ?
+                    """, [(now, fingerprint) for fingerprint in results])
+
+        except Exception as e:
+            logger.error(f"查询AI结果缓存失败: {e}")
+            return {}
+
+        self._stats['hits'] += len(results)
+        self._stats['misses'] += len(unique) - len(results)
+        return results
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]], prompt_version: str):
+        """
+        批量写入缓存
+
+        Args:
+            entries: fingerprint -> AI结果（字段分离后的格式）
+            prompt_version: prompt模版版本
+        """
+        if not entries:
+            return
+
+        now = datetime.now()
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    INSERT INTO ai_result_cache
+                    (fingerprint, prompt_version, result_json, hits, created_at, last_used_at)
+                    VALUES (?, ?, ?, 0, ?, ?)
+                    ON CONFLICT(fingerprint) DO UPDATE SET
+                        result_json = excluded.result_json,
+                        last_used_at = excluded.last_used_at
+                """, [
+                    (fingerprint, prompt_version, json.dumps(result, ensure_ascii=False), now, now)
+                    for fingerprint, result in entries.items()
+                ])
+
+            self._stats['stores'] += len(entries)
+            self._writes_since_evict += len(entries)
+            if self._writes_since_evict >= self.evict_every:
+                self._writes_since_evict = 0
+                self.evict()
+
+        except Exception as e:
+            logger.error(f"写入AI结果缓存失败: {e}")
+
+    def evict(self) -> int:
+        """淘汰超出容量上限的最久未使用条目"""
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM ai_result_cache")
+                overflow = cursor.fetchone()[0] - self.max_entries
+                if overflow <= 0:
+                    return 0
+
+                cursor.execute("""
+                    DELETE FROM ai_result_cache
+                    WHERE fingerprint IN (
+                        SELECT fingerprint FROM ai_result_cache
+                        ORDER BY last_used_at ASC
+                        LIMIT ?
+                    )
+                """, (overflow,))
+                evicted = cursor.rowcount
+
+            self._stats['evicted'] += evicted
+            logger.info(f"🧹 AI结果缓存淘汰: {evicted}条")
+            return evicted
+
+        except Exception as e:
+            logger.error(f"AI结果缓存淘汰失败: {e}")
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self._stats['hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'hit_rate': round(self._stats['hits'] / lookups * 100, 1) if lookups else 0,
+            'max_entries': self.max_entries
+        }
+
+
+# 创建全局服务实例
+ai_result_cache_service = AIResultCacheService()
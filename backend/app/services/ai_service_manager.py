@@ -5,6 +5,7 @@ AI服务管理器
 提供标准化的AI调用接口，避免服务间直接依赖
 """
 import json
+import hashlib
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from loguru import logger
@@ -102,6 +103,9 @@ class AIServiceManager:
         except Exception as e:
             logger.error(f"❌ 加载prompt模版失败: {e}")
             self.prompt_templates["content_analysis"] = self._get_fallback_prompt_template()
+        
+        # 批量分析模版：多条内容打包为一次LLM调用
+        self.prompt_templates["content_analysis_batch"] = self._get_batch_prompt_template()
     
     def _get_fallback_prompt_template(self) -> str:
         """获取兜底的prompt模版"""
@@ -122,6 +126,37 @@ class AIServiceManager:
   "summary": "摘要"
 }"""
     
+    def _get_batch_prompt_template(self) -> str:
+        """获取批量分析的prompt模版（输出按content_id对应的JSON数组）"""
+        return """你是一名内容分析和总结专家。
+
+## 核心任务
+下方共有{count}条内容，请逐条基于标题、描述、正文等信息生成主题、标签、摘要
+1. **主题**：1个中文词语概括内容所属顶级领域或类别（如：科技、娱乐、财经、体育等）
+2. **标签**：至多5个最具体且高度相关的实体标签
+3. **摘要**：至多80字总结内容的主要信息
+
+## 标签规范
+1.使用名词性短语（如人名、公司、产品、事件、技术）
+2.保留原始专业术语（如 "PyTorch"）不译
+3.剔除无关和模糊修饰词（如 "重磅", "独家"）
+4.出现同义标签（如 "Elon Musk"和"马斯克"）只保留其中最常用的一种
+
+## 输入内容
+{items}
+
+## 按以下JSON数组格式输出，每条内容一个元素，content_id必须与输入一致
+```json
+[
+  {{
+    "content_id": 1,
+    "topics": "主题",
+    "tags": ["标签1", "标签2", "标签3"],
+    "summary": "内容摘要"
+  }}
+]
+```"""
+    
     # =================
     # 公开调用接口
     # =================
@@ -153,14 +188,14 @@ class AIServiceManager:
         # 这里需要根据实际的LLM服务接口进行调用
         # 目前基于qwen3_chat的接口设计
         if hasattr(self.llm_service, 'generate_response'):
-            # generate_response是同步方法，不需要await
-            return self.llm_service.generate_response(prompt)
+            # generate_response是同步方法，放到线程池执行，避免阻塞事件循环并允许并发请求
+            return await asyncio.to_thread(self.llm_service.generate_response, prompt)
         elif hasattr(self.llm_service, 'chat'):
-            # chat方法如果是同步的，不需要await
+            # chat方法如果是同步的，同样放到线程池执行
             if asyncio.iscoroutinefunction(self.llm_service.chat):
                 return await self.llm_service.chat(prompt)
             else:
-                return self.llm_service.chat(prompt)
+                return await asyncio.to_thread(self.llm_service.chat, prompt)
         else:
             logger.error("❌ LLM服务接口不匹配")
             return None
@@ -194,7 +229,8 @@ class AIServiceManager:
             if asyncio.iscoroutinefunction(self.vector_service.get_embedding):
                 return await self.vector_service.get_embedding(text)
             else:
-                return self.vector_service.get_embedding(text)
+                # 同步方法（经过向量缓存，未命中时运行模型）放到线程池执行
+                return await asyncio.to_thread(self.vector_service.get_embedding, text)
         elif hasattr(self.vector_service, 'encode_text'):
             # encode_text是同步方法
             return self.vector_service.encode_text(text)
@@ -234,6 +270,30 @@ class AIServiceManager:
         except Exception as e:
             logger.error(f"❌ 向量存储失败: {e}")
     
+    def delete_content_vectors(self, content_ids: List[int]) -> int:
+        """
+        删除内容向量（同步执行，供后台清理线程调用）
+        
+        Args:
+            content_ids: 内容ID列表
+            
+        Returns:
+            int: 删除的向量数量，向量服务不可用时为0
+        """
+        if not self.vector_service or not content_ids:
+            return 0
+        
+        if hasattr(self.vector_service, 'delete_content_vectors'):
+            return self.vector_service.delete_content_vectors(content_ids)
+        
+        if hasattr(self.vector_service, 'delete_content_vector'):
+            for content_id in content_ids:
+                self.vector_service.delete_content_vector(content_id)
+            return len(content_ids)
+        
+        logger.warning("⚠️ 向量服务不支持删除功能")
+        return 0
+    
     def get_prompt_template(self, template_name: str) -> str:
         """
         获取prompt模版
@@ -246,6 +306,16 @@ class AIServiceManager:
         """
         return self.prompt_templates.get(template_name, self._get_fallback_prompt_template())
     
+    def get_prompt_version(self) -> str:
+        """
+        获取内容分析prompt的版本标识（单条与批量模版内容的哈希）
+        
+        Returns:
+            str: 16位版本哈希，模版变更后自动变化
+        """
+        combined = self.get_prompt_template("content_analysis") + self.get_prompt_template("content_analysis_batch")
+        return hashlib.sha256(combined.encode('utf-8')).hexdigest()[:16]
+    
     def prepare_prompt(self, template_name: str, **kwargs) -> str:
         """
         准备prompt输入
@@ -273,6 +343,32 @@ class AIServiceManager:
             }
             return template.format(**safe_kwargs)
     
+    def prepare_batch_prompt(self, items: List[Dict[str, Any]], max_text_length: int = 1000) -> str:
+        """
+        准备批量分析的prompt输入
+        
+        Args:
+            items: 内容列表，每项包含content_id、title、description_text等字段
+            max_text_length: 单条正文的最大长度，避免打包后的prompt过长
+            
+        Returns:
+            str: 格式化后的prompt
+        """
+        blocks = []
+        for item in items:
+            text = item.get('description_text') or item.get('description') or ''
+            blocks.append(
+                f"### content_id={item['content_id']}\n"
+                f"标题: {item.get('title', '')}\n"
+                f"正文: {text[:max_text_length]}\n"
+                f"作者: {item.get('author', '')}\n"
+                f"平台: {item.get('platform', '')}\n"
+                f"订阅源: {item.get('feed_title', '')}"
+            )
+        
+        template = self.get_prompt_template("content_analysis_batch")
+        return template.format(count=len(items), items="\n\n".join(blocks))
+    
     def get_service_status(self) -> Dict[str, bool]:
         """
         获取服务状态
@@ -2,12 +2,17 @@
 自动拉取调度服务
 基于APScheduler实现用户订阅内容的自动拉取调度
 包含重试机制和任务记录管理
+Feed级自适应轮询：到期的Feed在用户拉取周期之间单独轮询，用户周期拉取跳过尚未到期的Feed
+分散派发：同一整点到期的用户按确定性的用户偏移分散到派发窗口内，并统计派发延迟
+重试按到期时间直接登记为定时任务（内存中按执行时间排序），启动时从任务表重建，不再轮询任务表
 """
 
 import os
+import hashlib
 import logging
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
@@ -20,6 +25,9 @@ from apscheduler.jobstores.memory import MemoryJobStore
 from ..core.database_manager import get_db_connection, get_db_transaction
 from .fetch_config_service import FetchConfigService, FetchConfig, FrequencyType
 from .fetch_limit_service import FetchLimitService
+from .subscription_service import SubscriptionService
+from .subscription_fetch_engine import subscription_fetch_engine
+from .feed_poll_schedule_service import feed_poll_schedule_service
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -52,10 +60,19 @@ class FetchTask:
 class AutoFetchScheduler:
     """自动拉取调度器"""
     
-    def __init__(self, db_path: str = "data/rss_subscriber.db"):
+    def __init__(self, db_path: str = "data/rss_subscriber.db", dispatch_window_minutes: int = 30):
+        """
+        初始化调度器
+        
+        Args:
+            db_path: 数据库路径
+            dispatch_window_minutes: 派发窗口（分钟），用户的拉取在偏好整点后的窗口内按用户ID确定性地分散
+        """
         self.db_path = db_path
+        self.dispatch_window_minutes = dispatch_window_minutes
         self.config_service = FetchConfigService(db_path)
         self.limit_service = FetchLimitService(db_path)  # 统一使用FetchLimitService
+        self.subscription_service = SubscriptionService(db_path)
         
         # 配置APScheduler
         self.scheduler = BackgroundScheduler(
@@ -68,6 +85,15 @@ class AutoFetchScheduler:
         # 任务存储
         self.tasks: Dict[str, FetchTask] = {}
         
+        # 订阅批量拉取引擎（长期事件循环，跨调度周期复用）
+        self.fetch_engine = subscription_fetch_engine
+        
+        # Feed自适应轮询计划
+        self.poll_schedule = feed_poll_schedule_service
+        
+        # 派发延迟（实际开始执行 - 计划派发时间）的近期样本
+        self._dispatch_lags: deque = deque(maxlen=200)
+        
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
     
     def start(self):
@@ -78,6 +104,8 @@ class AutoFetchScheduler:
         if not self.scheduler.running:
             self.scheduler.start()
         
+        self.fetch_engine.start()
+        
         # 设置定期检查任务（每分钟检查一次需要调度的用户）
         self.scheduler.add_job(
             self._check_and_schedule_users,
@@ -86,14 +114,18 @@ class AutoFetchScheduler:
             replace_existing=True
         )
         
-        # 设置重试任务检查（每5分钟检查一次需要重试的任务）
+        # 设置Feed级轮询（每分钟领取到期的Feed，按各自的更新节奏拉取）
         self.scheduler.add_job(
-            self._check_retry_tasks,
-            trigger=CronTrigger(minute='*/5'),  # 每5分钟执行一次
-            id='check_retries',
+            self._poll_due_feeds,
+            trigger=CronTrigger(minute='*'),
+            id='poll_due_feeds',
+            max_instances=1,
             replace_existing=True
         )
         
+        # 从任务表重建待重试任务（之后的重试在失败时直接登记）
+        self._restore_retry_tasks()
+        
         logger.info("RSS自动拉取调度器启动完成")
     
     def stop(self):
@@ -101,13 +133,15 @@ class AutoFetchScheduler:
         if self.scheduler.running:
             self.scheduler.shutdown()
             logger.info("RSS自动拉取调度器已停止")
+        self.fetch_engine.stop()
     
     def _check_and_schedule_users(self):
-        """检查并调度需要自动拉取的用户"""
+        """检查并调度需要自动拉取的用户（同一时间到期的用户合并为一个批量任务）"""
         try:
             # 获取所有开启自动拉取的用户
             users = self.config_service.get_auto_fetch_users()
             current_time = datetime.now()
+            due_batches: Dict[datetime, List[str]] = {}
             
             for config in users:
                 # 计算该用户的下次拉取时间
@@ -116,20 +150,29 @@ class AutoFetchScheduler:
                 # 检查是否需要立即执行（允许1分钟的误差）
                 time_diff = abs((next_fetch_time - current_time).total_seconds())
                 if time_diff <= 60:  # 1分钟内
-                    self._schedule_user_fetch(config, next_fetch_time)
+                    task_key = self._create_user_task(config, next_fetch_time)
+                    if task_key:
+                        # 同一整点的用户按各自偏移分到窗口内不同的分钟，同一分钟的用户仍合并为一个批量任务
+                        dispatch_time = next_fetch_time + self._dispatch_offset(config.user_id)
+                        due_batches.setdefault(dispatch_time, []).append(task_key)
+            
+            for scheduled_time, task_keys in due_batches.items():
+                self._schedule_batch_fetch(task_keys, scheduled_time)
                     
         except Exception as e:
             logger.error(f"检查用户调度时出错: {e}")
     
-    def _schedule_user_fetch(self, config: FetchConfig, scheduled_time: datetime):
-        """为用户调度拉取任务"""
+    def _dispatch_offset(self, user_id: int) -> timedelta:
+        """用户的确定性派发偏移（整分钟，同一用户每天落在窗口内的同一位置）"""
+        if self.dispatch_window_minutes <= 0:
+            return timedelta(0)
+        digest = hashlib.sha256(f"fetch-dispatch:{user_id}".encode('utf-8')).digest()
+        return timedelta(minutes=int.from_bytes(digest[:4], 'big') % self.dispatch_window_minutes)
+    
+    def _create_user_task(self, config: FetchConfig, scheduled_time: datetime) -> Optional[str]:
+        """为用户创建拉取任务记录，任务已存在时返回None"""
         task_key = f"auto_{config.user_id}_{scheduled_time.strftime('%Y%m%d_%H')}"
         
-        # 检查任务是否已存在
-        if self._task_exists(task_key):
-            return
-        
-        # 创建任务记录
         task = FetchTask(
             user_id=config.user_id,
             task_type='auto',
@@ -137,61 +180,207 @@ class AutoFetchScheduler:
             scheduled_at=scheduled_time
         )
         
-        self._save_task(task)
+        # task_key唯一索引去重：已存在时不插入
+        if not self._save_task(task):
+            return None
+        return task_key
+    
+    def _schedule_batch_fetch(self, task_keys: List[str], scheduled_time: datetime):
+        """调度一批用户的拉取任务"""
+        self.scheduler.add_job(
+            self._execute_batch_fetch,
+            trigger=DateTrigger(run_date=scheduled_time),
+            args=[task_keys, scheduled_time],
+            id=f"batch_{scheduled_time.strftime('%Y%m%d_%H%M')}_{task_keys[0]}",
+            replace_existing=True
+        )
         
-        # 调度任务执行
+        logger.info(f"已调度 {len(task_keys)} 个用户的自动拉取任务，执行时间: {scheduled_time}")
+    
+    def _schedule_retry(self, task_key: str, retry_at: datetime):
+        """登记重试任务，到期即执行（错过执行时间时仍补执行）"""
         self.scheduler.add_job(
             self._execute_user_fetch,
-            trigger=DateTrigger(run_date=scheduled_time),
+            trigger=DateTrigger(run_date=max(retry_at, datetime.now())),
             args=[task_key],
-            id=task_key,
+            id=f"retry_{task_key}",
+            misfire_grace_time=None,
             replace_existing=True
         )
-        
-        logger.info(f"已调度用户 {config.user_id} 的自动拉取任务，执行时间: {scheduled_time}")
+    
+    def _restore_retry_tasks(self):
+        """启动时从任务表重建待重试任务（已过期的立即执行）"""
+        try:
+            retry_tasks = self._get_retry_tasks()
+            for task_key, retry_at in retry_tasks:
+                self._schedule_retry(task_key, retry_at)
+            if retry_tasks:
+                logger.info(f"已恢复 {len(retry_tasks)} 个待重试任务")
+        except Exception as e:
+            logger.error(f"恢复重试任务时出错: {e}")
     
     def _execute_user_fetch(self, task_key: str):
-        """执行用户拉取任务（统一版本）"""
-        task = self._get_task(task_key)
-        if not task:
-            logger.error(f"任务不存在: {task_key}")
+        """执行单个用户的拉取任务（重试任务使用）"""
+        self._execute_batch_fetch([task_key])
+    
+    def _execute_batch_fetch(self, task_keys: List[str], scheduled_time: Optional[datetime] = None):
+        """执行一批用户的拉取任务：逐个校验配额，再由拉取引擎并发拉取所有订阅源"""
+        if scheduled_time:
+            # 记录派发延迟：线程池排队或前一批任务占满时会变大
+            self._dispatch_lags.append(max(0.0, (datetime.now() - scheduled_time).total_seconds()))
+        
+        batch: Dict[int, List[Tuple[int, str]]] = {}
+        prepared: Dict[str, Tuple[FetchTask, int, int]] = {}
+        
+        for task_key in task_keys:
+            try:
+                task = self._prepare_task(task_key)
+                if not task:
+                    continue
+                
+                total_count, subscriptions = self._load_active_subscriptions(task.user_id)
+                
+                # Feed轮询计划尚未到期的订阅已由Feed级轮询保持最新，本次跳过
+                not_due = self.poll_schedule.get_not_due_subscriptions([sid for sid, _ in subscriptions])
+                if not_due:
+                    logger.info(f"用户 {task.user_id} 跳过未到轮询时间的订阅源: {len(not_due)}个")
+                due = [sub for sub in subscriptions if sub[0] not in not_due]
+                
+                # 没有需要请求的订阅源：不消耗配额，也不记为一次拉取
+                if not due:
+                    logger.info(f"用户 {task.user_id} 没有需要拉取的订阅源，跳过本次任务")
+                    self._update_task_status(
+                        task_key,
+                        TaskStatus.CANCELLED,
+                        success_count=0,
+                        total_count=0,
+                        error_message="没有需要拉取的订阅源"
+                    )
+                    continue
+                
+                # 3. 尝试消耗配额
+                if not self._consume_quota(task_key, task.user_id):
+                    continue
+                
+                batch[task.user_id] = due
+                # 跳过的订阅源不计入成功数和总数
+                prepared[task_key] = (task, total_count - len(not_due))
+                
+            except Exception as e:
+                error_message = f"准备拉取任务 {task_key} 时出错: {e}"
+                logger.error(error_message)
+                self._handle_task_failure(task_key, error_message)
+        
+        if not prepared:
             return
         
+        # 4. 执行拉取：所有用户的订阅源在同一事件循环中并发处理
         try:
-            # 更新任务状态为运行中
-            self._update_task_status(
-                task_key, 
-                TaskStatus.RUNNING,
-                executed_at=datetime.now(),
-                attempt_count=task.attempt_count + 1
-            )
-            
-            user_id = task.user_id
-            logger.info(f"开始执行用户 {user_id} 的拉取任务: {task_key}")
-            
-            # 1. 检查用户配置
-            config = self.config_service.get_user_config(user_id)
-            if not config.auto_fetch_enabled:
-                logger.info(f"用户 {user_id} 已关闭自动拉取")
-                self._update_task_status(task_key, TaskStatus.CANCELLED)
-                return
-            
-            # 2. 使用统一的FetchLimitService检查拉取权限
-            if not self.limit_service.check_can_fetch(user_id, 'auto'):
-                logger.warning(f"用户 {user_id} 已达到当日拉取次数限制")
-                self._update_task_status(task_key, TaskStatus.FAILED, error_message="已达到当日拉取次数限制")
+            reports = self.fetch_engine.run_users(batch)
+        except Exception as e:
+            error_message = f"批量拉取执行出错: {e}"
+            logger.error(error_message)
+            for task_key in prepared:
+                self._handle_task_failure(task_key, error_message)
+            return
+        
+        for task_key, (task, total_count) in prepared.items():
+            report = reports.get(task.user_id)
+            success_count = report.success_count if report else 0
+            self._finish_task(task_key, task.user_id, success_count, total_count)
+    
+    def _poll_due_feeds(self):
+        """Feed级轮询：领取到期的Feed，为开启自动拉取的订阅者拉取（不占用用户的每日拉取配额）"""
+        try:
+            batch = self.poll_schedule.claim_due_subscriptions()
+            if not batch:
                 return
             
-            # 3. 尝试消耗配额
-            attempt_result = self.limit_service.attempt_fetch(user_id, 'auto')
-            if not attempt_result.success:
-                logger.warning(f"用户 {user_id} 拉取配额不足: {attempt_result.message}")
-                self._update_task_status(task_key, TaskStatus.FAILED, error_message=attempt_result.message)
-                return
+            total_feeds = sum(len(subscriptions) for subscriptions in batch.values())
+            logger.info(f"Feed轮询: {len(batch)} 个用户的 {total_feeds} 个订阅到期")
             
-            # 4. 执行拉取
-            success_count, total_count = self._perform_user_fetch(user_id)
+            self.fetch_engine.run_users(batch)
             
+        except Exception as e:
+            logger.error(f"Feed轮询时出错: {e}")
+    
+    def get_dispatch_stats(self) -> Dict[str, Any]:
+        """
+        获取派发状态：待执行的批量任务、派发延迟和对RSShub的限速排队情况
+        
+        Returns:
+            Dict: 派发统计
+        """
+        from . import rss_content_service
+        
+        pending_jobs = [job for job in self.scheduler.get_jobs() if job.id.startswith('batch_')]
+        lags = list(self._dispatch_lags)
+        
+        return {
+            'dispatch_window_minutes': self.dispatch_window_minutes,
+            'pending_batches': len(pending_jobs),
+            'pending_users': sum(len(job.args[0]) for job in pending_jobs),
+            'next_batch_at': min((job.next_run_time for job in pending_jobs), default=None),
+            'pending_retries': sum(1 for job in self.scheduler.get_jobs() if job.id.startswith('retry_')),
+            'lag_seconds': {
+                'last': round(lags[-1], 3) if lags else None,
+                'avg': round(sum(lags) / len(lags), 3) if lags else None,
+                'max': round(max(lags), 3) if lags else None,
+                'samples': len(lags)
+            },
+            **rss_content_service.fetch_engine.get_stats()
+        }
+    
+    def _prepare_task(self, task_key: str) -> Optional[FetchTask]:
+        """标记任务开始执行，并校验用户配置和剩余配额（配额在确定有订阅源需要拉取后才消耗）；不可执行时返回None"""
+        task = self._get_task(task_key)
+        if not task:
+            logger.error(f"任务不存在: {task_key}")
+            return None
+        
+        # 只执行等待中的任务（重试登记后任务可能已被其他路径处理）
+        if task.status != TaskStatus.PENDING:
+            logger.info(f"任务 {task_key} 状态为 {task.status.value}，跳过执行")
+            return None
+        
+        # 更新任务状态为运行中
+        self._update_task_status(
+            task_key, 
+            TaskStatus.RUNNING,
+            executed_at=datetime.now(),
+            attempt_count=task.attempt_count + 1
+        )
+        
+        user_id = task.user_id
+        logger.info(f"开始执行用户 {user_id} 的拉取任务: {task_key}")
+        
+        # 1. 检查用户配置
+        config = self.config_service.get_user_config(user_id)
+        if not config.auto_fetch_enabled:
+            logger.info(f"用户 {user_id} 已关闭自动拉取")
+            self._update_task_status(task_key, TaskStatus.CANCELLED)
+            return None
+        
+        # 2. 使用统一的FetchLimitService检查拉取权限
+        if not self.limit_service.check_can_fetch(user_id, 'auto'):
+            logger.warning(f"用户 {user_id} 已达到当日拉取次数限制")
+            self._update_task_status(task_key, TaskStatus.FAILED, error_message="已达到当日拉取次数限制")
+            return None
+        
+        return task
+    
+    def _consume_quota(self, task_key: str, user_id: int) -> bool:
+        """消耗一次自动拉取配额，配额不足时将任务标记为失败"""
+        attempt_result = self.limit_service.attempt_fetch(user_id, 'auto')
+        if not attempt_result.success:
+            logger.warning(f"用户 {user_id} 拉取配额不足: {attempt_result.message}")
+            self._update_task_status(task_key, TaskStatus.FAILED, error_message=attempt_result.message)
+            return False
+        return True
+    
+    def _finish_task(self, task_key: str, user_id: int, success_count: int, total_count: int):
+        """记录拉取结果并更新任务状态"""
+        try:
             # 5. 使用统一的FetchLimitService记录结果
             self.limit_service.record_fetch_result(user_id, 'auto', success_count > 0)
             
@@ -248,74 +437,21 @@ class AutoFetchScheduler:
                 attempt_count=attempt_count,
                 next_retry_at=next_retry
             )
+            self._schedule_retry(task_key, next_retry)
             logger.info(f"任务 {task_key} 将于 {next_retry} 重试（第{attempt_count}次尝试）")
     
-    def _check_retry_tasks(self):
-        """检查需要重试的任务"""
-        try:
-            current_time = datetime.now()
-            retry_tasks = self._get_retry_tasks(current_time)
-            
-            for task_key in retry_tasks:
-                self.scheduler.add_job(
-                    self._execute_user_fetch,
-                    trigger=DateTrigger(run_date=current_time),
-                    args=[task_key],
-                    id=f"retry_{task_key}",
-                    replace_existing=True
-                )
-                logger.info(f"已调度重试任务: {task_key}")
-                
-        except Exception as e:
-            logger.error(f"检查重试任务时出错: {e}")
-    
-    def _perform_user_fetch(self, user_id: int) -> tuple[int, int]:
-        """执行用户的RSS拉取"""
-        try:
-            from .subscription_service import SubscriptionService
-            from . import rss_content_service
-            
-            subscription_service = SubscriptionService(self.db_path)
-            # 使用全局统一的RSS内容服务实例
-            
-            # 这里需要获取用户订阅列表的方法
-            subscriptions = subscription_service.get_user_subscriptions(user_id)
-            total_count = len(subscriptions.subscriptions)
-            success_count = 0
-            
-            logger.info(f"开始自动拉取用户 {user_id} 的 {total_count} 个订阅源")
-            
-            for subscription in subscriptions.subscriptions:
-                try:
-                    # 检查订阅源是否处于活跃状态
-                    if not subscription.is_active:
-                        logger.debug(f"⏸️ 跳过非活跃订阅源: {subscription.custom_name or subscription.rss_url}")
-                        continue
-                    
-                    # 使用RSSContentService进行拉取
-                    import asyncio
-                    result = asyncio.run(rss_content_service.fetch_and_store_rss_content(
-                        subscription_id=subscription.id,
-                        rss_url=subscription.rss_url,
-                        user_id=user_id
-                    ))
-                    
-                    if result.get('success', False):
-                        success_count += 1
-                        logger.debug(f"✅ 自动拉取成功: {subscription.custom_name or subscription.rss_url}")
-                    else:
-                        logger.warning(f"⚠️ 自动拉取失败: {subscription.custom_name or subscription.rss_url}")
-                        
-                except Exception as e:
-                    logger.error(f"❌ 自动拉取异常: {subscription.custom_name or subscription.rss_url} - {e}")
-                    continue
-            
-            logger.info(f"用户 {user_id} 自动拉取完成: {success_count}/{total_count}")
-            return success_count, total_count
-            
-        except Exception as e:
-            logger.error(f"用户 {user_id} 自动拉取失败: {e}")
-            return 0, 0
+    def _load_active_subscriptions(self, user_id: int) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        获取用户需要拉取的订阅源（全部活跃订阅，不分页）
+        
+        Returns:
+            Tuple[int, List]: (订阅总数, 活跃订阅的 (subscription_id, rss_url) 列表)
+        """
+        total_count = self.subscription_service.count_user_subscriptions(user_id)
+        active = list(self.subscription_service.iter_active_feed_subscriptions(user_id))
+        
+        logger.info(f"用户 {user_id} 待拉取订阅源: {len(active)}/{total_count}")
+        return total_count, active
     
     def _update_subscription_last_update(self, subscription_id: int):
         """更新订阅的最后更新时间"""
@@ -328,19 +464,12 @@ class AutoFetchScheduler:
             """, (datetime.now(), subscription_id))
     
     # 数据库操作方法
-    def _task_exists(self, task_key: str) -> bool:
-        """检查任务是否存在"""
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM fetch_task_logs WHERE task_key = ?", (task_key,))
-            return cursor.fetchone()[0] > 0
-    
-    def _save_task(self, task: FetchTask):
-        """保存任务到数据库"""
+    def _save_task(self, task: FetchTask) -> bool:
+        """保存任务到数据库，task_key已存在时不插入并返回False"""
         with get_db_transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                INSERT INTO fetch_task_logs 
+                INSERT OR IGNORE INTO fetch_task_logs 
                 (user_id, task_type, task_key, scheduled_at, status, max_attempts)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (
@@ -351,6 +480,7 @@ class AutoFetchScheduler:
                 task.status.value,
                 task.max_attempts
             ))
+            return cursor.rowcount > 0
     
     def _get_task(self, task_key: str) -> Optional[FetchTask]:
         """获取任务信息"""
@@ -420,20 +550,19 @@ class AutoFetchScheduler:
             sql = f"UPDATE fetch_task_logs SET {', '.join(update_fields)} WHERE task_key = ?"
             cursor.execute(sql, update_values)
     
-    def _get_retry_tasks(self, current_time: datetime) -> List[str]:
-        """获取需要重试的任务"""
+    def _get_retry_tasks(self) -> List[Tuple[str, datetime]]:
+        """获取所有待重试的任务及其重试时间"""
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT task_key
+                SELECT task_key, next_retry_at
                 FROM fetch_task_logs
                 WHERE status = 'pending' 
                   AND next_retry_at IS NOT NULL 
-                  AND next_retry_at <= ?
                   AND attempt_count < max_attempts
-            """, (current_time,))
+            """)
             
-            return [row[0] for row in cursor.fetchall()]
+            return [(row[0], datetime.fromisoformat(row[1])) for row in cursor.fetchall()]
     
     def _check_daily_limit(self, user_id: int, daily_limit: int) -> bool:
         """检查用户当日拉取次数是否超限（使用统一服务）"""
@@ -10,7 +10,8 @@ from typing import Optional, Tuple, Dict, Any
 from datetime import datetime
 from loguru import logger
 
-from ..core.database_manager import get_db_connection, get_db_transaction
+from ..core.async_database import async_db
+from ..core.write_queue import write_queue
 
 
 class ContentDeduplicationService:
@@ -62,20 +63,16 @@ class ContentDeduplicationService:
             Optional[int]: 如果存在返回content_id，否则返回None
         """
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    SELECT id FROM shared_contents 
-                    WHERE content_hash = ?
-                """, (content_hash,))
-                
-                result = cursor.fetchone()
-                if result:
-                    logger.debug(f"发现重复内容: hash={content_hash}, id={result[0]}")
-                    return result[0]
-                
-                return None
+            result = await async_db.fetch_one("""
+                SELECT id FROM shared_contents 
+                WHERE content_hash = ?
+            """, (content_hash,))
+            
+            if result:
+                logger.debug(f"发现重复内容: hash={content_hash}, id={result[0]}")
+                return result[0]
+            
+            return None
                 
         except Exception as e:
             logger.error(f"检查内容是否存在失败: {e}")
@@ -98,84 +95,112 @@ class ContentDeduplicationService:
                 content_data.get('original_link', '')
             )
             
-            # 检查是否已存在
-            existing_id = await self.check_content_exists(content_hash)
-            if existing_id:
-                return existing_id, False
+            # 单条语句幂等写入：依赖content_hash唯一约束，并发写入同一内容时不会重复建行
+            content_id, is_new = await write_queue.run(self.upsert_content, content_data, content_hash)
             
-            # 创建新内容
-            content_id = await self._create_shared_content(content_data, content_hash)
-            return content_id, True
+            if is_new:
+                logger.info(f"创建新共享内容: id={content_id}, title={content_data.get('title', '')[:50]}...")
+            else:
+                logger.debug(f"发现重复内容: hash={content_hash}, id={content_id}")
+            return content_id, is_new
             
         except Exception as e:
             logger.error(f"查找或创建内容失败: {e}")
             raise
     
-    async def _create_shared_content(self, content_data: Dict[str, Any], content_hash: str) -> int:
-        """创建新的共享内容"""
-        try:
-            with get_db_transaction() as conn:
-                cursor = conn.cursor()
-                
-                # 准备插入数据
-                insert_data = {
-                    'content_hash': content_hash,
-                    'title': content_data.get('title', ''),
-                    'description': content_data.get('description', ''),
-                    'description_text': content_data.get('description_text', ''),
-                    'author': content_data.get('author', ''),
-                    'published_at': content_data.get('published_at', datetime.now()),
-                    'original_link': content_data.get('original_link', ''),
-                    'content_type': content_data.get('content_type', 'text'),
-                    'platform': content_data.get('platform', ''),
-                    'guid': content_data.get('guid', ''),
-                    'feed_title': content_data.get('feed_title', ''),
-                    'feed_description': content_data.get('feed_description', ''),
-                    'feed_link': content_data.get('feed_link', ''),
-                    'feed_image_url': content_data.get('feed_image_url', ''),
-                    'feed_last_build_date': content_data.get('feed_last_build_date'),
-                    'cover_image': content_data.get('cover_image', ''),
-                    'created_at': datetime.now(),
-                    'updated_at': datetime.now()
-                }
-                
-                # 执行插入
-                cursor.execute("""
-                    INSERT INTO shared_contents (
-                        content_hash, title, description, description_text, author,
-                        published_at, original_link, content_type, platform, guid,
-                        feed_title, feed_description, feed_link, feed_image_url,
-                        feed_last_build_date, cover_image, created_at, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    insert_data['content_hash'],
-                    insert_data['title'],
-                    insert_data['description'],
-                    insert_data['description_text'],
-                    insert_data['author'],
-                    insert_data['published_at'],
-                    insert_data['original_link'],
-                    insert_data['content_type'],
-                    insert_data['platform'],
-                    insert_data['guid'],
-                    insert_data['feed_title'],
-                    insert_data['feed_description'],
-                    insert_data['feed_link'],
-                    insert_data['feed_image_url'],
-                    insert_data['feed_last_build_date'],
-                    insert_data['cover_image'],
-                    insert_data['created_at'],
-                    insert_data['updated_at']
-                ))
-                
-                content_id = cursor.lastrowid
-                
-                logger.info(f"创建新共享内容: id={content_id}, title={insert_data['title'][:50]}...")
-                return content_id
-                
-        except Exception as e:
-            logger.error(f"创建共享内容失败: {e}")
-            raise
+    # shared_contents插入列（单条创建与批量入库共用）
+    CONTENT_COLUMNS = (
+        'content_hash', 'title', 'description', 'description_text', 'author',
+        'published_at', 'original_link', 'content_type', 'platform', 'guid',
+        'feed_title', 'feed_description', 'feed_link', 'feed_image_url',
+        'feed_last_build_date', 'cover_image', 'created_at', 'updated_at'
+    )
+    
+    def build_content_row(
+        self,
+        content_data: Dict[str, Any],
+        content_hash: str,
+        now: Optional[datetime] = None
+    ) -> Tuple:
+        """
+        构建shared_contents插入行（顺序与CONTENT_COLUMNS一致）
+        
+        Args:
+            content_data: 内容数据字典
+            content_hash: 内容哈希值
+            now: 创建时间，默认当前时间
+            
+        Returns:
+            Tuple: 插入参数
+        """
+        now = now or datetime.now()
+        return (
+            content_hash,
+            content_data.get('title', ''),
+            content_data.get('description', ''),
+            content_data.get('description_text', ''),
+            content_data.get('author', ''),
+            content_data.get('published_at', now),
+            content_data.get('original_link', ''),
+            content_data.get('content_type', 'text'),
+            content_data.get('platform', ''),
+            content_data.get('guid', ''),
+            content_data.get('feed_title', ''),
+            content_data.get('feed_description', ''),
+            content_data.get('feed_link', ''),
+            content_data.get('feed_image_url', ''),
+            content_data.get('feed_last_build_date'),
+            content_data.get('cover_image', ''),
+            now,
+            now
+        )
+    
+    @property
+    def content_insert_sql(self) -> str:
+        """shared_contents插入语句"""
+        return (
+            f"INSERT INTO shared_contents ({', '.join(self.CONTENT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(self.CONTENT_COLUMNS))})"
+        )
+    
+    @property
+    def content_upsert_sql(self) -> str:
+        """
+        shared_contents幂等写入语句
+        哈希冲突时做一次无实际变化的更新，使RETURNING同样返回已有行；
+        第二列比较created_at与本次写入时间，标记是否为新建
+        """
+        return (
+            f"{self.content_insert_sql} "
+            "ON CONFLICT(content_hash) DO UPDATE SET content_hash = excluded.content_hash "
+            "RETURNING id, created_at = ?"
+        )
+    
+    def upsert_content(
+        self,
+        conn,
+        content_data: Dict[str, Any],
+        content_hash: str,
+        now: Optional[datetime] = None
+    ) -> Tuple[int, bool]:
+        """
+        写入或复用共享内容（在调用方的事务中执行）
+        
+        Args:
+            conn: 数据库连接（写事务内）
+            content_data: 内容数据字典
+            content_hash: 内容哈希值
+            now: 创建时间，默认当前时间
+            
+        Returns:
+            Tuple[int, bool]: (content_id, is_new)
+        """
+        now = now or datetime.now()
+        row = conn.execute(
+            self.content_upsert_sql,
+            (*self.build_content_row(content_data, content_hash, now), now)
+        ).fetchone()
+        return row[0], bool(row[1])
     
     def _normalize_text(self, text: str) -> str:
         """标准化文本内容"""
@@ -223,29 +248,26 @@ class ContentDeduplicationService:
     async def get_content_stats(self) -> Dict[str, Any]:
         """获取内容去重统计信息"""
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # 统计共享内容数量
-                cursor.execute("SELECT COUNT(*) FROM shared_contents")
-                total_shared_contents = cursor.fetchone()[0]
-                
-                # 统计用户关系数量
-                cursor.execute("SELECT COUNT(*) FROM user_content_relations WHERE expires_at > datetime('now')")
-                active_relations = cursor.fetchone()[0]
-                
-                # 计算去重效率
-                if total_shared_contents > 0:
-                    dedup_ratio = active_relations / total_shared_contents
-                else:
-                    dedup_ratio = 0
-                
-                return {
-                    'total_shared_contents': total_shared_contents,
-                    'active_user_relations': active_relations,
-                    'average_users_per_content': round(dedup_ratio, 2),
-                    'storage_efficiency': f"{(1 - 1/max(dedup_ratio, 1)) * 100:.1f}%" if dedup_ratio > 1 else "0%"
-                }
+            # 统计共享内容数量
+            total_shared_contents = (await async_db.fetch_one("SELECT COUNT(*) FROM shared_contents"))[0]
+            
+            # 统计用户关系数量
+            active_relations = (await async_db.fetch_one(
+                "SELECT COUNT(*) FROM user_content_relations WHERE expires_at > datetime('now')"
+            ))[0]
+            
+            # 计算去重效率
+            if total_shared_contents > 0:
+                dedup_ratio = active_relations / total_shared_contents
+            else:
+                dedup_ratio = 0
+            
+            return {
+                'total_shared_contents': total_shared_contents,
+                'active_user_relations': active_relations,
+                'average_users_per_content': round(dedup_ratio, 2),
+                'storage_efficiency': f"{(1 - 1/max(dedup_ratio, 1)) * 100:.1f}%" if dedup_ratio > 1 else "0%"
+            }
                 
         except Exception as e:
             logger.error(f"获取内容统计失败: {e}")
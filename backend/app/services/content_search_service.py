@@ -0,0 +1,274 @@
+"""
+内容全文检索服务
+基于SQLite FTS5（trigram分词，支持中文子串匹配）为shared_contents建立外部内容索引：
+- 触发器随内容写入/删除增量维护索引，过期清理后做增量合并
+- 检索按bm25相关度叠加发布时间衰减排序，返回命中片段高亮
+- 关键词短于3个字符（trigram无法匹配）或FTS5不可用时回退到LIKE查询
+"""
+
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from ..core.database_manager import get_db_transaction
+
+
+class ContentSearchService:
+    """内容全文检索服务"""
+
+    # trigram分词的最短可检索长度
+    MIN_TERM_LENGTH = 3
+
+    def __init__(
+        self,
+        db_path: str = "data/rss_subscriber.db",
+        recency_half_life_days: float = 30.0,
+        merge_pages: int = 500
+    ):
+        """
+        初始化检索服务
+
+        Args:
+            db_path: 数据库路径
+            recency_half_life_days: 时间衰减半衰期（天），越旧的内容相关度打折越多
+            merge_pages: 每次增量合并处理的索引页数
+        """
+        self.db_path = db_path
+        self.recency_half_life_days = recency_half_life_days
+        self.merge_pages = merge_pages
+        self.fts_enabled = False
+        self._init_search_index()
+
+    def _init_search_index(self):
+        """初始化FTS5索引表和同步触发器"""
+        try:
+            # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'shared_contents'")
+                if not cursor.fetchone():
+                    # 共享内容表尚未创建，由建表脚本负责
+                    return
+
+                cursor.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS shared_contents_fts USING fts5(
+                        title, description_text, author,
+                        content='shared_contents', content_rowid='id',
+                        tokenize='trigram'
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TRIGGER IF NOT EXISTS shared_contents_fts_insert
+                    AFTER INSERT ON shared_contents
+                    BEGIN
+                        INSERT INTO shared_contents_fts (rowid, title, description_text, author)
+                        VALUES (NEW.id, NEW.title, NEW.description_text, NEW.author);
+                    END
+                """)
+
+                cursor.execute("""
+                    CREATE TRIGGER IF NOT EXISTS shared_contents_fts_delete
+                    AFTER DELETE ON shared_contents
+                    BEGIN
+                        INSERT INTO shared_contents_fts (shared_contents_fts, rowid, title, description_text, author)
+                        VALUES ('delete', OLD.id, OLD.title, OLD.description_text, OLD.author);
+                    END
+                """)
+
+                # 只在检索字段变化时重建条目，AI字段回写不触发索引更新
+                cursor.execute("""
+                    CREATE TRIGGER IF NOT EXISTS shared_contents_fts_update
+                    AFTER UPDATE OF title, description_text, author ON shared_contents
+                    BEGIN
+                        INSERT INTO shared_contents_fts (shared_contents_fts, rowid, title, description_text, author)
+                        VALUES ('delete', OLD.id, OLD.title, OLD.description_text, OLD.author);
+                        INSERT INTO shared_contents_fts (rowid, title, description_text, author)
+                        VALUES (NEW.id, NEW.title, NEW.description_text, NEW.author);
+                    END
+                """)
+
+                # 首次创建索引时为已有内容建立索引
+                cursor.execute("SELECT COUNT(*) FROM shared_contents_fts_docsize")
+                indexed = cursor.fetchone()[0]
+                if indexed == 0:
+                    cursor.execute("SELECT COUNT(*) FROM shared_contents")
+                    if cursor.fetchone()[0] > 0:
+                        cursor.execute("INSERT INTO shared_contents_fts (shared_contents_fts) VALUES ('rebuild')")
+                        logger.info("🔎 全文检索索引已重建")
+
+                conn.commit()
+                self.fts_enabled = True
+
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ FTS5全文检索不可用，搜索将使用LIKE查询: {e}")
+
+    def build_match_query(self, keyword: str) -> Optional[str]:
+        """
+        把用户关键词转换为FTS5 MATCH表达式
+
+        Args:
+            keyword: 用户输入的关键词（空白分隔的多个词按AND匹配）
+
+        Returns:
+            Optional[str]: MATCH表达式，任一词短于trigram最短长度时返回None
+        """
+        terms = keyword.split()
+        if not terms or any(len(term) < self.MIN_TERM_LENGTH for term in terms):
+            return None
+        return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def search(
+        self,
+        conn: sqlite3.Connection,
+        user_id: int,
+        keyword: str,
+        filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        检索用户内容（在调用方的连接上同步执行）
+
+        Args:
+            conn: 数据库连接
+            user_id: 用户ID
+            keyword: 搜索关键词
+            filters: 筛选条件（platform, limit, offset）
+
+        Returns:
+            List[Dict]: 按相关度排序的结果，FTS命中时包含snippet高亮片段
+        """
+        match_query = self.build_match_query(keyword) if self.fts_enabled else None
+        if match_query is None:
+            return self._search_like(conn, user_id, keyword, filters)
+
+        # bm25越小越相关（负数），乘以时间衰减因子让旧内容的相关度向0靠拢
+        query = """
+            SELECT
+                c.id as content_id,
+                c.title,
+                c.author,
+                c.published_at,
+                c.original_link,
+                c.description_text,
+                c.platform,
+                c.content_type,
+                r.subscription_id,
+                r.is_read,
+                r.is_favorited,
+                us.custom_name as subscription_name,
+                snippet(shared_contents_fts, -1, '<mark>', '</mark>', '…', 24) as snippet,
+                bm25(shared_contents_fts, 10.0, 1.0, 3.0)
+                    / (1.0 + MAX(julianday('now') - julianday(c.published_at), 0) / ?) as score
+            FROM shared_contents_fts
+            JOIN shared_contents c ON c.id = shared_contents_fts.rowid
+            JOIN user_content_relations r ON c.id = r.content_id
+            LEFT JOIN user_subscriptions us ON r.subscription_id = us.id
+            WHERE shared_contents_fts MATCH ?
+              AND r.user_id = ?
+              AND r.expires_at > datetime('now')
+        """
+        params: List[Any] = [self.recency_half_life_days, match_query, user_id]
+
+        if filters.get('platform'):
+            query += " AND c.platform = ?"
+            params.append(filters['platform'])
+
+        query += " ORDER BY score ASC, c.published_at DESC LIMIT ? OFFSET ?"
+        params.extend([filters.get('limit', 20), filters.get('offset', 0)])
+
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+
+        return [
+            {**self._row_to_result(row), 'snippet': row[12], 'score': round(-row[13], 4)}
+            for row in cursor.fetchall()
+        ]
+
+    def _search_like(
+        self,
+        conn: sqlite3.Connection,
+        user_id: int,
+        keyword: str,
+        filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """LIKE回退查询（短关键词或FTS5不可用）"""
+        query = """
+            SELECT
+                c.id as content_id,
+                c.title,
+                c.author,
+                c.published_at,
+                c.original_link,
+                c.description_text,
+                c.platform,
+                c.content_type,
+                r.subscription_id,
+                r.is_read,
+                r.is_favorited,
+                us.custom_name as subscription_name
+            FROM shared_contents c
+            JOIN user_content_relations r ON c.id = r.content_id
+            LEFT JOIN user_subscriptions us ON r.subscription_id = us.id
+            WHERE r.user_id = ?
+              AND r.expires_at > datetime('now')
+              AND (c.title LIKE ? OR c.description_text LIKE ? OR c.author LIKE ?)
+        """
+        params: List[Any] = [user_id, f'%{keyword}%', f'%{keyword}%', f'%{keyword}%']
+
+        if filters.get('platform'):
+            query += " AND c.platform = ?"
+            params.append(filters['platform'])
+
+        query += " ORDER BY c.published_at DESC LIMIT ? OFFSET ?"
+        params.extend([filters.get('limit', 20), filters.get('offset', 0)])
+
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+
+        return [{**self._row_to_result(row), 'snippet': None} for row in cursor.fetchall()]
+
+    @staticmethod
+    def _row_to_result(row) -> Dict[str, Any]:
+        """转换公共结果字段"""
+        return {
+            'content_id': row[0],
+            'title': row[1],
+            'author': row[2],
+            'published_at': row[3],
+            'original_link': row[4],
+            'description_text': row[5],
+            'platform': row[6],
+            'content_type': row[7],
+            'subscription_id': row[8],
+            'is_read': bool(row[9]),
+            'is_favorited': bool(row[10]),
+            'subscription_name': row[11]
+        }
+
+    def merge_index(self) -> bool:
+        """
+        增量合并索引段（过期清理大量删除内容后调用，回收已删除条目占用的空间）
+
+        Returns:
+            bool: 是否执行成功
+        """
+        if not self.fts_enabled:
+            return False
+
+        try:
+            with get_db_transaction() as conn:
+                conn.execute(
+                    "INSERT INTO shared_contents_fts (shared_contents_fts, rank) VALUES ('merge', ?)",
+                    (self.merge_pages,)
+                )
+            return True
+
+        except Exception as e:
+            logger.warning(f"⚠️ 全文检索索引合并失败: {e}")
+            return False
+
+
+# 创建全局服务实例
+content_search_service = ContentSearchService()
@@ -0,0 +1,174 @@
+"""
+内容标签倒排索引服务
+把shared_contents.tags（JSON数组）和topics规范化为标签字典 + 内容标签关联表：
+- tag_dictionary：标签名 -> 标签ID
+- content_tags：(content_id, kind, tag_id)，kind为'tag'（标签）或'topic'（主题）
+AI结果写入时同步维护，标签筛选和标签统计变为索引连接，不再逐行展开JSON
+"""
+
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+
+class TagKind:
+    """内容标签类型"""
+    TAG = 'tag'
+    TOPIC = 'topic'
+
+
+# 不计入标签统计的默认主题
+DEFAULT_TOPIC = '其他'
+
+
+class ContentTagIndexService:
+    """内容标签倒排索引服务"""
+
+    def __init__(self, db_path: str = "data/rss_subscriber.db"):
+        self.db_path = db_path
+        self._init_index_tables()
+
+    def _init_index_tables(self):
+        """初始化标签字典和内容标签关联表"""
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tag_dictionary (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name VARCHAR(100) NOT NULL UNIQUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS content_tags (
+                    content_id INTEGER NOT NULL,
+                    kind VARCHAR(10) NOT NULL,
+                    tag_id INTEGER NOT NULL,
+                    PRIMARY KEY (content_id, kind, tag_id)
+                ) WITHOUT ROWID
+            """)
+
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_content_tags_tag
+                ON content_tags (tag_id, kind, content_id)
+            """)
+
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'shared_contents'")
+            if cursor.fetchone():
+                # 内容删除时同步移除标签关联
+                cursor.execute("""
+                    CREATE TRIGGER IF NOT EXISTS content_tags_cleanup
+                    AFTER DELETE ON shared_contents
+                    BEGIN
+                        DELETE FROM content_tags WHERE content_id = OLD.id;
+                    END
+                """)
+
+                cursor.execute("SELECT 1 FROM content_tags LIMIT 1")
+                if not cursor.fetchone():
+                    self._backfill(cursor)
+
+            conn.commit()
+
+    def _backfill(self, cursor):
+        """首次创建索引时从已有内容的tags/topics字段回填"""
+        cursor.execute("""
+            INSERT OR IGNORE INTO tag_dictionary (name)
+            SELECT DISTINCT TRIM(j.value)
+            FROM shared_contents c, json_each(c.tags) j
+            WHERE json_valid(c.tags) AND j.type = 'text' AND TRIM(j.value) != ''
+            UNION
+            SELECT DISTINCT TRIM(c.topics)
+            FROM shared_contents c
+            WHERE c.topics IS NOT NULL AND TRIM(c.topics) NOT IN ('', ?)
+        """, (DEFAULT_TOPIC,))
+
+        cursor.execute("""
+            INSERT OR IGNORE INTO content_tags (content_id, kind, tag_id)
+            SELECT c.id, ?, d.id
+            FROM shared_contents c, json_each(c.tags) j
+            JOIN tag_dictionary d ON d.name = TRIM(j.value)
+            WHERE json_valid(c.tags) AND j.type = 'text'
+        """, (TagKind.TAG,))
+        tag_rows = cursor.rowcount
+
+        cursor.execute("""
+            INSERT OR IGNORE INTO content_tags (content_id, kind, tag_id)
+            SELECT c.id, ?, d.id
+            FROM shared_contents c
+            JOIN tag_dictionary d ON d.name = TRIM(c.topics)
+            WHERE TRIM(c.topics) != ?
+        """, (TagKind.TOPIC, DEFAULT_TOPIC))
+        topic_rows = cursor.rowcount
+
+        if tag_rows or topic_rows:
+            logger.info(f"🏷️ 标签倒排索引回填完成: 标签关联{tag_rows}条, 主题关联{topic_rows}条")
+
+    @staticmethod
+    def parse_tags(tags: Any) -> List[str]:
+        """解析标签字段（JSON数组字符串或列表），去空白、去重并保持顺序"""
+        if isinstance(tags, str):
+            try:
+                tags = json.loads(tags) if tags.strip() else []
+            except json.JSONDecodeError:
+                return []
+        if not isinstance(tags, list):
+            return []
+
+        names = [str(tag).strip() for tag in tags if isinstance(tag, str)]
+        return list(dict.fromkeys(name for name in names if name))
+
+    def index_content_tags(
+        self,
+        conn: sqlite3.Connection,
+        content_id: int,
+        tags: Any,
+        topics: Optional[str]
+    ) -> Dict[str, List[int]]:
+        """
+        重建单条内容的标签关联（在调用方的事务中执行）
+
+        Args:
+            conn: 数据库连接（写事务内）
+            content_id: 内容ID
+            tags: 标签JSON数组字符串或列表
+            topics: 主题字符串
+
+        Returns:
+            Dict[str, List[int]]: kind -> 标签ID列表
+        """
+        entries = {TagKind.TAG: self.parse_tags(tags), TagKind.TOPIC: []}
+        topic = (topics or '').strip()
+        if topic and topic != DEFAULT_TOPIC:
+            entries[TagKind.TOPIC] = [topic]
+
+        cursor = conn.cursor()
+        tag_ids = self._resolve_tag_ids(cursor, entries[TagKind.TAG] + entries[TagKind.TOPIC])
+
+        cursor.execute("DELETE FROM content_tags WHERE content_id = ?", (content_id,))
+        indexed = {kind: [tag_ids[name] for name in names] for kind, names in entries.items()}
+        cursor.executemany(
+            "INSERT OR IGNORE INTO content_tags (content_id, kind, tag_id) VALUES (?, ?, ?)",
+            [(content_id, kind, tag_id) for kind, ids in indexed.items() for tag_id in ids]
+        )
+        return indexed
+
+    def _resolve_tag_ids(self, cursor, names: List[str]) -> Dict[str, int]:
+        """查询标签ID，不存在的标签写入字典"""
+        unique = list(dict.fromkeys(names))
+        if not unique:
+            return {}
+
+        cursor.executemany("INSERT OR IGNORE INTO tag_dictionary (name) VALUES (?)", [(name,) for name in unique])
+        placeholders = ','.join('?' * len(unique))
+        cursor.execute(f"SELECT name, id FROM tag_dictionary WHERE name IN ({placeholders})", unique)
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+# 创建全局服务实例
+content_tag_index_service = ContentTagIndexService()
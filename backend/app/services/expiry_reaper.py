@@ -0,0 +1,226 @@
+"""
+过期内容后台清理器
+代替一次性的大DELETE（全表反连接期间长时间持有写锁）：
+- 过期关系按expires_at索引分块删除
+- 孤立内容按rowid区间分块扫描删除，同步删除媒体项和ChromaDB中的内容向量
+- 每块作为一个写操作经单写者队列提交，块之间让出写锁，进度可随时查询
+用户标签计数在关系删除时才减少，清理周期即过期关系在标签计数中的最大滞后
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from ..core.write_queue import write_queue
+from .content_search_service import content_search_service
+
+
+class ExpiryReaper:
+    """过期内容后台清理器"""
+
+    def __init__(
+        self,
+        db_path: str = "data/rss_subscriber.db",
+        chunk_size: int = 500,
+        pause_seconds: float = 0.05,
+        interval_minutes: float = 30
+    ):
+        """
+        初始化清理器
+
+        Args:
+            db_path: 数据库路径
+            chunk_size: 每块删除的关系数 / 每块扫描的内容ID区间长度
+            pause_seconds: 块之间的让出间隔（秒）
+            interval_minutes: 后台清理周期（分钟），也是过期关系在用户标签计数中的最大滞后
+        """
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+        self.interval_seconds = interval_minutes * 60
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._run_lock = threading.Lock()
+        self._pending_vector_ids: List[int] = []
+        self._progress: Dict[str, Any] = {'phase': 'idle'}
+        self._last_run: Optional[Dict[str, Any]] = None
+
+        self._drop_legacy_trigger()
+
+    def _drop_legacy_trigger(self):
+        """移除旧的插入时全表清理触发器（每插入一条关系都做一次全表反连接）"""
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DROP TRIGGER IF EXISTS cleanup_expired_relations")
+            conn.commit()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台清理线程"""
+        if self.running:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="expiry-reaper", daemon=True)
+        self._thread.start()
+        logger.info(f"🧹 过期内容清理器已启动: 周期{self.interval_seconds / 60:.0f}分钟, 每块{self.chunk_size}条")
+
+    def stop(self, timeout: float = 30):
+        """停止后台清理线程（当前块完成后退出）"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _loop(self):
+        # 启动后先清理一轮（停机期间过期的关系），之后每个周期一轮
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"过期内容清理失败: {e}")
+            self._stop_event.wait(self.interval_seconds)
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        执行一轮清理（阻塞，后台线程和管理接口共用；同一时间只有一轮在执行）
+
+        Returns:
+            Dict: 本轮清理统计
+        """
+        with self._run_lock:
+            started = time.monotonic()
+            report = {
+                'started_at': datetime.now().isoformat(),
+                'relations_deleted': 0,
+                'contents_deleted': 0,
+                'media_deleted': 0,
+                'vectors_deleted': 0,
+                'chunks': 0
+            }
+            self._progress = {'phase': 'relations', **report}
+
+            # 1. 过期关系：每块删除一批，直到不足一块
+            while not self._stop_event.is_set():
+                content_ids = write_queue.run_sync(self._delete_expired_relations_chunk, self.chunk_size)
+                self._advance(report, relations_deleted=len(content_ids))
+                if len(content_ids) < self.chunk_size:
+                    break
+                self._stop_event.wait(self.pause_seconds)
+
+            # 2. 孤立内容：按rowid区间扫描，区间内没有任何关系的内容连同媒体项和向量一起删除
+            min_id, max_id = write_queue.run_sync(self._content_id_range)
+            self._progress.update(phase='contents', scan_from=min_id, scan_to=max_id)
+            low = (min_id or 1) - 1
+            while max_id is not None and low < max_id and not self._stop_event.is_set():
+                high = low + self.chunk_size
+                content_ids, media_deleted = write_queue.run_sync(self._delete_orphan_contents_chunk, low, high)
+                self._advance(report, contents_deleted=len(content_ids), media_deleted=media_deleted)
+                self._progress['scan_position'] = high
+
+                if content_ids:
+                    report['vectors_deleted'] += self._delete_vectors(content_ids)
+                low = high
+                self._stop_event.wait(self.pause_seconds)
+
+            # 之前失败的向量删除再重试一次
+            if self._pending_vector_ids:
+                report['vectors_deleted'] += self._delete_vectors([])
+
+            # 删除内容时触发器已同步移除索引条目，这里增量合并索引段
+            if report['contents_deleted']:
+                content_search_service.merge_index()
+
+            report['elapsed_seconds'] = round(time.monotonic() - started, 2)
+            report['interrupted'] = self._stop_event.is_set()
+            self._progress = {'phase': 'idle'}
+            self._last_run = report
+
+            logger.info(
+                f"🧹 过期清理完成: 关系={report['relations_deleted']}, 内容={report['contents_deleted']}, "
+                f"媒体项={report['media_deleted']}, 向量={report['vectors_deleted']}, "
+                f"{report['chunks']}块, 耗时{report['elapsed_seconds']}秒"
+            )
+            return report
+
+    def _advance(self, report: Dict[str, Any], **counts: int):
+        """累计一块的清理数量并同步到进度"""
+        for key, value in counts.items():
+            report[key] += value
+        report['chunks'] += 1
+        self._progress.update(report)
+
+    @staticmethod
+    def _delete_expired_relations_chunk(conn: sqlite3.Connection, limit: int) -> List[int]:
+        """删除一块过期关系（写队列操作），返回被删关系对应的内容ID"""
+        cursor = conn.execute("""
+            DELETE FROM user_content_relations
+            WHERE id IN (
+                SELECT id FROM user_content_relations
+                WHERE expires_at < datetime('now')
+                LIMIT ?
+            )
+            RETURNING content_id
+        """, (limit,))
+        return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def _content_id_range(conn: sqlite3.Connection) -> Tuple[Optional[int], Optional[int]]:
+        """本轮扫描的内容ID范围（之后新入库的内容都有关系，不需要扫描）"""
+        row = conn.execute("SELECT MIN(id), MAX(id) FROM shared_contents").fetchone()
+        return row[0], row[1]
+
+    @staticmethod
+    def _delete_orphan_contents_chunk(conn: sqlite3.Connection, low: int, high: int) -> Tuple[List[int], int]:
+        """删除id在(low, high]区间内没有任何关系的内容及其媒体项（写队列操作）"""
+        cursor = conn.execute("""
+            SELECT c.id FROM shared_contents c
+            WHERE c.id > ? AND c.id <= ?
+              AND NOT EXISTS (SELECT 1 FROM user_content_relations r WHERE r.content_id = c.id)
+        """, (low, high))
+        content_ids = [row[0] for row in cursor.fetchall()]
+        if not content_ids:
+            return [], 0
+
+        placeholders = ','.join('?' * len(content_ids))
+        media_deleted = conn.execute(
+            f"DELETE FROM shared_content_media_items WHERE content_id IN ({placeholders})", content_ids
+        ).rowcount
+        conn.execute(f"DELETE FROM shared_contents WHERE id IN ({placeholders})", content_ids)
+        return content_ids, media_deleted
+
+    def _delete_vectors(self, content_ids: List[int]) -> int:
+        """删除已提交内容的向量，失败的ID留到下一块重试"""
+        # 延迟导入：向量服务加载模型较重，只在真正需要删除时初始化
+        from .ai_service_manager import ai_service_manager
+
+        pending = self._pending_vector_ids + content_ids
+        try:
+            deleted = ai_service_manager.delete_content_vectors(pending)
+            self._pending_vector_ids = []
+            return deleted
+        except Exception as e:
+            logger.warning(f"⚠️ 删除内容向量失败，稍后重试({len(pending)}条): {e}")
+            self._pending_vector_ids = pending
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取清理器状态：当前进度和上一轮统计"""
+        return {
+            'running': self.running,
+            'progress': dict(self._progress),
+            'last_run': self._last_run,
+            'pending_vectors': len(self._pending_vector_ids)
+        }
+
+
+# 创建全局清理器实例
+expiry_reaper = ExpiryReaper()
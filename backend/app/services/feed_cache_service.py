@@ -0,0 +1,187 @@
+"""
+Feed条件请求缓存服务
+持久化每个Feed URL的ETag、Last-Modified和响应体哈希，
+配合If-None-Match/If-Modified-Since实现条件GET，未变化的Feed跳过解析与入库
+"""
+
+import hashlib
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+from loguru import logger
+
+from ..core.database_manager import get_db_connection, get_db_transaction
+
+
+@dataclass
+class FeedCacheEntry:
+    """Feed缓存条目"""
+    feed_url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+    last_status: Optional[int] = None
+    fetched_at: Optional[datetime] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """构建条件请求头"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class FeedCacheService:
+    """Feed条件请求缓存服务"""
+
+    def __init__(self, db_path: str = "data/rss_subscriber.db"):
+        self.db_path = db_path
+        self._init_cache_tables()
+
+    def _init_cache_tables(self):
+        """初始化Feed缓存表"""
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            # Feed级别的HTTP缓存校验信息
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS feed_fetch_cache (
+                    feed_url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body_hash VARCHAR(64),
+                    last_status INTEGER,
+                    fetched_at TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # 订阅级别的入库版本：记录每个订阅最后一次入库的响应体哈希
+            # 同一Feed的新订阅者没有入库记录，因此不会被其他订阅者的304短路
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS subscription_feed_state (
+                    subscription_id INTEGER PRIMARY KEY,
+                    feed_url TEXT NOT NULL,
+                    body_hash VARCHAR(64) NOT NULL,
+                    ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            conn.commit()
+
+    @staticmethod
+    def compute_body_hash(content: bytes) -> str:
+        """计算响应体哈希"""
+        return hashlib.sha256(content).hexdigest()
+
+    def get_feed_cache(self, feed_url: str) -> Optional[FeedCacheEntry]:
+        """获取Feed缓存条目"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT feed_url, etag, last_modified, body_hash, last_status, fetched_at
+                    FROM feed_fetch_cache
+                    WHERE feed_url = ?
+                """, (feed_url,))
+
+                row = cursor.fetchone()
+                if not row:
+                    return None
+
+                return FeedCacheEntry(
+                    feed_url=row[0],
+                    etag=row[1],
+                    last_modified=row[2],
+                    body_hash=row[3],
+                    last_status=row[4],
+                    fetched_at=datetime.fromisoformat(row[5]) if row[5] else None
+                )
+
+        except Exception as e:
+            logger.error(f"获取Feed缓存失败: {e}")
+            return None
+
+    def save_feed_cache(
+        self,
+        feed_url: str,
+        status_code: int,
+        headers: Dict[str, str],
+        body_hash: Optional[str] = None
+    ):
+        """
+        保存Feed缓存校验信息
+
+        Args:
+            feed_url: Feed URL
+            status_code: HTTP状态码
+            headers: 响应头
+            body_hash: 响应体哈希（304时为None，保留原值）
+        """
+        # requests的headers不区分大小写，转成dict后需要兼容不同写法
+        lowered = {key.lower(): value for key, value in headers.items()}
+        etag = lowered.get('etag')
+        last_modified = lowered.get('last-modified')
+        now = datetime.now()
+
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO feed_fetch_cache
+                    (feed_url, etag, last_modified, body_hash, last_status, fetched_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(feed_url) DO UPDATE SET
+                        etag = COALESCE(excluded.etag, feed_fetch_cache.etag),
+                        last_modified = COALESCE(excluded.last_modified, feed_fetch_cache.last_modified),
+                        body_hash = COALESCE(excluded.body_hash, feed_fetch_cache.body_hash),
+                        last_status = excluded.last_status,
+                        fetched_at = excluded.fetched_at,
+                        updated_at = excluded.updated_at
+                """, (feed_url, etag, last_modified, body_hash, status_code, now, now))
+
+        except Exception as e:
+            logger.error(f"保存Feed缓存失败: {e}")
+
+    def get_ingested_hash(self, subscription_id: int) -> Optional[str]:
+        """获取订阅最后一次入库的响应体哈希"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT body_hash FROM subscription_feed_state
+                    WHERE subscription_id = ?
+                """, (subscription_id,))
+
+                row = cursor.fetchone()
+                return row[0] if row else None
+
+        except Exception as e:
+            logger.error(f"获取订阅入库版本失败: {e}")
+            return None
+
+    def mark_ingested(self, subscription_id: int, feed_url: str, body_hash: str):
+        """记录订阅已入库的响应体版本"""
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO subscription_feed_state (subscription_id, feed_url, body_hash, ingested_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(subscription_id) DO UPDATE SET
+                        feed_url = excluded.feed_url,
+                        body_hash = excluded.body_hash,
+                        ingested_at = excluded.ingested_at
+                """, (subscription_id, feed_url, body_hash, datetime.now()))
+
+        except Exception as e:
+            logger.error(f"记录订阅入库版本失败: {e}")
+
+
+# 创建全局服务实例
+feed_cache_service = FeedCacheService()
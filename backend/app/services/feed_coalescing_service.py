@@ -0,0 +1,198 @@
+"""
+Feed级别共享拉取层
+同一个rss_url被多个用户订阅时，在新鲜期（TTL）内只发起一次HTTP请求、只解析一次，
+并发的相同请求通过single-flight合并，每个用户只需做user_content_relations映射
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from loguru import logger
+
+
+@dataclass
+class FeedSnapshot:
+    """Feed快照：一次HTTP拉取的结果，以及按需解析出的标准化条目"""
+    feed_url: str
+    body_hash: Optional[str] = None
+    content: Optional[bytes] = None
+    status_code: Optional[int] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    loaded_at: float = field(default_factory=time.monotonic)
+    items: Optional[List[Dict[str, Any]]] = None
+    parse_failed: bool = False
+    circuit_open: bool = False      # Feed处于熔断期，未发HTTP请求
+    poll_recorded: bool = False     # 本次拉取的结果已记入Feed轮询计划
+    parse_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def not_modified(self) -> bool:
+        """本次拉取是否为304"""
+        return self.error is None and self.status_code == 304
+
+    @property
+    def has_body(self) -> bool:
+        """快照是否拿到过响应体（原始响应体、已解析条目或已确认解析失败）"""
+        return self.content is not None or self.items is not None or self.parse_failed
+
+    def is_fresh(self, ttl_seconds: float) -> bool:
+        """是否仍在新鲜期内"""
+        return time.monotonic() - self.loaded_at < ttl_seconds
+
+
+# loader(previous, allow_conditional) -> FeedSnapshot
+SnapshotLoader = Callable[[Optional[FeedSnapshot], bool], Awaitable[FeedSnapshot]]
+
+
+class SharedFeedLayer:
+    """
+    Feed级别共享拉取层
+
+    Features:
+    - 以标准化URL为键缓存快照，新鲜期内所有订阅者复用
+    - single-flight：同一URL同时只有一个拉取在进行，其余调用方等待其结果
+    - 基于concurrent.futures.Future实现，跨线程/跨事件循环均可合并
+    - LRU限制缓存条目数，过期快照保留用于304时复用已解析条目
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 512):
+        """
+        初始化共享拉取层
+
+        Args:
+            ttl_seconds: 快照新鲜期（秒）
+            max_entries: 最多缓存的Feed快照数量
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._snapshots: "OrderedDict[str, FeedSnapshot]" = OrderedDict()
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'coalesced': 0,
+            'loads': 0
+        }
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """
+        标准化Feed URL：协议和主机小写、去掉片段和末尾斜杠、查询参数排序
+
+        Args:
+            url: 原始URL
+
+        Returns:
+            str: 标准化后的URL
+        """
+        parts = urlsplit(url.strip())
+        path = parts.path.rstrip('/') or '/'
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+    def _store(self, key: str, snapshot: FeedSnapshot):
+        """写入快照并执行LRU淘汰（调用方持有锁）"""
+        self._snapshots[key] = snapshot
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self.max_entries:
+            self._snapshots.popitem(last=False)
+
+    async def get_snapshot(
+        self,
+        url: str,
+        loader: SnapshotLoader,
+        require_body: bool = False
+    ) -> FeedSnapshot:
+        """
+        获取Feed快照（新鲜期内命中缓存，否则合并到单次拉取）
+
+        Args:
+            url: Feed URL
+            loader: 实际拉取函数，接收上一次快照和是否允许条件请求
+            require_body: 调用方需要响应体（304的空快照不满足要求，会强制完整拉取）
+
+        Returns:
+            FeedSnapshot: Feed快照
+        """
+        key = self.normalize_url(url)
+
+        # 等待进行中的拉取最多两轮：第一轮可能拿到不满足require_body的304快照
+        for _ in range(2):
+            with self._lock:
+                snapshot = self._snapshots.get(key)
+                if snapshot and snapshot.is_fresh(self.ttl_seconds) and (snapshot.has_body or not require_body):
+                    self._snapshots.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return snapshot
+
+                future = self._inflight.get(key)
+                if future is None:
+                    future = concurrent.futures.Future()
+                    self._inflight[key] = future
+                    is_leader = True
+                    self._stats['loads'] += 1
+                else:
+                    is_leader = False
+                    self._stats['coalesced'] += 1
+
+            if is_leader:
+                return await self._load(key, url, loader, snapshot, future, allow_conditional=not require_body)
+
+            result = await asyncio.wrap_future(future)
+            if result.has_body or not require_body or result.error:
+                return result
+
+        # 仍未拿到响应体：由当前调用方执行一次无条件拉取
+        with self._lock:
+            previous = self._snapshots.get(key)
+            future = concurrent.futures.Future()
+            self._inflight[key] = future
+            self._stats['loads'] += 1
+        return await self._load(key, url, loader, previous, future, allow_conditional=False)
+
+    async def _load(
+        self,
+        key: str,
+        url: str,
+        loader: SnapshotLoader,
+        previous: Optional[FeedSnapshot],
+        future: concurrent.futures.Future,
+        allow_conditional: bool
+    ) -> FeedSnapshot:
+        """执行拉取并把结果广播给等待者"""
+        try:
+            snapshot = await loader(previous, allow_conditional)
+        except Exception as e:
+            logger.error(f"❌ Feed共享拉取失败: {url} | {e}")
+            snapshot = FeedSnapshot(feed_url=url, error=str(e))
+
+        with self._lock:
+            # 失败结果不缓存，下一次调用重新拉取
+            if snapshot.error is None:
+                self._store(key, snapshot)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        future.set_result(snapshot)
+        return snapshot
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取共享拉取层统计信息"""
+        with self._lock:
+            return {
+                **self._stats,
+                'cached_feeds': len(self._snapshots),
+                'inflight': len(self._inflight),
+                'ttl_seconds': self.ttl_seconds
+            }
+
+
+# 创建全局实例
+shared_feed_layer = SharedFeedLayer()
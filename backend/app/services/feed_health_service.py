@@ -0,0 +1,246 @@
+"""
+Feed健康状态与熔断服务
+按Feed（完整URL）持久化记录连续失败次数、最近错误类型和下次允许请求的时间：
+- 连续失败达到阈值后熔断（open），在退避时间内直接跳过，不发HTTP请求
+- 退避时间按指数增长，到期后放行一次探测请求（half_open），成功则恢复，失败则加倍退避
+- 健康的Feed没有记录，检查只是一次主键查询
+"""
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from ..core.database_manager import get_db_connection, get_db_transaction
+
+
+class BreakerState:
+    """熔断器状态"""
+    CLOSED = 'closed'        # 正常请求（可能有少量连续失败）
+    OPEN = 'open'            # 熔断中，退避期内跳过
+    HALF_OPEN = 'half_open'  # 退避到期，探测请求进行中
+
+
+@dataclass
+class FeedPermit:
+    """一次请求前的熔断检查结果"""
+    allowed: bool
+    probe: bool = False
+    consecutive_failures: int = 0
+    next_allowed_at: Optional[datetime] = None
+    last_error_class: Optional[str] = None
+
+
+class FeedHealthService:
+    """Feed健康状态与熔断服务"""
+
+    def __init__(
+        self,
+        db_path: str = "data/rss_subscriber.db",
+        failure_threshold: int = 3,
+        base_backoff_minutes: float = 5,
+        max_backoff_minutes: float = 24 * 60,
+        probe_timeout_minutes: float = 5
+    ):
+        """
+        初始化熔断服务
+
+        Args:
+            db_path: 数据库路径
+            failure_threshold: 触发熔断的连续失败次数
+            base_backoff_minutes: 首次熔断的退避时长（分钟），之后每次探测失败翻倍
+            max_backoff_minutes: 退避时长上限（分钟）
+            probe_timeout_minutes: 探测请求的占用时长（分钟），超时未回报结果可再次探测
+        """
+        self.db_path = db_path
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff_minutes * 60
+        self.max_backoff = max_backoff_minutes * 60
+        self.probe_timeout = probe_timeout_minutes * 60
+        self._init_health_table()
+
+    def _init_health_table(self):
+        """初始化Feed健康状态表"""
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS feed_health (
+                    feed_url TEXT PRIMARY KEY,
+                    state VARCHAR(10) NOT NULL DEFAULT 'closed',
+                    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                    last_error_class VARCHAR(50),
+                    last_error TEXT,
+                    last_failure_at TIMESTAMP,
+                    last_success_at TIMESTAMP,
+                    opened_at TIMESTAMP,
+                    next_allowed_at TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_feed_health_state ON feed_health (state)")
+
+            conn.commit()
+
+    def backoff_seconds(self, consecutive_failures: int) -> float:
+        """熔断退避时长：达到阈值时为基础时长，之后每多失败一次翻倍"""
+        exponent = max(0, consecutive_failures - self.failure_threshold)
+        return min(self.max_backoff, self.base_backoff * (2 ** min(exponent, 32)))
+
+    def allow_request(self, feed_url: str, now: Optional[datetime] = None) -> FeedPermit:
+        """
+        请求前检查熔断状态；退避到期时原子地领取探测名额，同一时间只放行一个探测请求
+
+        Args:
+            feed_url: 完整Feed URL
+            now: 当前时间
+
+        Returns:
+            FeedPermit: 是否允许请求、是否为探测请求
+        """
+        now = now or datetime.now()
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT state, consecutive_failures, next_allowed_at, last_error_class
+                    FROM feed_health
+                    WHERE feed_url = ?
+                """, (feed_url,))
+                row = cursor.fetchone()
+
+                if not row or row[0] == BreakerState.CLOSED:
+                    return FeedPermit(allowed=True, consecutive_failures=row[1] if row else 0)
+
+                state, failures, next_allowed_at, error_class = row
+                next_allowed = datetime.fromisoformat(next_allowed_at) if next_allowed_at else None
+                if next_allowed and now < next_allowed:
+                    return FeedPermit(
+                        allowed=False,
+                        consecutive_failures=failures,
+                        next_allowed_at=next_allowed,
+                        last_error_class=error_class
+                    )
+
+                # 退避到期（或上一次探测超时未回报）：领取探测名额
+                cursor.execute("""
+                    UPDATE feed_health
+                    SET state = ?, next_allowed_at = ?, updated_at = ?
+                    WHERE feed_url = ? AND state != ? AND (next_allowed_at IS NULL OR next_allowed_at <= ?)
+                    RETURNING consecutive_failures
+                """, (
+                    BreakerState.HALF_OPEN, now + timedelta(seconds=self.probe_timeout), now,
+                    feed_url, BreakerState.CLOSED, now
+                ))
+                if cursor.fetchone() is None:
+                    return FeedPermit(allowed=False, consecutive_failures=failures, last_error_class=error_class)
+
+            logger.info(f"🔌 Feed熔断退避到期，放行探测请求: {feed_url} (连续失败{failures}次)")
+            return FeedPermit(allowed=True, probe=True, consecutive_failures=failures, last_error_class=error_class)
+
+        except Exception as e:
+            logger.error(f"检查Feed熔断状态失败: {e}")
+            return FeedPermit(allowed=True)
+
+    def record_success(self, feed_url: str, now: Optional[datetime] = None):
+        """请求成功（含304）：恢复为正常状态（健康Feed没有记录，不产生写入）"""
+        now = now or datetime.now()
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.execute("""
+                    UPDATE feed_health
+                    SET state = ?, consecutive_failures = 0, opened_at = NULL, next_allowed_at = NULL,
+                        last_success_at = ?, updated_at = ?
+                    WHERE feed_url = ? AND (state != ? OR consecutive_failures > 0)
+                """, (BreakerState.CLOSED, now, now, feed_url, BreakerState.CLOSED))
+
+            if cursor.rowcount:
+                logger.info(f"✅ Feed恢复正常: {feed_url}")
+
+        except Exception as e:
+            logger.error(f"记录Feed成功状态失败: {e}")
+
+    def record_failure(
+        self,
+        feed_url: str,
+        error_class: Optional[str],
+        error: Optional[str],
+        now: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """
+        请求失败：累计连续失败次数，达到阈值（或探测失败）时熔断并安排下次允许请求的时间
+
+        Args:
+            feed_url: 完整Feed URL
+            error_class: 错误类型（如ReadTimeout、http_404）
+            error: 错误信息
+            now: 当前时间
+
+        Returns:
+            Optional[datetime]: 熔断时返回下次允许请求的时间，否则None
+        """
+        now = now or datetime.now()
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO feed_health (
+                        feed_url, state, consecutive_failures, last_error_class, last_error, last_failure_at, updated_at
+                    ) VALUES (?, ?, 1, ?, ?, ?, ?)
+                    ON CONFLICT(feed_url) DO UPDATE SET
+                        consecutive_failures = feed_health.consecutive_failures + 1,
+                        last_error_class = excluded.last_error_class,
+                        last_error = excluded.last_error,
+                        last_failure_at = excluded.last_failure_at,
+                        updated_at = excluded.updated_at
+                    RETURNING consecutive_failures
+                """, (feed_url, BreakerState.CLOSED, error_class, (error or '')[:500], now, now))
+                failures = cursor.fetchone()[0]
+
+                if failures < self.failure_threshold:
+                    return None
+
+                next_allowed_at = now + timedelta(seconds=self.backoff_seconds(failures))
+                cursor.execute("""
+                    UPDATE feed_health
+                    SET state = ?, opened_at = COALESCE(opened_at, ?), next_allowed_at = ?
+                    WHERE feed_url = ?
+                """, (BreakerState.OPEN, now, next_allowed_at, feed_url))
+
+            logger.warning(
+                f"🔌 Feed熔断: {feed_url} | 连续失败{failures}次, 错误类型={error_class}, "
+                f"下次允许请求: {next_allowed_at.strftime('%Y-%m-%d %H:%M:%S')}"
+            )
+            return next_allowed_at
+
+        except Exception as e:
+            logger.error(f"记录Feed失败状态失败: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取熔断统计：各状态的Feed数量和按错误类型的熔断数量"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT state, COUNT(*) FROM feed_health GROUP BY state")
+                by_state = {row[0]: row[1] for row in cursor.fetchall()}
+
+                cursor.execute("""
+                    SELECT last_error_class, COUNT(*) FROM feed_health
+                    WHERE state != ? GROUP BY last_error_class
+                """, (BreakerState.CLOSED,))
+                by_error = {row[0] or 'unknown': row[1] for row in cursor.fetchall()}
+
+            return {'by_state': by_state, 'open_by_error_class': by_error}
+
+        except Exception as e:
+            logger.error(f"获取Feed熔断统计失败: {e}")
+            return {}
+
+
+# 创建全局服务实例
+feed_health_service = FeedHealthService()
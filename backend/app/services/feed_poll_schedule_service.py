@@ -0,0 +1,272 @@
+"""
+Feed自适应轮询调度服务
+按Feed（完整URL）学习更新节奏并安排下次轮询时间：
+- 从条目published_at序列计算发布间隔的指数加权移动平均（EWMA）
+- 条件GET返回未变化时，按距最后一条内容的静默时长放宽间隔
+- 轮询间隔取发布间隔的一半，限制在[最小, 最大]区间内
+活跃Feed更频繁地轮询，安静的Feed不再按用户频率反复拉取
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from ..core.database_manager import get_db_connection, get_db_transaction
+
+
+class FeedPollScheduleService:
+    """Feed自适应轮询调度服务"""
+
+    def __init__(
+        self,
+        db_path: str = "data/rss_subscriber.db",
+        min_interval_minutes: float = 15,
+        max_interval_minutes: float = 12 * 60,
+        default_interval_minutes: float = 60,
+        ewma_alpha: float = 0.3,
+        poll_fraction: float = 0.5,
+        claim_minutes: float = 10
+    ):
+        """
+        初始化调度服务
+
+        Args:
+            db_path: 数据库路径
+            min_interval_minutes: 最短轮询间隔（分钟）
+            max_interval_minutes: 最长轮询间隔（分钟），需小于用户内容关系有效期，保证未变化时能及时续期
+            default_interval_minutes: 没有发布历史时的轮询间隔（分钟）
+            ewma_alpha: 发布间隔EWMA的平滑系数，越大越偏向最近的间隔
+            poll_fraction: 轮询间隔相对发布间隔的比例
+            claim_minutes: 领取到期Feed后的占用时长（分钟），防止拉取完成前被重复领取
+        """
+        self.db_path = db_path
+        self.min_interval = min_interval_minutes * 60
+        self.max_interval = max_interval_minutes * 60
+        self.default_interval = default_interval_minutes * 60
+        self.ewma_alpha = ewma_alpha
+        self.poll_fraction = poll_fraction
+        self.claim_seconds = claim_minutes * 60
+        self._init_schedule_table()
+
+    def _init_schedule_table(self):
+        """初始化Feed轮询计划表"""
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS feed_poll_schedule (
+                    feed_url TEXT PRIMARY KEY,
+                    ewma_interval REAL,
+                    poll_interval REAL NOT NULL,
+                    last_item_at TIMESTAMP,
+                    last_polled_at TIMESTAMP,
+                    last_changed_at TIMESTAMP,
+                    next_poll_at TIMESTAMP NOT NULL,
+                    unchanged_polls INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_feed_poll_schedule_next
+                ON feed_poll_schedule (next_poll_at)
+            """)
+
+            conn.commit()
+
+    def _clamp(self, seconds: float) -> float:
+        return max(self.min_interval, min(self.max_interval, seconds))
+
+    def _update_ewma(self, ewma: Optional[float], times: List[datetime]) -> Optional[float]:
+        """按时间先后把相邻条目的发布间隔依次并入EWMA（忽略同一时刻的条目）"""
+        for previous, current in zip(times, times[1:]):
+            gap = (current - previous).total_seconds()
+            if gap <= 0:
+                continue
+            ewma = gap if ewma is None else self.ewma_alpha * gap + (1 - self.ewma_alpha) * ewma
+        return ewma
+
+    def record_poll(
+        self,
+        feed_url: str,
+        published_times: Optional[Iterable[datetime]] = None,
+        now: Optional[datetime] = None
+    ) -> float:
+        """
+        记录一次轮询结果并安排下次轮询
+
+        Args:
+            feed_url: 完整Feed URL
+            published_times: 本次解析出的条目发布时间；None表示Feed未变化（304或响应体哈希一致）
+            now: 当前时间，默认datetime.now()
+
+        Returns:
+            float: 下次轮询间隔（秒）
+        """
+        now = now or datetime.now()
+
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT ewma_interval, last_item_at, unchanged_polls
+                    FROM feed_poll_schedule
+                    WHERE feed_url = ?
+                """, (feed_url,))
+                row = cursor.fetchone()
+
+                ewma = row[0] if row else None
+                last_item_at = datetime.fromisoformat(row[1]) if row and row[1] else None
+                unchanged_polls = row[2] if row else 0
+
+                # 只有比已知最新条目更新的发布时间才计入节奏；首次轮询用整份Feed的历史
+                new_times = sorted({
+                    t for t in (published_times or [])
+                    if t <= now and (last_item_at is None or t > last_item_at)
+                })
+                changed = bool(new_times)
+
+                if changed:
+                    ewma = self._update_ewma(ewma, ([last_item_at] if last_item_at else []) + new_times)
+                    last_item_at = new_times[-1]
+                    unchanged_polls = 0
+                else:
+                    unchanged_polls += 1
+
+                # 静默时长超过学到的发布间隔，说明Feed变安静了，按静默时长放宽
+                expected = ewma if ewma is not None else self.default_interval / self.poll_fraction
+                if not changed and last_item_at:
+                    expected = max(expected, (now - last_item_at).total_seconds())
+                interval = self._clamp(expected * self.poll_fraction)
+
+                cursor.execute("""
+                    INSERT INTO feed_poll_schedule (
+                        feed_url, ewma_interval, poll_interval, last_item_at,
+                        last_polled_at, last_changed_at, next_poll_at, unchanged_polls, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(feed_url) DO UPDATE SET
+                        ewma_interval = excluded.ewma_interval,
+                        poll_interval = excluded.poll_interval,
+                        last_item_at = excluded.last_item_at,
+                        last_polled_at = excluded.last_polled_at,
+                        last_changed_at = COALESCE(excluded.last_changed_at, feed_poll_schedule.last_changed_at),
+                        next_poll_at = excluded.next_poll_at,
+                        unchanged_polls = excluded.unchanged_polls,
+                        updated_at = excluded.updated_at
+                """, (
+                    feed_url, ewma, interval, last_item_at, now,
+                    now if changed else None, now + timedelta(seconds=interval), unchanged_polls, now
+                ))
+
+            logger.debug(
+                f"📅 Feed轮询计划更新: {feed_url}, 有新内容={changed}, "
+                f"发布间隔≈{(ewma or 0) / 60:.0f}分钟, 下次轮询{interval / 60:.0f}分钟后"
+            )
+            return interval
+
+        except Exception as e:
+            logger.error(f"更新Feed轮询计划失败: {e}")
+            return self.default_interval
+
+    def record_failure(self, feed_url: str, now: Optional[datetime] = None):
+        """拉取失败：保持当前间隔，推迟到下一个轮询点（没有计划时使用默认间隔）"""
+        now = now or datetime.now()
+        try:
+            with get_db_transaction() as conn:
+                conn.execute("""
+                    INSERT INTO feed_poll_schedule (feed_url, poll_interval, last_polled_at, next_poll_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(feed_url) DO UPDATE SET
+                        last_polled_at = excluded.last_polled_at,
+                        next_poll_at = datetime(excluded.last_polled_at, '+' || CAST(feed_poll_schedule.poll_interval AS INTEGER) || ' seconds'),
+                        updated_at = excluded.updated_at
+                """, (feed_url, self.default_interval, now, now + timedelta(seconds=self.default_interval), now))
+
+        except Exception as e:
+            logger.error(f"记录Feed拉取失败时间失败: {e}")
+
+    def get_not_due_subscriptions(self, subscription_ids: List[int], now: Optional[datetime] = None) -> Set[int]:
+        """
+        筛出Feed尚未到轮询时间的订阅（从未入库过的订阅没有Feed映射，视为到期）
+
+        Args:
+            subscription_ids: 订阅ID列表
+            now: 当前时间
+
+        Returns:
+            Set[int]: 可以跳过本次拉取的订阅ID
+        """
+        if not subscription_ids:
+            return set()
+
+        now = now or datetime.now()
+        placeholders = ','.join('?' * len(subscription_ids))
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT s.subscription_id
+                FROM subscription_feed_state s
+                JOIN feed_poll_schedule p ON p.feed_url = s.feed_url
+                WHERE s.subscription_id IN ({placeholders})
+                  AND p.next_poll_at > ?
+            """, (*subscription_ids, now))
+            return {row[0] for row in cursor.fetchall()}
+
+    def claim_due_subscriptions(
+        self,
+        limit: int = 100,
+        now: Optional[datetime] = None
+    ) -> Dict[int, List[Tuple[int, str]]]:
+        """
+        领取到期的Feed，返回开启自动拉取的用户在这些Feed上的活跃订阅
+
+        领取时把next_poll_at推后claim_minutes，拉取完成后由record_poll写入真正的下次轮询时间
+
+        Args:
+            limit: 单次最多领取的Feed数量
+            now: 当前时间
+
+        Returns:
+            Dict[int, List[Tuple[int, str]]]: user_id -> [(subscription_id, rss_url), ...]
+        """
+        now = now or datetime.now()
+        with get_db_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE feed_poll_schedule
+                SET next_poll_at = ?
+                WHERE feed_url IN (
+                    SELECT feed_url FROM feed_poll_schedule
+                    WHERE next_poll_at <= ?
+                    ORDER BY next_poll_at
+                    LIMIT ?
+                )
+                RETURNING feed_url
+            """, (now + timedelta(seconds=self.claim_seconds), now, limit))
+            feed_urls = [row[0] for row in cursor.fetchall()]
+            if not feed_urls:
+                return {}
+
+            placeholders = ','.join('?' * len(feed_urls))
+            cursor.execute(f"""
+                SELECT us.user_id, us.id, us.rss_url
+                FROM subscription_feed_state s
+                JOIN user_subscriptions us ON us.id = s.subscription_id
+                JOIN user_fetch_configs c ON c.user_id = us.user_id
+                WHERE s.feed_url IN ({placeholders})
+                  AND us.is_active = 1
+                  AND c.auto_fetch_enabled = 1 AND c.is_active = 1
+                ORDER BY us.user_id, us.id
+            """, feed_urls)
+
+            batch: Dict[int, List[Tuple[int, str]]] = {}
+            for user_id, subscription_id, rss_url in cursor.fetchall():
+                batch.setdefault(user_id, []).append((subscription_id, rss_url))
+            return batch
+
+
+# 创建全局服务实例
+feed_poll_schedule_service = FeedPollScheduleService()
@@ -4,21 +4,32 @@ RSS内容拉取和处理服务
 负责RSS内容的拉取、解析、处理、存储等核心功能
 v3.0: 简化架构，使用自建RSShub实例，移除复杂重试逻辑
 v3.1: 增加内容时间范围控制，只获取指定天数内的内容
+v3.2: HTTP拉取改为异步引擎（连接池复用 + 每主机并发限制 + 非阻塞退避），支持单用户多订阅并发拉取
+v3.3: 条件GET（ETag/Last-Modified + 响应体哈希），Feed未变化时跳过解析、去重和入库
+v3.4: 跨用户Feed合并拉取，同一rss_url在新鲜期内只请求、解析一次，每个用户只做关系映射
+v3.5: AI预处理改为持久化任务队列，由后台工作池处理，拉取在内容入库后立即返回
+v3.6: 每次实际拉取的结果（未变化 / 新条目的发布时间）反馈给Feed自适应轮询计划
+v3.7: Feed级熔断：连续失败的Feed按指数退避跳过，不再发HTTP请求；退避到期只放行一次探测
 """
 
 import re
-import time
-import random
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any, Tuple
 from urllib.parse import urlparse
 
 import feedparser
-import requests
 from bs4 import BeautifulSoup
 from loguru import logger
 
 from .shared_content_service import SharedContentService
+from .rss_fetch_engine import FeedFetchEngine
+from .feed_cache_service import feed_cache_service
+from .feed_coalescing_service import FeedSnapshot, shared_feed_layer
+from .feed_poll_schedule_service import feed_poll_schedule_service
+from .feed_health_service import feed_health_service
+from .ai_job_queue_service import ai_job_queue_service
+from .ai_job_worker import ai_job_worker_pool
 
 
 class RSSContentService:
@@ -30,7 +41,11 @@ class RSSContentService:
         rsshub_base_url: str = None,
         content_time_range_days: int = 30,
         test_mode: bool = False,
-        test_limit: int = 1
+        test_limit: int = 1,
+        per_host_limit: int = 8,
+        max_concurrent_feeds: int = 10,
+        rate_per_second: float = 5.0,
+        rate_burst: int = 10
     ):
         """
         初始化RSS内容服务
@@ -41,6 +56,10 @@ class RSSContentService:
             content_time_range_days: 内容时间范围（天），只获取此范围内的内容
             test_mode: 测试模式，启用后将限制拉取内容数量
             test_limit: 测试模式下的最大内容数量
+            per_host_limit: 每个主机（RSShub实例）的最大并发请求数
+            max_concurrent_feeds: 批量拉取时同时处理的最大订阅数
+            rate_per_second: 对RSShub的全局请求速率上限（每秒请求数）
+            rate_burst: 允许的突发请求数
         """
         self.timeout = timeout
         
@@ -64,7 +83,25 @@ class RSSContentService:
             'base_delay': 1,           # 1秒基础延迟
         }
         
+        self.max_concurrent_feeds = max_concurrent_feeds
+        
+        # 异步拉取引擎（连接池复用 + 每主机并发限制）
+        self.fetch_engine = FeedFetchEngine(
+            timeout=timeout,
+            max_retries=self.retry_config['max_retries'],
+            base_delay=self.retry_config['base_delay'],
+            per_host_limit=per_host_limit,
+            user_agent=self.user_agent,
+            rate_per_second=rate_per_second,
+            rate_burst=rate_burst
+        )
+        
         self.shared_content_service = SharedContentService()
+        self.feed_cache_service = feed_cache_service
+        self.feed_layer = shared_feed_layer
+        self.poll_schedule = feed_poll_schedule_service
+        self.feed_health = feed_health_service
+        self.ai_job_queue_service = ai_job_queue_service
         logger.info(
             f"🔧 RSS内容服务初始化完成（v3.1 - 时间控制版）- "
             f"RSShub: {self.rsshub_base_url}, "
@@ -92,18 +129,36 @@ class RSSContentService:
         logger.info(f"🚀 开始拉取RSS内容: {rss_url}, user_id={user_id}")
         
         try:
-            # 第1步：发送HTTP请求拉取RSS原始数据
-            raw_content = self._fetch_raw_rss(rss_url)
-            if not raw_content:
+            # 第1步：通过Feed级共享层获取快照，同一URL在新鲜期内只拉取一次
+            final_url = self._build_feed_url(rss_url)
+            ingested_hash = self.feed_cache_service.get_ingested_hash(subscription_id)
+            
+            snapshot = await self.feed_layer.get_snapshot(final_url, self._make_snapshot_loader(final_url))
+            if snapshot.circuit_open:
+                return {'error': snapshot.error, 'circuit_open': True}
+            if snapshot.error:
                 return {'error': 'HTTP请求失败'}
             
-            # 第2步：使用feedparser解析RSS/Atom内容
-            feed_data = self._parse_rss_feed(raw_content)
-            if not feed_data:
-                return {'error': 'RSS解析失败'}
+            # 当前订阅已入库过该版本：304或响应体哈希一致，跳过解析入库
+            if snapshot.body_hash and snapshot.body_hash == ingested_hash:
+                reason = '304' if snapshot.not_modified else 'body_hash'
+                return await self._handle_unchanged_feed(rss_url, subscription_id, user_id, reason=reason)
             
-            # 第3步：提取并标准化内容数据
-            rss_items = self._extract_and_standardize_entries(feed_data)
+            # 304但共享层没有响应体（如服务重启后），当前订阅需要完整内容，强制无条件拉取
+            if not snapshot.has_body:
+                snapshot = await self.feed_layer.get_snapshot(
+                    final_url, self._make_snapshot_loader(final_url), require_body=True
+                )
+                if snapshot.error or not snapshot.has_body:
+                    return {'error': 'HTTP请求失败'}
+                if snapshot.body_hash == ingested_hash:
+                    return await self._handle_unchanged_feed(rss_url, subscription_id, user_id, reason='body_hash')
+            
+            # 第2-3步：解析和标准化在共享快照上只做一次，结果供所有订阅者复用
+            rss_items = await asyncio.to_thread(self._parse_snapshot_items, snapshot)
+            if rss_items is None:
+                return {'error': 'RSS解析失败'}
+            body_hash = snapshot.body_hash
             
             # 第4步：使用新架构存储内容
             result = await self.shared_content_service.store_rss_content(
@@ -111,19 +166,23 @@ class RSSContentService:
                 subscription_id=subscription_id,
                 user_id=user_id
             )
+            self.feed_cache_service.mark_ingested(subscription_id, final_url, body_hash)
             
-            # 🔥 第5步：AI预处理 - 基于AI字段是否为空
+            # 🔥 第5步：AI预处理入队 - 由后台工作池异步处理，拉取请求不等待LLM
             need_ai_processing_ids = result.get('need_ai_processing_ids', [])
             if need_ai_processing_ids:
-                ai_result = await self._trigger_ai_processing(need_ai_processing_ids, user_id, subscription_id)
-                result['ai_processing'] = ai_result
+                result['ai_jobs_enqueued'] = await asyncio.to_thread(
+                    self.ai_job_queue_service.enqueue, need_ai_processing_ids, subscription_id
+                )
+                ai_job_worker_pool.notify()
             
+            result['success'] = True
             logger.success(
                 f"✅ RSS内容处理完成: {rss_url} | "
                 f"处理{result.get('total_processed', 0)}条，"
                 f"新增{result.get('new_content', 0)}条，"
                 f"复用{result.get('reused_content', 0)}条，"
-                f"AI处理{result.get('ai_processing', {}).get('processed', 0)}条"
+                f"AI任务入队{result.get('ai_jobs_enqueued', 0)}条"
             )
             
             return result
@@ -132,144 +191,213 @@ class RSSContentService:
             logger.error(f"❌ RSS内容拉取失败: {rss_url} | 错误: {e}")
             return {'error': str(e)}
     
-    async def _trigger_ai_processing(
-        self, 
-        need_ai_processing_ids: List[int], 
+    async def _handle_unchanged_feed(
+        self,
+        rss_url: str,
+        subscription_id: int,
         user_id: int,
-        subscription_id: int
+        reason: str
     ) -> Dict[str, Any]:
         """
-        第5步：触发AI预处理（基于AI字段是否为空）
+        Feed未变化：跳过解析、去重和入库，仅续期该订阅已有内容的用户关系
         
         Args:
-            need_ai_processing_ids: 需要AI处理的内容ID列表（新内容+缺少AI结果的旧内容）
-            user_id: 用户ID
+            rss_url: RSS订阅URL
             subscription_id: 订阅ID
+            user_id: 用户ID
+            reason: 判定未变化的依据（304 / body_hash）
             
         Returns:
-            Dict: AI处理结果统计
+            Dict: 处理结果统计
         """
-        try:
-            logger.info(f"🧠 开始AI预处理: {len(need_ai_processing_ids)}条需要处理的内容, user_id={user_id}")
-            
-            # 从数据库读取需要AI处理的内容
-            db_contents = await self.shared_content_service.get_contents_by_ids(need_ai_processing_ids)
-            if not db_contents:
-                logger.warning("⚠️ 无法从数据库读取需要处理的内容")
-                return {'processed': 0, 'success': 0, 'failed': 0}
-            
-            # 导入AI内容处理器
-            from .ai_content_processor import ai_content_processor
-            from ..models.content import RSSContent
-            
-            # 从数据库记录创建RSSContent对象（包含content_id信息）
-            rss_content_objects = []
-            for db_content in db_contents:
-                try:
-                    # 基于数据库记录创建RSSContent对象 - 包含所有标准字段
-                    rss_content = RSSContent(
-                        content_id=db_content['content_id'],  # 🔥 关键：包含content_id
-                        subscription_id=subscription_id,
-                        content_hash=db_content['content_hash'],
-                        title=db_content['title'],
-                        original_link=db_content['original_link'],
-                        published_at=db_content['published_at'],
-                        description=db_content['description'],
-                        description_text=db_content['description_text'],
-                        author=db_content['author'],
-                        platform=db_content['platform'],
-                        feed_title=db_content['feed_title'],
-                        cover_image=db_content['cover_image'],
-                        content_type=db_content['content_type']
-                    )
-                    rss_content_objects.append(rss_content)
-                except Exception as e:
-                    logger.warning(f"⚠️ 数据库内容转换失败，跳过: {db_content.get('title', 'Unknown')[:30]}... | 错误: {e}")
-                    continue
-            
-            if not rss_content_objects:
-                logger.warning("⚠️ 没有有效的内容可供AI处理")
-                return {'processed': 0, 'success': 0, 'failed': 0}
-            
-            # 调用AI内容处理器
-            processed_entries = await ai_content_processor.process_content_intelligence(rss_content_objects)
-            
-            # 统计处理结果
-            result = {
-                'processed': len(rss_content_objects),
-                'success': len(processed_entries),
-                'failed': len(rss_content_objects) - len(processed_entries),
-                'success_rate': round(len(processed_entries) / len(rss_content_objects) * 100, 1) if rss_content_objects else 0
-            }
-            
-            logger.success(f"✅ AI预处理完成: {result}")
-            return result
+        refreshed = await self.shared_content_service.relation_service.refresh_subscription_relations(
+            user_id=user_id,
+            subscription_id=subscription_id,
+            expires_hours=24
+        )
+        logger.info(f"📭 Feed未变化，跳过解析入库: {rss_url} | 依据={reason}, 续期关系{refreshed}条")
+        return {
+            'success': True,
+            'not_modified': True,
+            'total_processed': 0,
+            'new_content': 0,
+            'reused_content': 0,
+            'refreshed_relations': refreshed,
+            'need_ai_processing_ids': []
+        }
+    
+    async def fetch_and_store_many(
+        self,
+        subscriptions: List[Tuple[int, str]],
+        user_id: int
+    ) -> List[Dict[str, Any]]:
+        """
+        并发拉取并存储同一用户的多个订阅源
+        
+        Args:
+            subscriptions: (subscription_id, rss_url) 列表
+            user_id: 用户ID
             
-        except Exception as e:
-            logger.error(f"❌ AI预处理失败: {e}")
-            # AI处理失败不影响主流程，返回失败统计
-            return {
-                'processed': len(need_ai_processing_ids),
-                'success': 0,
-                'failed': len(need_ai_processing_ids),
-                'error': str(e)
-            }
+        Returns:
+            List[Dict]: 与输入顺序一致的处理结果，每项附带subscription_id和耗时
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_feeds)
+        
+        async def _run(subscription_id: int, rss_url: str) -> Dict[str, Any]:
+            async with semaphore:
+                started = asyncio.get_running_loop().time()
+                result = await self.fetch_and_store_rss_content(
+                    rss_url=rss_url,
+                    subscription_id=subscription_id,
+                    user_id=user_id
+                )
+                result['subscription_id'] = subscription_id
+                result['elapsed'] = round(asyncio.get_running_loop().time() - started, 3)
+                return result
+        
+        logger.info(f"🚀 并发拉取用户订阅: user_id={user_id}, 订阅数={len(subscriptions)}, 并发上限={self.max_concurrent_feeds}")
+        return list(await asyncio.gather(*(
+            _run(subscription_id, rss_url) for subscription_id, rss_url in subscriptions
+        )))
     
-    def _fetch_raw_rss(self, rss_url: str) -> Optional[bytes]:
+    def _make_snapshot_loader(self, final_url: str):
+        """构建共享层使用的Feed拉取函数"""
+        async def _loader(previous: Optional[FeedSnapshot], allow_conditional: bool) -> FeedSnapshot:
+            return await self._load_feed_snapshot(final_url, previous, allow_conditional)
+        return _loader
+    
+    async def _load_feed_snapshot(
+        self,
+        final_url: str,
+        previous: Optional[FeedSnapshot],
+        allow_conditional: bool
+    ) -> FeedSnapshot:
         """
-        第1步：拉取RSS原始数据（v3.0 - 简化版本）
-        移除多实例轮换，使用自建RSShub实例
+        实际拉取Feed并生成快照（由共享层保证同一URL同时只执行一次）
         
         Args:
-            rss_url: RSS URL
+            final_url: 完整的Feed URL
+            previous: 共享层中该URL的上一份快照（可能已过期）
+            allow_conditional: 是否允许发送条件请求
             
         Returns:
-            Optional[bytes]: RSS原始内容字节数据
+            FeedSnapshot: Feed快照
         """
-        logger.debug(f"📡 开始拉取RSS: {rss_url}")
+        # 熔断中的Feed直接跳过，不发HTTP请求（健康状态、缓存和轮询计划的读写都在线程中执行，不阻塞事件循环）
+        permit = await asyncio.to_thread(self.feed_health.allow_request, final_url)
+        if not permit.allowed:
+            until = permit.next_allowed_at.strftime('%H:%M:%S') if permit.next_allowed_at else '探测结束'
+            logger.info(f"🔌 Feed熔断中，跳过拉取: {final_url} | 连续失败{permit.consecutive_failures}次, 恢复时间: {until}")
+            return FeedSnapshot(
+                feed_url=final_url,
+                error=f"订阅源连续失败{permit.consecutive_failures}次（{permit.last_error_class}），熔断至{until}",
+                circuit_open=True
+            )
         
-        # 构建完整URL
-        if rss_url.startswith('http'):
-            final_url = rss_url
+        cache_entry = await asyncio.to_thread(self.feed_cache_service.get_feed_cache, final_url)
+        conditional_headers = None
+        if allow_conditional and cache_entry and cache_entry.body_hash:
+            conditional_headers = cache_entry.conditional_headers()
+        
+        # 探测请求和再失败一次就会熔断的Feed不做请求内重试，避免在超时上反复消耗；
+        # 偶发的单次失败仍保留重试，下一次抖动不会被计成又一次失败而提前熔断
+        skip_retries = permit.probe or permit.consecutive_failures >= self.feed_health.failure_threshold - 1
+        max_retries = 0 if skip_retries else None
+        fetch_result = await self.fetch_engine.fetch(final_url, conditional_headers, max_retries=max_retries)
+        
+        if not fetch_result.success and not fetch_result.not_modified:
+            await asyncio.to_thread(
+                self.feed_health.record_failure, final_url, fetch_result.error_class, fetch_result.error
+            )
         else:
-            final_url = f"{self.rsshub_base_url}{rss_url}"
+            await asyncio.to_thread(self.feed_health.record_success, final_url)
         
-        # 简化的重试逻辑
-        for attempt in range(self.retry_config['max_retries'] + 1):
-            try:
-                # 简化的请求头
-                headers = {
-                    'User-Agent': self.user_agent,
-                    'Accept': 'application/rss+xml, application/xml, text/xml, */*',
-                    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
-                }
-                
-                if attempt > 0:
-                    time.sleep(self.retry_config['base_delay'] * attempt)
-                
-                logger.debug(f"🔄 尝试 {attempt + 1}/{self.retry_config['max_retries'] + 1}: {final_url}")
-                
-                response = requests.get(
-                    final_url,
-                    headers=headers,
-                    timeout=self.timeout,
-                    allow_redirects=True
-                )
-                
-                response.raise_for_status()
-                
-                if response.content:
-                    logger.success(f"✅ 成功获取RSS内容，大小: {len(response.content)} bytes")
-                    return response.content
+        if fetch_result.not_modified:
+            await asyncio.to_thread(
+                self.feed_cache_service.save_feed_cache, final_url, fetch_result.status_code, fetch_result.headers
+            )
+            await asyncio.to_thread(self.poll_schedule.record_poll, final_url)
+            cached_hash = cache_entry.body_hash if cache_entry else None
+            snapshot = FeedSnapshot(
+                feed_url=final_url,
+                body_hash=cached_hash,
+                status_code=fetch_result.status_code,
+                headers=fetch_result.headers,
+                poll_recorded=True
+            )
+            # 上一份快照就是缓存中的版本时，直接复用其响应体和已解析条目
+            if previous and previous.has_body and cached_hash and previous.body_hash == cached_hash:
+                snapshot.content = previous.content
+                snapshot.items = previous.items
+                snapshot.parse_failed = previous.parse_failed
+            return snapshot
+        
+        if not fetch_result.success:
+            await asyncio.to_thread(self.poll_schedule.record_failure, final_url)
+            return FeedSnapshot(
+                feed_url=final_url,
+                status_code=fetch_result.status_code,
+                error=fetch_result.error or 'HTTP请求失败'
+            )
+        
+        body_hash = self.feed_cache_service.compute_body_hash(fetch_result.content)
+        await asyncio.to_thread(
+            self.feed_cache_service.save_feed_cache,
+            final_url, fetch_result.status_code, fetch_result.headers, body_hash
+        )
+        # 服务端不支持条件请求时按响应体哈希判断未变化；有变化的Feed在解析后按条目发布时间更新计划
+        unchanged = bool(cache_entry and cache_entry.body_hash == body_hash)
+        if unchanged:
+            await asyncio.to_thread(self.poll_schedule.record_poll, final_url)
+        snapshot = FeedSnapshot(
+            feed_url=final_url,
+            body_hash=body_hash,
+            content=fetch_result.content,
+            status_code=fetch_result.status_code,
+            headers=fetch_result.headers,
+            poll_recorded=unchanged
+        )
+        # 服务端不支持条件请求但内容未变：复用上一份快照的解析结果
+        if previous and previous.body_hash == body_hash and previous.items is not None:
+            snapshot.items = previous.items
+        return snapshot
+    
+    def _parse_snapshot_items(self, snapshot: FeedSnapshot) -> Optional[List[Dict[str, Any]]]:
+        """
+        解析快照并缓存标准化条目（在线程池中运行，快照级锁保证只解析一次）
+        
+        Args:
+            snapshot: Feed快照
+            
+        Returns:
+            Optional[List[Dict]]: 标准化的RSS内容列表，解析失败返回None
+        """
+        with snapshot.parse_lock:
+            if snapshot.items is None and not snapshot.parse_failed:
+                feed_data = self._parse_rss_feed(snapshot.content) if snapshot.content else None
+                if feed_data:
+                    snapshot.items = self._extract_and_standardize_entries(feed_data)
                 else:
-                    logger.warning("⚠️ 响应内容为空")
-                    
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"⚠️ 请求失败 (尝试{attempt + 1}): {e}")
-                if attempt == self.retry_config['max_retries']:
-                    logger.error(f"❌ 所有重试尝试失败: {final_url}")
-                    
-        return None
+                    snapshot.parse_failed = True
+                # 每次拉取只记录一次轮询结果（未变化的拉取已在拉取时记录）；只用真实的发布时间学习更新节奏
+                if not snapshot.poll_recorded:
+                    self.poll_schedule.record_poll(
+                        snapshot.feed_url,
+                        [
+                            item['published_at'] for item in snapshot.items or []
+                            if item.get('published_at') and not item.get('published_at_estimated')
+                        ]
+                    )
+                    snapshot.poll_recorded = True
+                # 条目已解析，释放原始响应体占用的内存
+                snapshot.content = None
+            return snapshot.items
+    
+    def _build_feed_url(self, rss_url: str) -> str:
+        """构建完整的Feed URL（相对路径拼接自建RSShub实例地址）"""
+        if rss_url.startswith('http'):
+            return rss_url
+        return f"{self.rsshub_base_url}{rss_url}"
     
     def _parse_rss_feed(self, raw_content: bytes) -> Optional[feedparser.FeedParserDict]:
         """
@@ -330,8 +458,9 @@ class RSSContentService:
         
         for entry in feed.entries:
             try:
-                # 处理发布时间
-                published_at = self._parse_publish_date(entry)
+                # 处理发布时间（条目没有可解析的时间时用当前时间代替，并标记为估计值）
+                parsed_published_at = self._parse_publish_date(entry)
+                published_at = parsed_published_at or datetime.now()
                 
                 # 🔥 时间范围过滤：只保留指定天数内的内容
                 if published_at < self.time_cutoff:
@@ -364,6 +493,7 @@ class RSSContentService:
                     'description_text': description_text,
                     'author': author,
                     'published_at': published_at,
+                    'published_at_estimated': parsed_published_at is None,
                     'original_link': original_link,
                     'content_type': content_type,
                     'platform': feed_info['platform'],
@@ -560,7 +690,7 @@ class RSSContentService:
         
         return clean_text
     
-    def _parse_publish_date(self, entry: feedparser.util.FeedParserDict) -> datetime:
+    def _parse_publish_date(self, entry: feedparser.util.FeedParserDict) -> Optional[datetime]:
         """
         解析发布时间
         
@@ -568,7 +698,7 @@ class RSSContentService:
             entry: feedparser条目
             
         Returns:
-            datetime: 解析后的时间对象
+            Optional[datetime]: 解析后的时间对象，条目没有可解析的时间时返回None
         """
         # 尝试从多个字段获取时间
         time_fields = ['published_parsed', 'updated_parsed', 'created_parsed']
@@ -581,9 +711,8 @@ class RSSContentService:
                 except (ValueError, TypeError):
                     continue
         
-        # 如果都失败，使用当前时间
-        logger.debug("⚠️ 无法解析发布时间，使用当前时间")
-        return datetime.now()
+        logger.debug("⚠️ 无法解析发布时间")
+        return None
     
     def _extract_description(self, entry: feedparser.util.FeedParserDict) -> str:
         """
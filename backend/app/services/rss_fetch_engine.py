@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+RSS异步拉取引擎
+为RSSContentService提供非阻塞的HTTP拉取能力：
+- 共享requests.Session，按主机复用keep-alive连接（连接池）
+- 按主机限制并发数，避免压垮自建RSShub实例
+- 全局令牌桶限制请求速率，集中到期的拉取被整形为平稳的请求流
+- 阻塞IO放到线程池执行，重试退避使用asyncio.sleep，不阻塞事件循环
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, List
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+
+@dataclass
+class FeedFetchResult:
+    """单个Feed的HTTP拉取结果"""
+    url: str
+    status_code: Optional[int] = None
+    content: Optional[bytes] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0            # 含重试在内的总耗时（秒）
+    attempts: int = 0
+    error: Optional[str] = None
+    error_class: Optional[str] = None  # 错误类型：http_<状态码>、empty或异常类名（如ReadTimeout）
+
+    @property
+    def success(self) -> bool:
+        """是否拿到了有效响应体"""
+        return self.error is None and bool(self.content)
+
+    @property
+    def not_modified(self) -> bool:
+        """服务端是否返回304（条件请求命中）"""
+        return self.error is None and self.status_code == 304
+
+
+class TokenBucket:
+    """
+    令牌桶限速器（跨线程、跨事件循环共享）
+
+    按预约方式发放令牌：在锁内计算本次请求可以发出的时间点，
+    锁外用asyncio.sleep等待，不依赖绑定事件循环的asyncio原语
+    """
+
+    def __init__(self, rate_per_second: float, burst: int):
+        """
+        初始化令牌桶
+
+        Args:
+            rate_per_second: 平均速率（每秒令牌数）
+            burst: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {'acquired': 0, 'delayed': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+
+    def _reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数（令牌可透支，透支部分按速率折算为等待时间）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = max(0.0, -self._tokens / self.rate)
+
+            self._stats['acquired'] += 1
+            if wait > 0:
+                self._stats['delayed'] += 1
+                self._stats['total_wait'] += wait
+                self._stats['max_wait'] = max(self._stats['max_wait'], wait)
+            return wait
+
+    async def acquire(self) -> float:
+        """获取一个令牌（必要时非阻塞等待），返回实际等待的秒数"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限速统计（backlog_seconds为当前已预约、尚未发出的请求排队时长）"""
+        with self._lock:
+            tokens = min(self.burst, self._tokens + (time.monotonic() - self._updated) * self.rate)
+            stats = dict(self._stats)
+        stats['avg_wait'] = round(stats['total_wait'] / stats['delayed'], 3) if stats['delayed'] else 0.0
+        stats['backlog_seconds'] = round(max(0.0, -tokens / self.rate), 3)
+        stats['rate_per_second'] = self.rate
+        stats['burst'] = self.burst
+        return stats
+
+
+class FeedFetchEngine:
+    """
+    异步Feed拉取引擎
+
+    Features:
+    - 每个主机一个连接池，连接在请求之间保持复用
+    - 每个主机独立的并发上限（asyncio.Semaphore，按事件循环隔离）
+    - 指数退避 + 随机抖动的非阻塞重试
+    - 全局令牌桶限速（每次请求尝试消耗一个令牌，包括重试）
+    """
+
+    def __init__(
+        self,
+        timeout: int = 15,
+        max_retries: int = 2,
+        base_delay: float = 1.0,
+        per_host_limit: int = 8,
+        user_agent: Optional[str] = None,
+        rate_per_second: float = 5.0,
+        rate_burst: int = 10
+    ):
+        """
+        初始化拉取引擎
+
+        Args:
+            timeout: 单次HTTP请求超时时间（秒）
+            max_retries: 失败后的最大重试次数
+            base_delay: 重试退避的基础延迟（秒）
+            per_host_limit: 每个主机的最大并发请求数（同时也是连接池大小）
+            user_agent: 请求使用的User-Agent
+            rate_per_second: 全局请求速率上限（每秒请求数）
+            rate_burst: 允许的突发请求数
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.per_host_limit = per_host_limit
+        self.user_agent = user_agent or (
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        )
+
+        # 共享Session：urllib3按(scheme, host, port)维护连接池，pool_maxsize与主机并发上限一致
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=per_host_limit,
+            max_retries=0
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # asyncio原语绑定事件循环，按循环分别维护每个主机的信号量
+        self._host_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._semaphore_lock = threading.Lock()
+
+        # 全局请求限速（主要流量是自建RSShub实例）
+        self.rate_limiter = TokenBucket(rate_per_second, rate_burst)
+
+    def _get_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        """获取当前事件循环中指定主机的并发信号量"""
+        loop = asyncio.get_running_loop()
+        with self._semaphore_lock:
+            loop_semaphores = self._host_semaphores.setdefault(loop, {})
+            semaphore = loop_semaphores.get(host)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.per_host_limit)
+                loop_semaphores[host] = semaphore
+            return semaphore
+
+    def _build_headers(self, extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """构建请求头"""
+        headers = {
+            'User-Agent': self.user_agent,
+            'Accept': 'application/rss+xml, application/xml, text/xml, */*',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+        }
+        if extra_headers:
+            headers.update(extra_headers)
+        return headers
+
+    def _do_request(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """同步执行HTTP请求（在线程池中运行）"""
+        return self._session.get(
+            url,
+            headers=headers,
+            timeout=self.timeout,
+            allow_redirects=True
+        )
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """计算第attempt次重试前的退避时间（指数退避 + 抖动）"""
+        delay = self.base_delay * (2 ** (attempt - 1))
+        return delay + random.uniform(0, delay / 2)
+
+    async def fetch(
+        self,
+        url: str,
+        extra_headers: Optional[Dict[str, str]] = None,
+        max_retries: Optional[int] = None
+    ) -> FeedFetchResult:
+        """
+        异步拉取单个Feed
+
+        Args:
+            url: 完整的Feed URL
+            extra_headers: 额外请求头
+            max_retries: 本次的最大重试次数，默认使用引擎配置（已在连续失败的Feed可以传0）
+
+        Returns:
+            FeedFetchResult: 拉取结果（失败时error字段非空，不抛异常）
+        """
+        host = urlparse(url).netloc or url
+        semaphore = self._get_host_semaphore(host)
+        headers = self._build_headers(extra_headers)
+        result = FeedFetchResult(url=url)
+        started = time.monotonic()
+        max_retries = self.max_retries if max_retries is None else max_retries
+
+        for attempt in range(max_retries + 1):
+            if attempt > 0:
+                # 退避期间不占用主机并发名额
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+            result.attempts = attempt + 1
+            logger.debug(f"🔄 尝试 {attempt + 1}/{max_retries + 1}: {url}")
+
+            # 先取令牌再占并发名额，限速等待期间不占用主机连接
+            await self.rate_limiter.acquire()
+
+            try:
+                async with semaphore:
+                    response = await asyncio.to_thread(self._do_request, url, headers)
+
+                result.status_code = response.status_code
+                result.headers = dict(response.headers)
+
+                # 条件请求命中：内容未变化，没有响应体
+                if response.status_code == 304:
+                    result.error = None
+                    result.error_class = None
+                    logger.debug(f"📭 Feed未变化(304): {url}")
+                    break
+
+                # 4xx（除429外）属于确定性错误，重试没有意义
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    result.error = f"HTTP {response.status_code}"
+                    result.error_class = f"http_{response.status_code}"
+                    logger.warning(f"⚠️ 请求被拒绝，不再重试: {url} | HTTP {response.status_code}")
+                    break
+
+                response.raise_for_status()
+
+                if response.content:
+                    result.content = response.content
+                    result.error = None
+                    result.error_class = None
+                    logger.success(f"✅ 成功获取RSS内容，大小: {len(response.content)} bytes")
+                    break
+
+                result.error = "响应内容为空"
+                result.error_class = "empty"
+                logger.warning("⚠️ 响应内容为空")
+
+            except requests.exceptions.HTTPError as e:
+                result.error = str(e)
+                result.error_class = f"http_{e.response.status_code}" if e.response is not None else type(e).__name__
+                logger.warning(f"⚠️ 请求失败 (尝试{attempt + 1}): {e}")
+
+            except requests.exceptions.RequestException as e:
+                result.error = str(e)
+                result.error_class = type(e).__name__
+                logger.warning(f"⚠️ 请求失败 (尝试{attempt + 1}): {e}")
+
+        result.elapsed = time.monotonic() - started
+        if result.error:
+            logger.error(f"❌ 所有重试尝试失败: {url} | {result.error}")
+        return result
+
+    async def fetch_many(self, urls: List[str]) -> List[FeedFetchResult]:
+        """
+        并发拉取多个Feed（受每主机并发上限约束）
+
+        Args:
+            urls: Feed URL列表
+
+        Returns:
+            List[FeedFetchResult]: 与输入顺序一致的拉取结果
+        """
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取拉取引擎统计（限速器状态）"""
+        return {'rate_limiter': self.rate_limiter.get_stats()}
+
+    def close(self):
+        """关闭连接池"""
+        self._session.close()
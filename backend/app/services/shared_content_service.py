@@ -5,13 +5,19 @@
 """
 
 import json
+import asyncio
+import sqlite3
 from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
+from datetime import datetime, timedelta
 from loguru import logger
 
-from ..core.database_manager import get_db_connection, get_db_transaction
+from ..core.async_database import async_db
+from ..core.write_queue import write_queue
+from ..core.pagination import encode_cursor, decode_cursor
 from .content_deduplication_service import ContentDeduplicationService
 from .user_content_relation_service import UserContentRelationService
+from .content_search_service import content_search_service
+from .expiry_reaper import expiry_reaper
 
 
 class SharedContentService:
@@ -21,8 +27,57 @@ class SharedContentService:
         self.db_path = db_path
         self.dedup_service = ContentDeduplicationService(db_path)
         self.relation_service = UserContentRelationService(db_path)
+        self._init_listing_index()
         logger.info("🔧 共享内容服务初始化完成")
     
+    def _init_listing_index(self):
+        """
+        初始化内容列表的键集分页索引
+        
+        user_content_relations冗余一列published_at，列表查询按
+        (user_id, published_at, content_id, subscription_id) 索引顺序扫描，
+        翻页只需定位到游标位置，不再排序和跳过前面的行
+        """
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("PRAGMA table_info(user_content_relations)")
+            columns = {row[1] for row in cursor.fetchall()}
+            if not columns:
+                # 共享内容表尚未创建，由建表脚本负责
+                return
+            
+            if 'published_at' not in columns:
+                cursor.execute("ALTER TABLE user_content_relations ADD COLUMN published_at TIMESTAMP")
+                cursor.execute("""
+                    UPDATE user_content_relations
+                    SET published_at = (
+                        SELECT published_at FROM shared_contents WHERE id = user_content_relations.content_id
+                    )
+                    WHERE published_at IS NULL
+                """)
+                logger.info(f"📑 已为用户内容关系补齐排序字段: {cursor.rowcount}条")
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_relations_user_feed
+                ON user_content_relations (user_id, published_at, content_id, subscription_id, expires_at)
+            """)
+            
+            # 兜底：未显式写入published_at的插入路径由触发器补齐
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS fill_relation_published_at
+                AFTER INSERT ON user_content_relations
+                WHEN NEW.published_at IS NULL
+                BEGIN
+                    UPDATE user_content_relations
+                    SET published_at = (SELECT published_at FROM shared_contents WHERE id = NEW.content_id)
+                    WHERE id = NEW.id;
+                END
+            """)
+            
+            conn.commit()
+    
     async def store_rss_content(
         self, 
         rss_items: List[Dict[str, Any]], 
@@ -41,55 +96,13 @@ class SharedContentService:
             Dict: 处理结果统计
         """
         try:
-            processed_count = 0
-            new_content_count = 0
-            reused_content_count = 0
-            need_ai_processing_ids = []  # 🔥 改名：需要AI处理的内容ID（不管新旧）
-            
             logger.info(f"开始处理RSS内容: {len(rss_items)}条, user_id={user_id}, subscription_id={subscription_id}")
             
-            for item in rss_items:
-                try:
-                    # 1. 查找或创建共享内容
-                    content_id, is_new = await self.dedup_service.find_or_create_content(item)
-                    
-                    # 2. 建立用户关系（24小时有效期）
-                    relation_id = await self.relation_service.create_relation(
-                        user_id=user_id,
-                        content_id=content_id,
-                        subscription_id=subscription_id,
-                        expires_hours=24
-                    )
-                    
-                    # 3. 处理媒体项
-                    if item.get('media_items'):
-                        await self._store_media_items(content_id, item['media_items'])
-                    
-                    # 4. 检查是否需要AI处理（直接检查AI字段是否为空）
-                    if await self._needs_ai_processing(content_id):
-                        need_ai_processing_ids.append(content_id)
-                    
-                    # 5. 统计
-                    if is_new:
-                        new_content_count += 1
-                        logger.debug(f"创建新内容: content_id={content_id}, title={item.get('title', '')[:50]}...")
-                    else:
-                        reused_content_count += 1
-                        logger.debug(f"复用现有内容: content_id={content_id}")
-                    
-                    processed_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"处理单条RSS内容失败: {e}, item={item.get('title', 'Unknown')}")
-                    continue
-            
-            result = {
-                'total_processed': processed_count,
-                'new_content': new_content_count,
-                'reused_content': reused_content_count,
-                'deduplication_rate': round(reused_content_count / max(processed_count, 1) * 100, 1),
-                'need_ai_processing_ids': need_ai_processing_ids  # 🔥 返回需要AI处理的内容ID列表
-            }
+            # 哈希计算放到线程池，写入提交给单写者队列，与其他写操作分组提交
+            items_by_hash = await asyncio.to_thread(self._prepare_ingest_items, rss_items)
+            result = await write_queue.run(
+                self._bulk_ingest, items_by_hash, len(rss_items), subscription_id, user_id, 24
+            )
             
             logger.success(f"RSS内容处理完成: {result}")
             return result
@@ -98,6 +111,154 @@ class SharedContentService:
             logger.error(f"存储RSS内容失败: {e}")
             raise
     
+    def _prepare_ingest_items(self, rss_items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """计算所有条目的哈希，同一批次内的重复条目只保留第一条"""
+        items_by_hash: Dict[str, Dict[str, Any]] = {}
+        for item in rss_items:
+            content_hash = self.dedup_service.generate_content_hash(
+                item.get('title', ''),
+                item.get('original_link', '')
+            )
+            items_by_hash.setdefault(content_hash, item)
+        return items_by_hash
+    
+    def _bulk_ingest(
+        self,
+        conn,
+        items_by_hash: Dict[str, Dict[str, Any]],
+        raw_count: int,
+        subscription_id: int,
+        user_id: int,
+        expires_hours: int = 24
+    ) -> Dict[str, Any]:
+        """
+        集合式批量入库（写队列操作）：一次查询解析已有内容，executemany写入内容、关系和媒体项
+        
+        Args:
+            conn: 写队列事务连接
+            items_by_hash: 去重后的内容项（content_hash -> 内容项）
+            raw_count: 去重前的条目数
+            subscription_id: 订阅ID
+            user_id: 用户ID
+            expires_hours: 关系有效期（小时）
+            
+        Returns:
+            Dict: 处理结果统计
+        """
+        now = datetime.now()
+        expires_at = now + timedelta(hours=expires_hours)
+        
+        if not items_by_hash:
+            return {
+                'total_processed': 0,
+                'new_content': 0,
+                'reused_content': 0,
+                'deduplication_rate': 0,
+                'need_ai_processing_ids': []
+            }
+        
+        all_hashes = list(items_by_hash.keys())
+        cursor = conn.cursor()
+        
+        # 1. 一次查询解析已存在的内容
+        existing_ids = self._select_ids_by_hash(cursor, all_hashes)
+        new_hashes = [h for h in all_hashes if h not in existing_ids]
+        
+        # 2. 逐条幂等写入新内容：依赖content_hash唯一约束，已被其他写入抢先插入的内容直接复用返回的ID
+        created_ids = {}
+        for h in new_hashes:
+            content_id, is_new = self.dedup_service.upsert_content(conn, items_by_hash[h], h, now)
+            if is_new:
+                created_ids[h] = content_id
+            else:
+                existing_ids[h] = content_id
+        
+        content_ids = {**created_ids, **existing_ids}
+        
+        # 3. 批量建立用户关系（冗余published_at供列表分页），已存在的关系只续期
+        cursor.executemany("""
+            INSERT INTO user_content_relations (
+                user_id, content_id, subscription_id, expires_at, created_at, published_at
+            ) VALUES (?, ?, ?, ?, ?, (SELECT published_at FROM shared_contents WHERE id = ?))
+            ON CONFLICT(user_id, content_id, subscription_id) DO UPDATE SET
+                expires_at = excluded.expires_at
+        """, [
+            (user_id, content_ids[h], subscription_id, expires_at, now, content_ids[h])
+            for h in all_hashes if h in content_ids
+        ])
+        
+        # 4. 只为新内容写入媒体项，复用内容的媒体项已存在
+        media_rows = []
+        for h in created_ids:
+            for i, media in enumerate(items_by_hash[h].get('media_items') or []):
+                media_rows.append((
+                    created_ids[h],
+                    media.get('url', ''),
+                    media.get('type', 'image'),
+                    media.get('description', ''),
+                    media.get('duration'),
+                    i
+                ))
+        if media_rows:
+            cursor.executemany("""
+                INSERT INTO shared_content_media_items (
+                    content_id, url, media_type, description, duration, sort_order
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """, media_rows)
+        
+        # 5. 同一事务内找出AI字段为空的内容
+        need_ai_processing_ids = self._select_ids_needing_ai(cursor, list(content_ids.values()))
+    
+        new_content_count = len(created_ids)
+        processed_count = len(content_ids)
+        reused_content_count = processed_count - new_content_count
+        
+        logger.debug(
+            f"批量入库: 条目{raw_count}条, 去重后{len(all_hashes)}条, "
+            f"新增{new_content_count}条, 媒体项{len(media_rows)}条"
+        )
+        
+        return {
+            'total_processed': processed_count,
+            'new_content': new_content_count,
+            'reused_content': reused_content_count,
+            'deduplication_rate': round(reused_content_count / max(processed_count, 1) * 100, 1),
+            'need_ai_processing_ids': need_ai_processing_ids  # 🔥 返回需要AI处理的内容ID列表
+        }
+    
+    @staticmethod
+    def _chunked(values: List[Any], size: int = 500):
+        """按SQLite参数上限分块"""
+        for i in range(0, len(values), size):
+            yield values[i:i + size]
+    
+    def _select_ids_by_hash(self, cursor, content_hashes: List[str]) -> Dict[str, int]:
+        """批量查询content_hash对应的内容ID"""
+        ids = {}
+        for chunk in self._chunked(content_hashes):
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f"""
+                SELECT content_hash, id FROM shared_contents
+                WHERE content_hash IN ({placeholders})
+            """, chunk)
+            ids.update({row[0]: row[1] for row in cursor.fetchall()})
+        return ids
+    
+    def _select_ids_needing_ai(self, cursor, content_ids: List[int]) -> List[int]:
+        """批量筛选摘要或标签为空、需要AI处理的内容ID"""
+        need_ids = []
+        for chunk in self._chunked(content_ids):
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f"""
+                SELECT id FROM shared_contents
+                WHERE id IN ({placeholders})
+                  AND (summary IS NULL OR TRIM(summary) = ''
+                       OR tags IS NULL OR TRIM(tags) = '')
+                ORDER BY id
+            """, chunk)
+            need_ids.extend(row[0] for row in cursor.fetchall())
+        return need_ids
+    
     async def get_user_contents(
         self, 
         user_id: int, 
@@ -114,112 +275,161 @@ class SharedContentService:
             List[Dict]: 内容列表
         """
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # 基础查询
-                query = """
-                    SELECT 
-                        c.id as content_id,
-                        c.title,
-                        c.author,
-                        c.published_at,
-                        c.original_link,
-                        c.description,
-                        c.description_text,
-                        c.summary,
-                        c.tags,
-                        c.platform,
-                        c.content_type,
-                        c.cover_image,
-                        c.feed_title,
-                        r.subscription_id,
-                        r.is_read,
-                        r.is_favorited,
-                        r.read_at,
-                        r.personal_tags,
-                        r.expires_at,
-                        us.custom_name as subscription_name
-                    FROM shared_contents c
-                    JOIN user_content_relations r ON c.id = r.content_id
-                    LEFT JOIN user_subscriptions us ON r.subscription_id = us.id
-                    WHERE r.user_id = ? 
-                      AND r.expires_at > datetime('now')
-                """
-                
-                # 应用筛选条件
-                params = [user_id]
-                
-                if filters.get('platform'):
-                    query += " AND c.platform = ?"
-                    params.append(filters['platform'])
-                
-                if filters.get('subscription_id'):
-                    query += " AND r.subscription_id = ?"
-                    params.append(filters['subscription_id'])
-                
-                if filters.get('is_read') is not None:
-                    query += " AND r.is_read = ?"
-                    params.append(filters['is_read'])
-                
-                if filters.get('is_favorited') is not None:
-                    query += " AND r.is_favorited = ?"
-                    params.append(filters['is_favorited'])
-                
-                if filters.get('content_type'):
-                    query += " AND c.content_type = ?"
-                    params.append(filters['content_type'])
-                
-                # 排序
-                query += " ORDER BY c.published_at DESC"
-                
-                # 分页
-                limit = filters.get('limit', 20)
-                offset = filters.get('offset', 0)
-                query += " LIMIT ? OFFSET ?"
-                params.extend([limit, offset])
-                
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                
-                # 处理结果
-                contents = []
-                for row in rows:
-                    # 获取媒体项
-                    media_items = await self._get_content_media_items(row[0])
-                    
-                    content = {
-                        'content_id': row[0],
-                        'title': row[1],
-                        'author': row[2],
-                        'published_at': row[3],
-                        'original_link': row[4],
-                        'description': row[5],
-                        'description_text': row[6],
-                        'summary': row[7],
-                        'tags': json.loads(row[8]) if row[8] else [],
-                        'platform': row[9],
-                        'content_type': row[10],
-                        'cover_image': row[11],
-                        'feed_title': row[12],
-                        'subscription_id': row[13],
-                        'is_read': bool(row[14]),
-                        'is_favorited': bool(row[15]),
-                        'read_at': row[16],
-                        'personal_tags': json.loads(row[17]) if row[17] else [],
-                        'expires_at': row[18],
-                        'subscription_name': row[19],
-                        'media_items': media_items
-                    }
-                    contents.append(content)
-                
-                logger.info(f"获取用户内容: user_id={user_id}, 返回{len(contents)}条")
-                return contents
-                
+            page = await self.get_user_contents_page(user_id, **filters)
+            return page['contents']
+            
         except Exception as e:
             logger.error(f"获取用户内容失败: {e}")
             return []
     
+    async def get_user_contents_page(
+        self, 
+        user_id: int, 
+        **filters
+    ) -> Dict[str, Any]:
+        """
+        按游标分页获取用户内容列表
+        
+        Args:
+            user_id: 用户ID
+            **filters: 筛选条件，cursor为上一页返回的next_cursor（为空表示第一页）
+            
+        Returns:
+            Dict: contents, next_cursor, has_more
+            
+        Raises:
+            ValueError: 游标格式无效
+        """
+        cursor_key = decode_cursor(filters.get('cursor'))
+        
+        try:
+            return await async_db.run(self._query_user_contents, user_id, filters, cursor_key)
+            
+        except Exception as e:
+            logger.error(f"获取用户内容失败: {e}")
+            return {'contents': [], 'next_cursor': None, 'has_more': False}
+
+    def _query_user_contents(
+        self, 
+        conn, 
+        user_id: int, 
+        filters: Dict[str, Any], 
+        cursor_key: Optional[Tuple[str, int, int]] = None
+    ) -> Dict[str, Any]:
+        """获取用户内容列表（在数据库线程池中执行）"""
+        cursor = conn.cursor()
+        
+        # 基础查询
+        query = """
+            SELECT 
+                c.id as content_id,
+                c.title,
+                c.author,
+                c.published_at,
+                c.original_link,
+                c.description,
+                c.description_text,
+                c.summary,
+                c.tags,
+                c.platform,
+                c.content_type,
+                c.cover_image,
+                c.feed_title,
+                r.subscription_id,
+                r.is_read,
+                r.is_favorited,
+                r.read_at,
+                r.personal_tags,
+                r.expires_at,
+                us.custom_name as subscription_name,
+                r.published_at as sort_published_at
+            FROM user_content_relations r
+            JOIN shared_contents c ON c.id = r.content_id
+            LEFT JOIN user_subscriptions us ON r.subscription_id = us.id
+            WHERE r.user_id = ? 
+              AND r.expires_at > datetime('now')
+        """
+        
+        # 应用筛选条件
+        params = [user_id]
+        
+        if filters.get('platform'):
+            query += " AND c.platform = ?"
+            params.append(filters['platform'])
+        
+        if filters.get('subscription_id'):
+            query += " AND r.subscription_id = ?"
+            params.append(filters['subscription_id'])
+        
+        if filters.get('is_read') is not None:
+            query += " AND r.is_read = ?"
+            params.append(filters['is_read'])
+        
+        if filters.get('is_favorited') is not None:
+            query += " AND r.is_favorited = ?"
+            params.append(filters['is_favorited'])
+        
+        if filters.get('content_type'):
+            query += " AND c.content_type = ?"
+            params.append(filters['content_type'])
+        
+        # 键集分页：从上一页最后一条之后继续
+        if cursor_key:
+            query += " AND (r.published_at, r.content_id, r.subscription_id) < (?, ?, ?)"
+            params.extend(cursor_key)
+        
+        # 排序（与idx_relations_user_feed索引顺序一致）
+        query += " ORDER BY r.published_at DESC, r.content_id DESC, r.subscription_id DESC"
+        
+        # 分页：多取一条判断是否还有下一页；未使用游标时兼容offset
+        limit = filters.get('limit', 20)
+        query += " LIMIT ?"
+        params.append(limit + 1)
+        if not cursor_key and filters.get('offset'):
+            query += " OFFSET ?"
+            params.append(filters['offset'])
+        
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][20], rows[-1][0], rows[-1][13]) if has_more else None
+        
+        # 整页媒体项一次查询加载
+        media_by_content = self._get_media_items_by_content(cursor, [row[0] for row in rows])
+        
+        # 处理结果
+        contents = []
+        for row in rows:
+            content = {
+                'content_id': row[0],
+                'title': row[1],
+                'author': row[2],
+                'published_at': row[3],
+                'original_link': row[4],
+                'description': row[5],
+                'description_text': row[6],
+                'summary': row[7],
+                'tags': json.loads(row[8]) if row[8] else [],
+                'platform': row[9],
+                'content_type': row[10],
+                'cover_image': row[11],
+                'feed_title': row[12],
+                'subscription_id': row[13],
+                'is_read': bool(row[14]),
+                'is_favorited': bool(row[15]),
+                'read_at': row[16],
+                'personal_tags': json.loads(row[17]) if row[17] else [],
+                'expires_at': row[18],
+                'subscription_name': row[19],
+                'media_items': media_by_content.get(row[0], [])
+            }
+            contents.append(content)
+        
+        logger.info(f"获取用户内容: user_id={user_id}, 返回{len(contents)}条")
+        return {'contents': contents, 'next_cursor': next_cursor, 'has_more': has_more}
+
     async def update_content_status(
         self, 
         user_id: int, 
@@ -277,49 +487,6 @@ class SharedContentService:
             logger.error(f"获取用户内容统计失败: {e}")
             return {}
     
-    async def _needs_ai_processing(self, content_id: int) -> bool:
-        """
-        检查内容是否需要AI处理（直接检查AI字段是否为空）
-        
-        Args:
-            content_id: 内容ID
-            
-        Returns:
-            bool: True表示需要AI处理，False表示已经处理过
-        """
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT summary, tags 
-                    FROM shared_contents 
-                    WHERE id = ?
-                """, (content_id,))
-                
-                result = cursor.fetchone()
-                if not result:
-                    # 内容不存在，理论上不应该发生
-                    return False
-                
-                summary, tags = result
-                
-                # 检查摘要和标签是否为空
-                has_summary = summary and summary.strip()
-                has_tags = tags and tags.strip()
-                
-                # 只要有一个AI字段为空，就需要处理
-                needs_processing = not (has_summary and has_tags)
-                
-                if needs_processing:
-                    logger.debug(f"内容需要AI处理: content_id={content_id}, summary={bool(has_summary)}, tags={bool(has_tags)}")
-                
-                return needs_processing
-                
-        except Exception as e:
-            logger.error(f"检查AI处理需求失败: {e}")
-            # 出错时保守处理，认为需要AI处理
-            return True
-
     async def get_contents_by_ids(self, content_ids: List[int]) -> List[Dict[str, Any]]:
         """
         根据content_ids批量获取内容（用于AI预处理）
@@ -334,63 +501,69 @@ class SharedContentService:
             return []
             
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # 构建查询语句
-                placeholder = ','.join(['?'] * len(content_ids))
-                query = f"""
-                    SELECT 
-                        id as content_id,
-                        title,
-                        author,
-                        published_at,
-                        original_link,
-                        description,
-                        description_text,
-                        summary,
-                        tags,
-                        platform,
-                        content_type,
-                        cover_image,
-                        feed_title,
-                        content_hash
-                    FROM shared_contents
-                    WHERE id IN ({placeholder})
-                    ORDER BY id DESC
-                """
-                
-                cursor.execute(query, content_ids)
-                rows = cursor.fetchall()
-                
-                # 处理结果
-                contents = []
-                for row in rows:
-                    content = {
-                        'content_id': row[0],
-                        'title': row[1],
-                        'author': row[2],
-                        'published_at': row[3],
-                        'original_link': row[4],
-                        'description': row[5],
-                        'description_text': row[6],
-                        'summary': row[7],
-                        'tags': json.loads(row[8]) if row[8] else [],
-                        'platform': row[9],
-                        'content_type': row[10],
-                        'cover_image': row[11],
-                        'feed_title': row[12],
-                        'content_hash': row[13]
-                    }
-                    contents.append(content)
-                
-                logger.info(f"批量读取内容: {len(content_ids)}个ID, 返回{len(contents)}条内容")
-                return contents
-                
+            return await async_db.run(self._query_contents_by_ids, content_ids)
+
         except Exception as e:
             logger.error(f"批量读取内容失败: {e}")
             return []
 
+    def _query_contents_by_ids(self, conn, content_ids: List[int]) -> List[Dict[str, Any]]:
+        """批量获取内容（在数据库线程池中执行）"""
+        cursor = conn.cursor()
+        
+        # 构建查询语句
+        placeholder = ','.join(['?'] * len(content_ids))
+        query = f"""
+            SELECT 
+                id as content_id,
+                title,
+                author,
+                published_at,
+                original_link,
+                description,
+                description_text,
+                summary,
+                tags,
+                platform,
+                content_type,
+                cover_image,
+                feed_title,
+                content_hash
+            FROM shared_contents
+            WHERE id IN ({placeholder})
+            ORDER BY id DESC
+        """
+        
+        cursor.execute(query, content_ids)
+        rows = cursor.fetchall()
+        
+        media_by_content = self._get_media_items_by_content(cursor, [row[0] for row in rows])
+        
+        # 处理结果
+        contents = []
+        for row in rows:
+            content = {
+                'content_id': row[0],
+                'title': row[1],
+                'author': row[2],
+                'published_at': row[3],
+                'original_link': row[4],
+                'description': row[5],
+                'description_text': row[6],
+                'summary': row[7],
+                'tags': json.loads(row[8]) if row[8] else [],
+                'platform': row[9],
+                'content_type': row[10],
+                'cover_image': row[11],
+                'feed_title': row[12],
+                'content_hash': row[13],
+                'media_items': media_by_content.get(row[0], [])
+            }
+            contents.append(content)
+        
+        logger.info(f"批量读取内容: {len(content_ids)}个ID, 返回{len(contents)}条内容")
+        return contents
+
     async def get_content_detail(self, content_id: int, user_id: int) -> Optional[Dict[str, Any]]:
         """
         获取内容详情
@@ -403,132 +576,121 @@ class SharedContentService:
             Optional[Dict]: 内容详情
         """
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    SELECT 
-                        c.*,
-                        r.is_read,
-                        r.is_favorited,
-                        r.read_at,
-                        r.personal_tags,
-                        r.subscription_id,
-                        us.custom_name as subscription_name
-                    FROM shared_contents c
-                    LEFT JOIN user_content_relations r ON c.id = r.content_id AND r.user_id = ?
-                    LEFT JOIN user_subscriptions us ON r.subscription_id = us.id
-                    WHERE c.id = ?
-                """, (user_id, content_id))
-                
-                row = cursor.fetchone()
-                if not row:
-                    return None
-                
-                # 获取媒体项
-                media_items = await self._get_content_media_items(content_id)
-                
-                content = {
-                    'content_id': row[0],
-                    'title': row[1],
-                    'description': row[2],
-                    'description_text': row[3],
-                    'author': row[4],
-                    'published_at': row[5],
-                    'original_link': row[6],
-                    'content_type': row[7],
-                    'platform': row[8],
-                    'content_hash': row[9],
-                    'guid': row[10],
-                    'feed_title': row[11],
-                    'feed_description': row[12],
-                    'feed_link': row[13],
-                    'feed_image_url': row[14],
-                    'feed_last_build_date': row[15],
-                    'cover_image': row[16],
-                    'summary': row[17],
-                    'tags': json.loads(row[18]) if row[18] else [],
-                    'created_at': row[19],
-                    'updated_at': row[20],
-                    'is_read': bool(row[21]) if row[21] is not None else False,
-                    'is_favorited': bool(row[22]) if row[22] is not None else False,
-                    'read_at': row[23],
-                    'personal_tags': json.loads(row[24]) if row[24] else [],
-                    'subscription_id': row[25],
-                    'subscription_name': row[26],
-                    'media_items': media_items
-                }
-                
-                return content
-                
+            return await async_db.run(self._query_content_detail, content_id, user_id)
+
         except Exception as e:
             logger.error(f"获取内容详情失败: {e}")
             return None
+
+    def _query_content_detail(self, conn, content_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """获取内容详情（在数据库线程池中执行）"""
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT 
+                c.*,
+                r.is_read,
+                r.is_favorited,
+                r.read_at,
+                r.personal_tags,
+                r.subscription_id,
+                us.custom_name as subscription_name
+            FROM shared_contents c
+            LEFT JOIN user_content_relations r ON c.id = r.content_id AND r.user_id = ?
+            LEFT JOIN user_subscriptions us ON r.subscription_id = us.id
+            WHERE c.id = ?
+        """, (user_id, content_id))
+        
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        # 获取媒体项
+        media_items = self._get_content_media_items(cursor, content_id)
+        
+        content = {
+            'content_id': row[0],
+            'title': row[1],
+            'description': row[2],
+            'description_text': row[3],
+            'author': row[4],
+            'published_at': row[5],
+            'original_link': row[6],
+            'content_type': row[7],
+            'platform': row[8],
+            'content_hash': row[9],
+            'guid': row[10],
+            'feed_title': row[11],
+            'feed_description': row[12],
+            'feed_link': row[13],
+            'feed_image_url': row[14],
+            'feed_last_build_date': row[15],
+            'cover_image': row[16],
+            'summary': row[17],
+            'tags': json.loads(row[18]) if row[18] else [],
+            'created_at': row[19],
+            'updated_at': row[20],
+            'is_read': bool(row[21]) if row[21] is not None else False,
+            'is_favorited': bool(row[22]) if row[22] is not None else False,
+            'read_at': row[23],
+            'personal_tags': json.loads(row[24]) if row[24] else [],
+            'subscription_id': row[25],
+            'subscription_name': row[26],
+            'media_items': media_items
+        }
+        
+        return content
+
+    def _get_content_media_items(self, cursor, content_id: int) -> List[Dict[str, Any]]:
+        """获取单条内容的媒体项（复用调用方的游标）"""
+        return self._get_media_items_by_content(cursor, [content_id]).get(content_id, [])
     
-    async def _store_media_items(self, content_id: int, media_items: List[Dict[str, Any]]) -> None:
-        """存储媒体项"""
-        try:
-            with get_db_transaction() as conn:
-                cursor = conn.cursor()
-                
-                for i, item in enumerate(media_items):
-                    cursor.execute("""
-                        INSERT INTO shared_content_media_items (
-                            content_id, url, media_type, description, duration, sort_order
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                    """, (
-                        content_id,
-                        item.get('url', ''),
-                        item.get('type', 'image'),
-                        item.get('description', ''),
-                        item.get('duration'),
-                        i
-                    ))
-                
-                logger.debug(f"存储媒体项: content_id={content_id}, count={len(media_items)}")
-                
-        except Exception as e:
-            logger.error(f"存储媒体项失败: {e}")
-    
-    async def _get_content_media_items(self, content_id: int) -> List[Dict[str, Any]]:
-        """获取内容媒体项"""
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    SELECT url, media_type, description, duration
-                    FROM shared_content_media_items
-                    WHERE content_id = ?
-                    ORDER BY sort_order
-                """, (content_id,))
-                
-                rows = cursor.fetchall()
-                media_items = []
-                
-                for row in rows:
-                    media_item = {
-                        'url': row[0],
-                        'type': row[1],
-                        'description': row[2],
-                        'duration': row[3]
-                    }
-                    media_items.append(media_item)
-                
-                return media_items
-                
-        except Exception as e:
-            logger.error(f"获取媒体项失败: {e}")
-            return []
-    
+    def _get_media_items_by_content(self, cursor, content_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        一次IN查询加载一页内容的媒体项，在内存中按content_id分组
+        
+        Args:
+            cursor: 调用方的游标
+            content_ids: 内容ID列表
+            
+        Returns:
+            Dict[int, List[Dict]]: content_id -> 媒体项列表（按sort_order排序）
+        """
+        media_by_content: Dict[int, List[Dict[str, Any]]] = {}
+        unique_ids = list(dict.fromkeys(content_ids))
+        
+        for chunk in self._chunked(unique_ids):
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f"""
+                SELECT content_id, url, media_type, description, duration
+                FROM shared_content_media_items
+                WHERE content_id IN ({placeholders})
+                ORDER BY content_id, sort_order
+            """, chunk)
+            
+            for row in cursor.fetchall():
+                media_by_content.setdefault(row[0], []).append({
+                    'url': row[1],
+                    'type': row[2],
+                    'description': row[3],
+                    'duration': row[4]
+                })
+        
+        return media_by_content
+
     async def cleanup_expired_content(self) -> Dict[str, int]:
         """清理过期内容"""
         try:
-            # 清理过期关系和孤立内容
-            deleted_relations = await self.relation_service.cleanup_expired_relations()
+            # 分块清理过期关系、孤立内容、媒体项和向量
+            report = await asyncio.to_thread(expiry_reaper.run_once)
             
             return {
-                'deleted_relations': deleted_relations,
+                'deleted_relations': report['relations_deleted'],
+                'deleted_contents': report['contents_deleted'],
+                'deleted_media_items': report['media_deleted'],
+                'deleted_vectors': report['vectors_deleted'],
+                'chunks': report['chunks'],
+                'elapsed_seconds': report['elapsed_seconds'],
                 'message': '过期内容清理完成'
             }
             
@@ -543,7 +705,7 @@ class SharedContentService:
         **filters
     ) -> List[Dict[str, Any]]:
         """
-        搜索用户内容
+        搜索用户内容（FTS5全文检索，按相关度和发布时间排序）
         
         Args:
             user_id: 用户ID
@@ -551,73 +713,13 @@ class SharedContentService:
             **filters: 其他筛选条件
             
         Returns:
-            List[Dict]: 搜索结果
+            List[Dict]: 搜索结果（包含snippet高亮片段）
         """
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                query = """
-                    SELECT 
-                        c.id as content_id,
-                        c.title,
-                        c.author,
-                        c.published_at,
-                        c.original_link,
-                        c.description_text,
-                        c.platform,
-                        c.content_type,
-                        r.subscription_id,
-                        r.is_read,
-                        r.is_favorited,
-                        us.custom_name as subscription_name
-                    FROM shared_contents c
-                    JOIN user_content_relations r ON c.id = r.content_id
-                    LEFT JOIN user_subscriptions us ON r.subscription_id = us.id
-                    WHERE r.user_id = ? 
-                      AND r.expires_at > datetime('now')
-                      AND (c.title LIKE ? OR c.description_text LIKE ? OR c.author LIKE ?)
-                """
-                
-                params = [user_id, f'%{keyword}%', f'%{keyword}%', f'%{keyword}%']
-                
-                # 应用其他筛选条件
-                if filters.get('platform'):
-                    query += " AND c.platform = ?"
-                    params.append(filters['platform'])
-                
-                query += " ORDER BY c.published_at DESC"
-                
-                # 分页
-                limit = filters.get('limit', 20)
-                offset = filters.get('offset', 0)
-                query += " LIMIT ? OFFSET ?"
-                params.extend([limit, offset])
-                
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                
-                contents = []
-                for row in rows:
-                    content = {
-                        'content_id': row[0],
-                        'title': row[1],
-                        'author': row[2],
-                        'published_at': row[3],
-                        'original_link': row[4],
-                        'description_text': row[5],
-                        'platform': row[6],
-                        'content_type': row[7],
-                        'subscription_id': row[8],
-                        'is_read': bool(row[9]),
-                        'is_favorited': bool(row[10]),
-                        'subscription_name': row[11]
-                    }
-                    contents.append(content)
-                
-                logger.info(f"搜索用户内容: user_id={user_id}, keyword={keyword}, 结果{len(contents)}条")
-                return contents
-                
+            contents = await async_db.run(content_search_service.search, user_id, keyword, filters)
+            logger.info(f"搜索用户内容: user_id={user_id}, keyword={keyword}, 结果{len(contents)}条")
+            return contents
+
         except Exception as e:
             logger.error(f"搜索用户内容失败: {e}")
             return []
@@ -0,0 +1,217 @@
+"""
+订阅批量拉取引擎
+在独立线程中维护一个长期运行的事件循环，供调度器线程提交一批到期用户的拉取任务：
+- 不再为每个订阅创建/销毁事件循环
+- 全局并发上限 + 每用户并发上限，多个用户的订阅源交错并发拉取
+- 记录每个订阅源的拉取耗时，便于定位慢源
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+@dataclass
+class FeedFetchTiming:
+    """单个订阅源的拉取耗时记录"""
+    subscription_id: int
+    rss_url: str
+    success: bool = False
+    not_modified: bool = False
+    new_content: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class UserFetchReport:
+    """单个用户的批量拉取报告"""
+    user_id: int
+    feeds: List[FeedFetchTiming] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def success_count(self) -> int:
+        return sum(1 for feed in self.feeds if feed.success)
+
+    @property
+    def slowest(self) -> Optional[FeedFetchTiming]:
+        return max(self.feeds, key=lambda feed: feed.elapsed, default=None)
+
+
+class SubscriptionFetchEngine:
+    """
+    订阅批量拉取引擎
+
+    Features:
+    - 一个后台线程 + 一个长期事件循环，跨调度周期复用
+    - 全局信号量限制同时处理的订阅源数量
+    - 每用户信号量避免单个大用户占满全局名额
+    """
+
+    def __init__(self, max_concurrent_feeds: int = 32, per_user_limit: int = 4):
+        """
+        初始化拉取引擎
+
+        Args:
+            max_concurrent_feeds: 全局同时处理的最大订阅源数
+            per_user_limit: 单个用户同时处理的最大订阅源数
+        """
+        self.max_concurrent_feeds = max_concurrent_feeds
+        self.per_user_limit = per_user_limit
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动后台事件循环线程（重复调用无副作用）"""
+        with self._lock:
+            if self._loop and self._loop.is_running():
+                return
+
+            ready = threading.Event()
+
+            def _run_loop():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._loop = loop
+                self._global_semaphore = asyncio.Semaphore(self.max_concurrent_feeds)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+                loop.close()
+
+            self._thread = threading.Thread(target=_run_loop, name="subscription-fetch-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+        logger.info(
+            f"🚀 订阅拉取引擎已启动: 全局并发={self.max_concurrent_feeds}, 每用户并发={self.per_user_limit}"
+        )
+
+    def stop(self, timeout: float = 10):
+        """停止事件循环线程"""
+        with self._lock:
+            if not self._loop:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if self._thread:
+                self._thread.join(timeout=timeout)
+            self._loop = None
+            self._thread = None
+            self._global_semaphore = None
+        logger.info("🛑 订阅拉取引擎已停止")
+
+    def submit_users(
+        self,
+        batch: Dict[int, List[Tuple[int, str]]]
+    ) -> "concurrent.futures.Future[Dict[int, UserFetchReport]]":
+        """
+        从任意线程提交一批用户的拉取任务
+
+        Args:
+            batch: user_id -> [(subscription_id, rss_url), ...]
+
+        Returns:
+            Future: 结果为 user_id -> UserFetchReport
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._run_batch(batch), self._loop)
+
+    def run_users(
+        self,
+        batch: Dict[int, List[Tuple[int, str]]],
+        timeout: Optional[float] = None
+    ) -> Dict[int, UserFetchReport]:
+        """
+        提交一批用户的拉取任务并阻塞等待结果（供调度器线程调用）
+
+        Args:
+            batch: user_id -> [(subscription_id, rss_url), ...]
+            timeout: 最长等待时间（秒），None表示不限
+
+        Returns:
+            Dict[int, UserFetchReport]: 每个用户的拉取报告
+        """
+        return self.submit_users(batch).result(timeout=timeout)
+
+    async def _run_batch(self, batch: Dict[int, List[Tuple[int, str]]]) -> Dict[int, UserFetchReport]:
+        """在引擎事件循环中并发执行一批用户的拉取"""
+        started = time.monotonic()
+        total_feeds = sum(len(subscriptions) for subscriptions in batch.values())
+        logger.info(f"🚀 开始批量拉取: 用户数={len(batch)}, 订阅源数={total_feeds}")
+
+        reports = await asyncio.gather(*(
+            self._run_user(user_id, subscriptions) for user_id, subscriptions in batch.items()
+        ))
+
+        logger.success(
+            f"✅ 批量拉取完成: 用户数={len(batch)}, 订阅源数={total_feeds}, "
+            f"耗时{time.monotonic() - started:.2f}s"
+        )
+        return {report.user_id: report for report in reports}
+
+    async def _run_user(self, user_id: int, subscriptions: List[Tuple[int, str]]) -> UserFetchReport:
+        """并发拉取单个用户的全部订阅源（受全局和每用户并发上限约束）"""
+        started = time.monotonic()
+        user_semaphore = asyncio.Semaphore(self.per_user_limit)
+
+        feeds = await asyncio.gather(*(
+            self._run_feed(user_id, subscription_id, rss_url, user_semaphore)
+            for subscription_id, rss_url in subscriptions
+        ))
+
+        report = UserFetchReport(user_id=user_id, feeds=list(feeds), elapsed=time.monotonic() - started)
+        slowest = report.slowest
+        logger.info(
+            f"📊 用户 {user_id} 拉取完成: {report.success_count}/{len(report.feeds)}, "
+            f"耗时{report.elapsed:.2f}s"
+            + (f", 最慢源 {slowest.rss_url} {slowest.elapsed:.2f}s" if slowest else "")
+        )
+        return report
+
+    async def _run_feed(
+        self,
+        user_id: int,
+        subscription_id: int,
+        rss_url: str,
+        user_semaphore: asyncio.Semaphore
+    ) -> FeedFetchTiming:
+        """拉取单个订阅源并记录耗时"""
+        from . import rss_content_service
+
+        timing = FeedFetchTiming(subscription_id=subscription_id, rss_url=rss_url)
+
+        async with user_semaphore:
+            async with self._global_semaphore:
+                started = time.monotonic()
+                try:
+                    result = await rss_content_service.fetch_and_store_rss_content(
+                        rss_url=rss_url,
+                        subscription_id=subscription_id,
+                        user_id=user_id
+                    )
+                    timing.success = bool(result.get('success', False))
+                    timing.not_modified = bool(result.get('not_modified', False))
+                    timing.new_content = result.get('new_content', 0)
+                    timing.error = result.get('error')
+                except Exception as e:
+                    timing.error = str(e)
+                    logger.error(f"❌ 订阅源拉取异常: {rss_url} | {e}")
+                timing.elapsed = time.monotonic() - started
+
+        logger.debug(
+            f"⏱️ 订阅源拉取耗时: user_id={user_id}, subscription_id={subscription_id}, "
+            f"{timing.elapsed:.2f}s, 成功={timing.success}"
+        )
+        return timing
+
+
+# 创建全局实例
+subscription_fetch_engine = SubscriptionFetchEngine()
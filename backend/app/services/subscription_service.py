@@ -1,7 +1,7 @@
 """
 订阅管理服务
 """
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from datetime import datetime
 import sqlite3
 import os
@@ -55,6 +55,12 @@ class SubscriptionService:
                 )
             """)
             
+            # 拉取路径按用户筛选活跃订阅
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_user_subscriptions_user_active
+                ON user_subscriptions (user_id, is_active)
+            """)
+            
             # 执行新的数据库架构（风控和频率配置）
             self._init_fetch_control_tables(cursor)
             
@@ -246,6 +252,35 @@ class SubscriptionService:
                 size=size
             )
     
+    def iter_active_feed_subscriptions(self, user_id: int) -> Iterator[Tuple[int, str]]:
+        """
+        逐行返回用户全部活跃订阅的 (subscription_id, rss_url)（拉取路径使用，不分页、不加载模板）
+        
+        Args:
+            user_id: 用户ID
+            
+        Yields:
+            Tuple[int, str]: (订阅ID, RSS URL)
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, rss_url
+                FROM user_subscriptions
+                WHERE user_id = ? AND is_active = 1
+                ORDER BY id
+            """, (user_id,))
+            
+            for row in cursor:
+                yield row[0], row[1]
+    
+    def count_user_subscriptions(self, user_id: int) -> int:
+        """获取用户订阅总数（包含非活跃订阅）"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM user_subscriptions WHERE user_id = ?", (user_id,))
+            return cursor.fetchone()[0]
+    
     def delete_subscription(self, subscription_id: int, user_id: int = 1) -> bool:
         """删除订阅（真正删除记录）"""
         with get_db_transaction() as conn:
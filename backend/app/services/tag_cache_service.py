@@ -1,16 +1,19 @@
 """
 用户标签缓存服务
 实现标签计算、缓存管理和定时更新功能
+缓存失效由数据变化驱动：用户标签计数变化时由触发器把用户记入tag_cache_dirty_users，
+读取时只检查脏标记，定时任务只刷新被标记的用户
 """
 
 import sqlite3
 import json
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from dataclasses import dataclass
 from loguru import logger
 
 from ..core.database_manager import get_db_connection, get_db_transaction
+from .user_tag_counter_service import user_tag_counter_service
 
 
 @dataclass
@@ -25,8 +28,10 @@ class TagCacheEntry:
 class TagCacheService:
     """标签缓存服务"""
     
-    def __init__(self, db_path: str = "data/rss_subscriber.db"):
+    def __init__(self, db_path: str = "data/rss_subscriber.db", refresh_batch_size: int = 200):
         self.db_path = db_path
+        self.refresh_batch_size = refresh_batch_size
+        self.tag_counters = user_tag_counter_service
         self._init_cache_table()
     
     def _init_cache_table(self):
@@ -49,6 +54,30 @@ class TagCacheService:
             # 创建索引
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_tag_cache_updated ON user_tag_cache (last_updated)")
             
+            # 待刷新缓存的用户（脏标记）
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tag_cache_dirty_users (
+                    user_id INTEGER PRIMARY KEY,
+                    marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # 标签计数变化即标记用户：覆盖内容入库建立关系、AI标签写入/变更、关系删除和时间桶滚动
+            # 触发器内不能用INSERT OR IGNORE：外层UPSERT语句的冲突策略（ABORT）会覆盖触发器内的OR IGNORE，
+            # 用户已被标记时整条入库语句会因唯一约束失败；ON CONFLICT DO NOTHING不受外层策略影响。
+            # 先删除再创建，已有数据库中的旧触发器也会被替换
+            for event in ('INSERT', 'UPDATE'):
+                trigger_name = f"tag_cache_dirty_on_counter_{event.lower()}"
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+                cursor.execute(f"""
+                    CREATE TRIGGER {trigger_name}
+                    AFTER {event} ON user_tag_counters
+                    BEGIN
+                        INSERT INTO tag_cache_dirty_users (user_id) VALUES (NEW.user_id)
+                        ON CONFLICT(user_id) DO NOTHING;
+                    END
+                """)
+            
             conn.commit()
     
     def get_user_tags_from_cache(self, user_id: int) -> Optional[List[Dict[str, any]]]:
@@ -57,28 +86,22 @@ class TagCacheService:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 
+                # 缓存行和脏标记都是主键点查
                 cursor.execute("""
-                    SELECT tags_json, last_updated, content_count
-                    FROM user_tag_cache 
-                    WHERE user_id = ?
+                    SELECT c.tags_json, d.user_id IS NOT NULL as is_dirty
+                    FROM user_tag_cache c
+                    LEFT JOIN tag_cache_dirty_users d ON d.user_id = c.user_id
+                    WHERE c.user_id = ?
                 """, (user_id,))
                 
                 row = cursor.fetchone()
                 if not row:
                     return None
                 
-                tags_json, last_updated, cached_content_count = row
+                tags_json, is_dirty = row
                 
-                # 检查缓存是否过期（30分钟）
-                cache_time = datetime.fromisoformat(last_updated)
-                if datetime.now() - cache_time > timedelta(minutes=30):
-                    logger.info(f"用户{user_id}标签缓存已过期")
-                    return None
-                
-                # 检查内容是否有更新
-                current_content_count = self._get_user_content_count(cursor, user_id)
-                if current_content_count != cached_content_count:
-                    logger.info(f"用户{user_id}内容有更新，缓存失效")
+                if is_dirty:
+                    logger.info(f"用户{user_id}标签计数有更新，缓存失效")
                     return None
                 
                 return json.loads(tags_json)
@@ -91,23 +114,7 @@ class TagCacheService:
         """更新用户标签缓存"""
         try:
             with get_db_transaction() as conn:
-                cursor = conn.cursor()
-                
-                # 计算用户标签
-                tags = self._calculate_user_tags(cursor, user_id)
-                content_count = self._get_user_content_count(cursor, user_id)
-                
-                # 更新缓存
-                cursor.execute("""
-                    INSERT OR REPLACE INTO user_tag_cache 
-                    (user_id, tags_json, content_count, last_updated)
-                    VALUES (?, ?, ?, ?)
-                """, (
-                    user_id, 
-                    json.dumps(tags, ensure_ascii=False),
-                    content_count,
-                    datetime.now().isoformat()
-                ))
+                tags = self._refresh_user_cache(conn.cursor(), user_id)
                 
                 logger.info(f"用户{user_id}标签缓存已更新: {len(tags)}个标签")
                 return tags
@@ -116,6 +123,29 @@ class TagCacheService:
             logger.error(f"更新用户标签缓存失败: {e}")
             return []
     
+    def _refresh_user_cache(self, cursor, user_id: int) -> List[Dict[str, any]]:
+        """重新计算并写入单个用户的标签缓存，同时清除脏标记（在调用方的事务中执行）"""
+        # 先清除脏标记（同时取得写锁），计算期间不会有并发的计数变化漏标
+        cursor.execute("DELETE FROM tag_cache_dirty_users WHERE user_id = ?", (user_id,))
+        
+        # 计算用户标签
+        tags = self._calculate_user_tags(cursor, user_id)
+        content_count = self._get_user_content_count(cursor, user_id)
+        
+        # 更新缓存
+        cursor.execute("""
+            INSERT OR REPLACE INTO user_tag_cache 
+            (user_id, tags_json, content_count, last_updated)
+            VALUES (?, ?, ?, ?)
+        """, (
+            user_id, 
+            json.dumps(tags, ensure_ascii=False),
+            content_count,
+            datetime.now().isoformat()
+        ))
+        
+        return tags
+    
     def get_user_tags_with_cache(self, user_id: int) -> List[Dict[str, any]]:
         """获取用户标签（优先使用缓存）"""
         # 尝试从缓存获取
@@ -127,80 +157,22 @@ class TagCacheService:
         return self.update_user_tags_cache(user_id)
     
     def _calculate_user_tags(self, cursor, user_id: int) -> List[Dict[str, any]]:
-        """计算用户标签（基于时间加权）- 适配字段分离"""
+        """计算用户标签（基于时间加权）- 读取增量维护的分桶计数"""
         try:
-            # 查询用户所有内容的标签统计（时间加权，字段分离版本）
-            query = """
-                SELECT 
-                    tag_value,
-                    SUM(
-                        CASE 
-                            WHEN published_at > datetime('now', '-7 days') THEN 3
-                            WHEN published_at > datetime('now', '-30 days') THEN 2
-                            ELSE 1
-                        END
-                    ) as weighted_score,
-                    COUNT(*) as tag_count
-                FROM (
-                    -- 提取topics字段（单个主题字符串）
-                    SELECT 
-                        c.topics as tag_value, 
-                        c.published_at as published_at
-                    FROM shared_contents c
-                    JOIN user_content_relations r ON c.id = r.content_id
-                    WHERE r.user_id = ? 
-                    AND r.expires_at > datetime('now')
-                    AND c.topics IS NOT NULL 
-                    AND c.topics != ''
-                    AND c.topics != '其他'  -- 排除默认主题
-                    
-                    UNION ALL
-                    
-                    -- 提取tags字段（纯标签JSON数组）
-                    SELECT 
-                        json_each.value as tag_value, 
-                        c.published_at as published_at
-                    FROM shared_contents c
-                    JOIN user_content_relations r ON c.id = r.content_id
-                    CROSS JOIN json_each(c.tags)
-                    WHERE r.user_id = ? 
-                    AND r.expires_at > datetime('now')
-                    AND c.tags IS NOT NULL 
-                    AND json_each.value IS NOT NULL
-                    AND json_each.value != ''
-                ) tagged_content
-                GROUP BY tag_value
-                ORDER BY weighted_score DESC, tag_count DESC
-                LIMIT 15  -- 增加到15个，包含主题+标签
-            """
-            
-            cursor.execute(query, (user_id, user_id))  # 需要两个参数，因为UNION ALL
-            rows = cursor.fetchall()
-            
-            tags = []
-            for row in rows:
-                tag_name, weighted_score, tag_count = row
-                if tag_name and tag_name.strip():  # 过滤空标签
-                    tags.append({
-                        "name": tag_name.strip(),
-                        "count": int(tag_count),
-                        "score": float(weighted_score)
-                    })
-            
-            return tags
+            # 近7天/近30天/更早 三个时间桶按3/2/1加权，包含主题+标签，取前15个
+            return self.tag_counters.get_top_tags(cursor, user_id, limit=15)
             
         except Exception as e:
             logger.error(f"计算用户标签失败: {e}")
             return []
     
     def _get_user_content_count(self, cursor, user_id: int) -> int:
-        """获取用户内容总数（使用新架构）"""
+        """获取用户内容总数：与标签计数同一口径，统计尚未被清理器删除的关系"""
         try:
             cursor.execute("""
                 SELECT COUNT(*)
-                FROM shared_contents c
-                JOIN user_content_relations r ON c.id = r.content_id
-                WHERE r.user_id = ? AND r.expires_at > datetime('now')
+                FROM user_content_relations
+                WHERE user_id = ?
             """, (user_id,))
             
             return cursor.fetchone()[0]
@@ -209,77 +181,53 @@ class TagCacheService:
             logger.error(f"获取用户内容总数失败: {e}")
             return 0
     
-    def get_users_need_cache_update(self) -> List[int]:
-        """获取需要更新缓存的用户列表（使用新架构）"""
+    def get_users_need_cache_update(self, limit: Optional[int] = None) -> List[int]:
+        """获取需要更新缓存的用户列表（被标记为脏的用户，按标记时间先后）"""
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 
-                # 查找活跃用户（最近7天有内容更新的用户，使用新架构）
                 cursor.execute("""
-                    SELECT DISTINCT r.user_id
-                    FROM user_content_relations r
-                    JOIN shared_contents c ON c.id = r.content_id
-                    WHERE c.created_at > datetime('now', '-7 days')
-                    AND r.expires_at > datetime('now')
-                """)
-                
-                active_users = [row[0] for row in cursor.fetchall()]
-                
-                users_need_update = []
+                    SELECT user_id
+                    FROM tag_cache_dirty_users
+                    ORDER BY marked_at
+                    LIMIT ?
+                """, (limit if limit is not None else -1,))
                 
-                for user_id in active_users:
-                    # 检查缓存是否需要更新
-                    cursor.execute("""
-                        SELECT last_updated, content_count
-                        FROM user_tag_cache
-                        WHERE user_id = ?
-                    """, (user_id,))
-                    
-                    cache_row = cursor.fetchone()
-                    current_content_count = self._get_user_content_count(cursor, user_id)
-                    
-                    need_update = False
-                    
-                    if not cache_row:
-                        # 没有缓存记录
-                        need_update = True
-                    else:
-                        last_updated, cached_content_count = cache_row
-                        cache_time = datetime.fromisoformat(last_updated)
-                        
-                        # 检查缓存过期（30分钟）
-                        if datetime.now() - cache_time > timedelta(minutes=30):
-                            need_update = True
-                        
-                        # 检查内容数量变化
-                        elif current_content_count != cached_content_count:
-                            need_update = True
-                    
-                    if need_update:
-                        users_need_update.append(user_id)
-                
-                return users_need_update
+                return [row[0] for row in cursor.fetchall()]
                 
         except Exception as e:
             logger.error(f"获取需要缓存更新的用户失败: {e}")
             return []
     
+    def rollover_tag_buckets(self) -> List[int]:
+        """
+        标签计数时间桶滚动
+        
+        Returns:
+            List[int]: 计数发生变化、需要刷新缓存的用户ID
+        """
+        return sorted(self.tag_counters.rollover())
+    
     def batch_update_user_tags(self, user_ids: List[int] = None) -> Dict[str, int]:
-        """批量更新用户标签缓存"""
+        """批量更新用户标签缓存（每批用户共用一个事务）"""
         if user_ids is None:
             user_ids = self.get_users_need_cache_update()
         
         success_count = 0
         error_count = 0
         
-        for user_id in user_ids:
+        for start in range(0, len(user_ids), self.refresh_batch_size):
+            batch = user_ids[start:start + self.refresh_batch_size]
             try:
-                self.update_user_tags_cache(user_id)
-                success_count += 1
+                with get_db_transaction() as conn:
+                    cursor = conn.cursor()
+                    for user_id in batch:
+                        self._refresh_user_cache(cursor, user_id)
+                success_count += len(batch)
             except Exception as e:
-                logger.error(f"更新用户{user_id}标签缓存失败: {e}")
-                error_count += 1
+                logger.error(f"批量更新用户标签缓存失败（{len(batch)}个用户）: {e}")
+                error_count += len(batch)
         
         logger.info(f"批量更新标签缓存完成: 成功{success_count}, 失败{error_count}")
         
@@ -0,0 +1,309 @@
+"""
+用户标签增量计数服务
+按(用户, 标签)维护分时间桶的计数，代替每次对用户全部内容做时间加权GROUP BY：
+- user_tag_ledger：(用户, 标签, 发布日期) 明细计数，记录当前归属的时间桶
+- user_tag_counters：(用户, 标签) 的 近7天 / 近30天 / 更早 三个桶计数
+关系创建/删除、AI标签写入/变更由触发器增量维护计数；
+定时任务只需把跨过7天/30天边界的明细行挪到下一个桶（桶滚动）
+
+计数口径：关系从入库到被物理删除为止都计入。过期关系不会在到期时减计数，而是在ExpiryReaper
+删除它时由删除触发器减掉，因此计数相对expires_at的滞后不超过清理器的一个周期（默认30分钟）；
+期间被重新入库续期的关系则一直计入
+"""
+
+import sqlite3
+from collections import defaultdict
+from typing import Any, Dict, List, Set
+
+from loguru import logger
+
+from ..core.database_manager import get_db_transaction
+from .content_tag_index_service import content_tag_index_service
+
+
+class TagBucket:
+    """时间桶（按内容发布日期划分）"""
+    RECENT_7D = 0
+    RECENT_30D = 1
+    OLDER = 2
+
+    # 各桶在标签排序中的权重（与原时间加权规则一致）
+    WEIGHTS = {RECENT_7D: 3, RECENT_30D: 2, OLDER: 1}
+    COLUMNS = {RECENT_7D: 'recent_7d', RECENT_30D: 'recent_30d', OLDER: 'older'}
+
+
+# 发布时间缺失的关系记入该日期（归入"更早"桶）
+UNKNOWN_DAY = '0000-00-00'
+
+# 日期 -> 当前时间桶
+BUCKET_SQL = """
+    CASE
+        WHEN {day} >= date('now', '-7 days') THEN 0
+        WHEN {day} >= date('now', '-30 days') THEN 1
+        ELSE 2
+    END
+"""
+
+
+class UserTagCounterService:
+    """用户标签增量计数服务"""
+
+    def __init__(self, db_path: str = "data/rss_subscriber.db"):
+        self.db_path = db_path
+        self.tag_index = content_tag_index_service  # 计数触发器依赖content_tags表
+        self._init_counter_tables()
+
+    def _init_counter_tables(self):
+        """初始化计数表和维护触发器"""
+        # 注意：这里保留原有的sqlite3.connect()，因为数据库管理器可能还未初始化
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_tag_ledger (
+                    user_id INTEGER NOT NULL,
+                    tag_id INTEGER NOT NULL,
+                    day VARCHAR(10) NOT NULL,
+                    cnt INTEGER NOT NULL DEFAULT 0,
+                    bucket INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, tag_id, day)
+                ) WITHOUT ROWID
+            """)
+
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_user_tag_ledger_bucket
+                ON user_tag_ledger (bucket, day)
+            """)
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_tag_counters (
+                    user_id INTEGER NOT NULL,
+                    tag_id INTEGER NOT NULL,
+                    recent_7d INTEGER NOT NULL DEFAULT 0,
+                    recent_30d INTEGER NOT NULL DEFAULT 0,
+                    older INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, tag_id)
+                ) WITHOUT ROWID
+            """)
+
+            # 明细计数变化同步到所属时间桶
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS user_tag_ledger_insert
+                AFTER INSERT ON user_tag_ledger
+                BEGIN
+                    INSERT INTO user_tag_counters (user_id, tag_id, recent_7d, recent_30d, older)
+                    VALUES (
+                        NEW.user_id, NEW.tag_id,
+                        CASE NEW.bucket WHEN 0 THEN NEW.cnt ELSE 0 END,
+                        CASE NEW.bucket WHEN 1 THEN NEW.cnt ELSE 0 END,
+                        CASE NEW.bucket WHEN 2 THEN NEW.cnt ELSE 0 END
+                    )
+                    ON CONFLICT(user_id, tag_id) DO UPDATE SET
+                        recent_7d = recent_7d + excluded.recent_7d,
+                        recent_30d = recent_30d + excluded.recent_30d,
+                        older = older + excluded.older;
+                END
+            """)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS user_tag_ledger_update
+                AFTER UPDATE OF cnt ON user_tag_ledger
+                BEGIN
+                    UPDATE user_tag_counters SET
+                        recent_7d = recent_7d + CASE NEW.bucket WHEN 0 THEN NEW.cnt - OLD.cnt ELSE 0 END,
+                        recent_30d = recent_30d + CASE NEW.bucket WHEN 1 THEN NEW.cnt - OLD.cnt ELSE 0 END,
+                        older = older + CASE NEW.bucket WHEN 2 THEN NEW.cnt - OLD.cnt ELSE 0 END
+                    WHERE user_id = NEW.user_id AND tag_id = NEW.tag_id;
+                END
+            """)
+
+            cursor.execute("PRAGMA table_info(user_content_relations)")
+            relation_columns = {row[1] for row in cursor.fetchall()}
+            if 'published_at' not in relation_columns:
+                # 共享内容表或排序字段尚未就绪（由SharedContentService初始化），暂不建立计数触发器
+                conn.commit()
+                return
+
+            self._create_source_triggers(cursor)
+
+            cursor.execute("SELECT 1 FROM user_tag_ledger LIMIT 1")
+            if not cursor.fetchone():
+                self._backfill(cursor)
+
+            conn.commit()
+
+    def _create_source_triggers(self, cursor):
+        """在关系表和内容标签表上建立计数维护触发器"""
+        relation_day = f"COALESCE(date(COALESCE(NEW.published_at, (SELECT published_at FROM shared_contents WHERE id = NEW.content_id))), '{UNKNOWN_DAY}')"
+        old_relation_day = f"COALESCE(date(OLD.published_at), '{UNKNOWN_DAY}')"
+
+        # 新关系：该内容的每个标签 +1
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS user_tag_count_relation_insert
+            AFTER INSERT ON user_content_relations
+            BEGIN
+                INSERT INTO user_tag_ledger (user_id, tag_id, day, cnt, bucket)
+                SELECT NEW.user_id, ct.tag_id, {relation_day}, 1, {BUCKET_SQL.format(day=relation_day)}
+                FROM content_tags ct
+                WHERE ct.content_id = NEW.content_id
+                ON CONFLICT(user_id, tag_id, day) DO UPDATE SET cnt = cnt + 1;
+            END
+        """)
+
+        # 关系删除（过期清理、取消订阅）：该内容的每个标签 -1
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS user_tag_count_relation_delete
+            AFTER DELETE ON user_content_relations
+            BEGIN
+                UPDATE user_tag_ledger
+                SET cnt = cnt - (
+                    SELECT COUNT(*) FROM content_tags ct
+                    WHERE ct.content_id = OLD.content_id AND ct.tag_id = user_tag_ledger.tag_id
+                )
+                WHERE user_id = OLD.user_id
+                  AND day = {old_relation_day}
+                  AND tag_id IN (SELECT tag_id FROM content_tags WHERE content_id = OLD.content_id);
+            END
+        """)
+
+        # AI标签写入：拥有该内容的每条关系 +1
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS user_tag_count_tag_insert
+            AFTER INSERT ON content_tags
+            BEGIN
+                INSERT INTO user_tag_ledger (user_id, tag_id, day, cnt, bucket)
+                SELECT r.user_id, NEW.tag_id, COALESCE(date(r.published_at), '{UNKNOWN_DAY}'), 1,
+                       {BUCKET_SQL.format(day=f"COALESCE(date(r.published_at), '{UNKNOWN_DAY}')")}
+                FROM user_content_relations r
+                WHERE r.content_id = NEW.content_id
+                ON CONFLICT(user_id, tag_id, day) DO UPDATE SET cnt = cnt + 1;
+            END
+        """)
+
+        # AI标签变更/内容删除：拥有该内容的每条关系 -1
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS user_tag_count_tag_delete
+            AFTER DELETE ON content_tags
+            BEGIN
+                UPDATE user_tag_ledger
+                SET cnt = cnt - (
+                    SELECT COUNT(*) FROM user_content_relations r
+                    WHERE r.content_id = OLD.content_id
+                      AND r.user_id = user_tag_ledger.user_id
+                      AND COALESCE(date(r.published_at), '{UNKNOWN_DAY}') = user_tag_ledger.day
+                )
+                WHERE tag_id = OLD.tag_id
+                  AND (user_id, day) IN (
+                      SELECT r.user_id, COALESCE(date(r.published_at), '{UNKNOWN_DAY}')
+                      FROM user_content_relations r
+                      WHERE r.content_id = OLD.content_id
+                  );
+            END
+        """)
+
+    def _backfill(self, cursor):
+        """首次启用时根据现有关系和标签索引重建计数"""
+        cursor.execute("DELETE FROM user_tag_counters")
+        day = f"COALESCE(date(r.published_at), '{UNKNOWN_DAY}')"
+        cursor.execute(f"""
+            INSERT INTO user_tag_ledger (user_id, tag_id, day, cnt, bucket)
+            SELECT r.user_id, ct.tag_id, {day}, COUNT(*), {BUCKET_SQL.format(day=day)}
+            FROM user_content_relations r
+            JOIN content_tags ct ON ct.content_id = r.content_id
+            GROUP BY r.user_id, ct.tag_id, {day}
+        """)
+        if cursor.rowcount:
+            logger.info(f"🏷️ 用户标签计数回填完成: {cursor.rowcount}条明细")
+
+    def get_top_tags(self, cursor, user_id: int, limit: int = 15) -> List[Dict[str, Any]]:
+        """
+        读取用户的加权热门标签（只读取该用户的计数行）
+
+        Args:
+            cursor: 数据库游标
+            user_id: 用户ID
+            limit: 返回数量
+
+        Returns:
+            List[Dict]: [{"name", "count", "score"}]，按加权分数降序
+        """
+        weights = TagBucket.WEIGHTS
+        cursor.execute(f"""
+            SELECT
+                d.name,
+                c.recent_7d + c.recent_30d + c.older as tag_count,
+                c.recent_7d * {weights[TagBucket.RECENT_7D]}
+                    + c.recent_30d * {weights[TagBucket.RECENT_30D]}
+                    + c.older * {weights[TagBucket.OLDER]} as weighted_score
+            FROM user_tag_counters c
+            JOIN tag_dictionary d ON d.id = c.tag_id
+            WHERE c.user_id = ?
+              AND c.recent_7d + c.recent_30d + c.older > 0
+            ORDER BY weighted_score DESC, tag_count DESC
+            LIMIT ?
+        """, (user_id, limit))
+
+        tags = []
+        for name, tag_count, weighted_score in cursor.fetchall():
+            if name and name.strip():
+                tags.append({
+                    "name": name.strip(),
+                    "count": int(tag_count),
+                    "score": float(weighted_score)
+                })
+        return tags
+
+    def rollover(self) -> Set[int]:
+        """
+        时间桶滚动：把跨过7天/30天边界的明细行计数挪到下一个桶，并清理归零的行
+
+        Returns:
+            Set[int]: 计数发生变化的用户ID
+        """
+        try:
+            with get_db_transaction() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(f"""
+                    SELECT user_id, tag_id, day, cnt, bucket, {BUCKET_SQL.format(day='day')} as current_bucket
+                    FROM user_tag_ledger
+                    WHERE (bucket = 0 AND day < date('now', '-7 days'))
+                       OR (bucket = 1 AND day < date('now', '-30 days'))
+                """)
+                moved = cursor.fetchall()
+
+                deltas: Dict[tuple, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+                for user_id, tag_id, day, cnt, bucket, current_bucket in moved:
+                    deltas[(user_id, tag_id)][bucket] -= cnt
+                    deltas[(user_id, tag_id)][current_bucket] += cnt
+
+                if moved:
+                    cursor.executemany(
+                        "UPDATE user_tag_ledger SET bucket = ? WHERE user_id = ? AND tag_id = ? AND day = ?",
+                        [(current_bucket, user_id, tag_id, day) for user_id, tag_id, day, _, _, current_bucket in moved]
+                    )
+                    cursor.executemany("""
+                        UPDATE user_tag_counters SET
+                            recent_7d = recent_7d + ?,
+                            recent_30d = recent_30d + ?,
+                            older = older + ?
+                        WHERE user_id = ? AND tag_id = ?
+                    """, [
+                        (delta[TagBucket.RECENT_7D], delta[TagBucket.RECENT_30D], delta[TagBucket.OLDER], user_id, tag_id)
+                        for (user_id, tag_id), delta in deltas.items()
+                    ])
+
+                cursor.execute("DELETE FROM user_tag_ledger WHERE cnt <= 0")
+                cursor.execute("DELETE FROM user_tag_counters WHERE recent_7d + recent_30d + older <= 0")
+
+            affected_users = {user_id for user_id, _ in deltas}
+            logger.info(f"🏷️ 标签时间桶滚动完成: 移动{len(moved)}条明细, 涉及{len(affected_users)}个用户")
+            return affected_users
+
+        except Exception as e:
+            logger.error(f"标签时间桶滚动失败: {e}")
+            return set()
+
+
+# 创建全局服务实例
+user_tag_counter_service = UserTagCounterService()
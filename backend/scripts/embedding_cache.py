@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+向量缓存
+以"模型名 + 向量化文本"的哈希为键，把sentence-transformers的编码结果持久化到磁盘：
+- vectors.f32：紧凑的float32追加文件，每行一个向量
+- keys.txt：与向量行号一一对应的哈希索引
+- meta.json：向量维度
+重复向量化与集合重建（reset_collection）时直接读取缓存，不再重新跑模型
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """磁盘向量缓存（追加写入，启动时加载哈希索引）"""
+
+    def __init__(self, cache_dir: str = "data/embedding_cache", namespace: str = ""):
+        """
+        初始化向量缓存
+
+        Args:
+            cache_dir: 缓存目录
+            namespace: 命名空间（通常为模型名），不同模型的向量互不命中
+        """
+        self.cache_dir = Path(cache_dir)
+        self.namespace = namespace
+        self.vectors_path = self.cache_dir / "vectors.f32"
+        self.keys_path = self.cache_dir / "keys.txt"
+        self.meta_path = self.cache_dir / "meta.json"
+
+        self.dim: Optional[int] = None
+        self._index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """加载维度信息和哈希索引，修复写入中断导致的不一致"""
+        if self.meta_path.exists():
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.dim = json.load(f).get('dim')
+
+        if not self.dim:
+            # 没有维度信息时无法解读向量文件，从空缓存开始
+            for path in (self.vectors_path, self.keys_path):
+                if path.exists():
+                    path.unlink()
+            return
+
+        keys = []
+        if self.keys_path.exists():
+            with open(self.keys_path, 'r', encoding='utf-8') as f:
+                keys = [line.strip() for line in f if line.strip()]
+
+        row_bytes = self.dim * 4
+        vector_rows = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+
+        # 两个文件行数不一致时截断到较小者
+        rows = min(len(keys), vector_rows)
+        if rows != len(keys) or rows != vector_rows:
+            keys = keys[:rows]
+            with open(self.keys_path, 'w', encoding='utf-8') as f:
+                f.writelines(f"{key}\n" for key in keys)
+            if self.vectors_path.exists():
+                with open(self.vectors_path, 'r+b') as f:
+                    f.truncate(rows * row_bytes)
+            print(f"⚠️ 向量缓存文件不一致，已截断到{rows}条")
+
+        self._index = {key: row for row, key in enumerate(keys)}
+        print(f"📦 向量缓存加载完成: {len(self._index)}条, 维度={self.dim}")
+
+    def key_for(self, text: str) -> str:
+        """计算文本对应的缓存键"""
+        return hashlib.sha256(f"{self.namespace}\x1f{text}".encode('utf-8')).hexdigest()[:32]
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        批量读取缓存
+
+        Args:
+            texts: 向量化文本列表
+
+        Returns:
+            List[Optional[List[float]]]: 与输入顺序一致，未命中为None
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        with self._lock:
+            rows = [self._index.get(self.key_for(text)) for text in texts]
+            hit_rows = [row for row in rows if row is not None]
+            self._hits += len(hit_rows)
+            self._misses += len(texts) - len(hit_rows)
+
+            if not hit_rows or not self.dim:
+                return results
+
+            matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r').reshape(-1, self.dim)
+            for i, row in enumerate(rows):
+                if row is not None:
+                    results[i] = matrix[row].tolist()
+
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """
+        批量写入缓存（已存在的键跳过）
+
+        Args:
+            texts: 向量化文本列表
+            vectors: 对应的向量列表
+        """
+        if not texts:
+            return
+
+        with self._lock:
+            array = np.asarray(vectors, dtype=np.float32)
+            if array.ndim != 2:
+                return
+
+            if self.dim is None:
+                self.dim = int(array.shape[1])
+                with open(self.meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({'dim': self.dim}, f)
+            elif array.shape[1] != self.dim:
+                print(f"⚠️ 向量维度不一致，跳过缓存写入: {array.shape[1]} != {self.dim}")
+                return
+
+            new_keys, new_rows, seen = [], [], set()
+            for text, vector in zip(texts, array):
+                key = self.key_for(text)
+                if key in self._index or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(vector)
+
+            if not new_keys:
+                return
+
+            # 先写向量再写键，中断时加载阶段按较小行数截断
+            with open(self.vectors_path, 'ab') as f:
+                np.asarray(new_rows, dtype=np.float32).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.keys_path, 'a', encoding='utf-8') as f:
+                f.writelines(f"{key}\n" for key in new_keys)
+
+            start = len(self._index)
+            for offset, key in enumerate(new_keys):
+                self._index[key] = start + offset
+
+    def get_stats(self) -> Dict[str, object]:
+        """获取缓存统计信息"""
+        lookups = self._hits + self._misses
+        return {
+            'entries': len(self._index),
+            'dim': self.dim,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups * 100, 1) if lookups else 0,
+            'size_bytes': self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        }
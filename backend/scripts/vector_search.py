@@ -4,11 +4,14 @@
 专注于向量化技术实现，提供简化的标准接口
 - 内容预处理场景：接收标准字段，直接向量化存储
 - 对话场景：接收用户输入，直接向量化查询
+集合名按向量模型区分：文档和查询都用同一个模型显式编码，换模型时旧集合的文档在后台线程中按新模型重新编码迁移
 """
 
 import sys
 import os
+import re
 import json
+import threading
 import numpy as np
 from pathlib import Path
 from datetime import datetime
@@ -17,6 +20,15 @@ from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.config import Settings
 
+try:
+    from scripts.embedding_cache import EmbeddingCache
+except ImportError:
+    # 直接以脚本方式运行时
+    from embedding_cache import EmbeddingCache
+
+# 早期版本的集合：文档由ChromaDB默认嵌入函数编码，与sentence-transformers模型不在同一向量空间
+LEGACY_COLLECTION_NAME = "rss_contents_unified"
+
 class VectorSearchService:
     """统一向量搜索服务 - 纯技术实现"""
     
@@ -25,14 +37,26 @@ class VectorSearchService:
         print("🔍 正在初始化统一向量搜索服务...")
         
         self.persist_directory = persist_directory
-        self.collection_name = "rss_contents_unified"
-        
-        # 初始化ChromaDB客户端
-        self._init_chromadb_client()
         
-        # 加载向量模型
+        # 加载向量模型（写入和查询都用它显式编码，集合名随模型变化）
         print("📦 正在加载sentence-transformers模型...")
-        self.model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+        self.model_name = "paraphrase-multilingual-MiniLM-L12-v2"
+        self.model = SentenceTransformer(self.model_name)
+        self.collection_name = self._collection_name_for(self.model_name)
+        
+        # 向量缓存：相同的向量化文本不再重复编码
+        self.embedding_cache = EmbeddingCache(
+            cache_dir=str(Path(persist_directory).parent / "embedding_cache"),
+            namespace=self.model_name
+        )
+        
+        # 初始化ChromaDB客户端；旧集合在后台迁移，期间新集合正常读写
+        self._legacy_collection = None
+        self._migration_thread: Optional[threading.Thread] = None
+        self._migration_lock = threading.Lock()
+        self._migration_stats = {'status': 'none', 'migrated': 0, 'skipped': 0, 'error': None}
+        self._init_chromadb_client()
+        self._start_legacy_migration()
         
         print("✅ 统一向量搜索服务初始化完成！")
         print("💡 支持场景:")
@@ -40,6 +64,15 @@ class VectorSearchService:
         print("   - 用户对话：直接向量化查询")
         print("=" * 60)
     
+    @staticmethod
+    def _collection_name_for(model_name: str) -> str:
+        """按模型生成集合名（ChromaDB集合名限3-63个字符，只允许字母数字和._-）"""
+        slug = re.sub(r'[^a-zA-Z0-9_-]+', '-', model_name).strip('-_')
+        return f"{LEGACY_COLLECTION_NAME}__{slug}"[:63].rstrip('-_')
+    
+    def _collection_metadata(self) -> Dict[str, str]:
+        return {"description": "RSS内容统一向量化存储", "embedding_model": self.model_name}
+    
     def _init_chromadb_client(self):
         """初始化ChromaDB客户端和集合"""
         try:
@@ -65,7 +98,7 @@ class VectorSearchService:
                 # 集合不存在，创建新集合
                 self.collection = self.client.create_collection(
                     name=self.collection_name,
-                    metadata={"description": "RSS内容统一向量化存储"}
+                    metadata=self._collection_metadata()
                 )
                 print(f"🆕 创建新ChromaDB集合: {self.collection_name}")
                 
@@ -74,6 +107,79 @@ class VectorSearchService:
         except Exception as e:
             print(f"❌ ChromaDB初始化失败: {e}")
             raise
+    
+    def _start_legacy_migration(self):
+        """旧集合存在时启动后台迁移线程，不阻塞服务初始化"""
+        if LEGACY_COLLECTION_NAME == self.collection_name:
+            return
+        try:
+            self._legacy_collection = self.client.get_collection(name=LEGACY_COLLECTION_NAME)
+        except Exception:
+            return
+        
+        self._migration_stats['status'] = 'running'
+        self._migration_thread = threading.Thread(
+            target=self._migrate_legacy_collection, name="vector-legacy-migration", daemon=True
+        )
+        self._migration_thread.start()
+        print(f"🔁 旧向量集合将在后台迁移: {LEGACY_COLLECTION_NAME} -> {self.collection_name}")
+    
+    def _migrate_legacy_collection(self, page_size: int = 256):
+        """
+        旧集合（默认嵌入函数编码）迁移：每次取一页向量化文本和元数据，按当前模型重新编码后upsert到当前集合，
+        再把这一页从旧集合删除。旧集合本身就是剩余进度，中途失败或重启后从剩下的文档继续；全部完成后删除旧集合
+        """
+        legacy = self._legacy_collection
+        stats = self._migration_stats
+        try:
+            print(f"🔁 开始迁移旧向量集合: 剩余{legacy.count()}条")
+            while True:
+                # 每页持锁处理，与删除向量互斥，已删除的内容不会被迁移回来
+                with self._migration_lock:
+                    page = legacy.get(limit=page_size, include=['documents', 'metadatas'])
+                    page_ids = page['ids']
+                    if not page_ids:
+                        break
+                    
+                    # 迁移期间新集合已写入的文档以新集合为准
+                    existing = set(self.collection.get(ids=page_ids, include=[])['ids'])
+                    rows = [
+                        (doc_id, document, metadata)
+                        for doc_id, document, metadata in zip(page_ids, page['documents'], page['metadatas'])
+                        if document and doc_id not in existing
+                    ]
+                    if rows:
+                        doc_ids, documents, metadatas = (list(column) for column in zip(*rows))
+                        self.collection.upsert(
+                            ids=doc_ids,
+                            documents=documents,
+                            embeddings=self.encode_texts(documents),
+                            metadatas=metadatas
+                        )
+                    legacy.delete(ids=page_ids)
+                stats['migrated'] += len(rows)
+                stats['skipped'] += len(page_ids) - len(rows)
+            
+            with self._migration_lock:
+                self._legacy_collection = None
+            self.client.delete_collection(name=LEGACY_COLLECTION_NAME)
+            stats['status'] = 'completed'
+            print(f"✅ 旧向量集合迁移完成: 重新编码{stats['migrated']}条，已删除旧集合")
+            
+        except Exception as e:
+            stats['status'] = 'failed'
+            stats['error'] = str(e)
+            print(f"❌ 旧向量集合迁移失败（已迁移{stats['migrated']}条，下次启动从剩余文档继续）: {e}")
+    
+    def _delete_vectors(self, doc_ids: List[str]):
+        """删除向量；迁移未完成时同时删除旧集合中的文档，避免已删除的内容被迁移回来"""
+        if self._legacy_collection is None:
+            self.collection.delete(ids=doc_ids)
+            return
+        with self._migration_lock:
+            self.collection.delete(ids=doc_ids)
+            if self._legacy_collection is not None:
+                self._legacy_collection.delete(ids=doc_ids)
 
     # ===========================================
     # 内容预处理场景：直接接收标准字段
@@ -83,7 +189,7 @@ class VectorSearchService:
                           topics: str, tags: List[str], platform: str = "", 
                           publish_date: str = "", original_link: str = ""):
         """
-        内容预处理场景：添加内容到向量数据库
+        内容预处理场景：添加内容到向量数据库（单条，内部走批量upsert，重复处理幂等）
         
         Args:
             content_id: 内容ID（数据库主键）
@@ -95,42 +201,142 @@ class VectorSearchService:
             publish_date: 发布日期
             original_link: 原始链接
         """
+        self.add_content_vectors([{
+            'content_id': content_id,
+            'title': title,
+            'summary': summary,
+            'topics': topics,
+            'tags': tags,
+            'platform': platform,
+            'publish_date': publish_date,
+            'original_link': original_link
+        }])
+        print(f"✅ 内容向量存储成功: {title[:30]}... (ID: {content_id})")
+    
+    def add_content_vectors(self, items: List[Dict[str, Any]], chunk_size: int = 128,
+                            encode_batch_size: int = 32) -> int:
+        """
+        内容预处理场景：批量添加内容到向量数据库
+        一次模型前向批量编码，按块upsert到ChromaDB；以content_{id}为文档ID，重复处理会覆盖而不是报错
+        
+        Args:
+            items: 内容列表，每项包含content_id、title、summary、topics、tags，
+                   可选platform、publish_date、original_link
+            chunk_size: 每次upsert的文档数
+            encode_batch_size: 模型编码的批大小
+            
+        Returns:
+            int: 写入的向量数量
+        """
         try:
-            # 1. 组装向量化文本（四个核心元素）
-            vectorization_text = self._prepare_vectorization_text(
-                title, summary, topics, tags
-            )
+            # 1. 组装文档，同一批次内重复的content_id以最后一条为准
+            records: Dict[str, Any] = {}
+            for item in items:
+                doc_id, text, metadata = self._build_content_record(**item)
+                records[doc_id] = (text, metadata)
             
-            # 2. 准备元数据
-            metadata = {
-                'content_id': content_id,
-                'title': title[:100],  # ChromaDB字符串长度限制
-                'summary': summary[:200],
-                'topics': topics[:50],
-                'tags': json.dumps(tags, ensure_ascii=False)[:300],
-                'platform': platform,
-                'publish_date': publish_date,
-                'original_link': original_link,
-                'created_at': datetime.now().isoformat(),
-                'vector_type': 'content'  # 标识向量类型
-            }
+            if not records:
+                return 0
             
-            # 3. 生成文档ID
-            doc_id = f"content_{content_id}"
+            doc_ids = list(records.keys())
+            documents = [records[doc_id][0] for doc_id in doc_ids]
+            metadatas = [records[doc_id][1] for doc_id in doc_ids]
             
-            # 4. 添加到ChromaDB（自动向量化）
-            self.collection.add(
-                documents=[vectorization_text],
-                metadatas=[metadata],
-                ids=[doc_id]
-            )
+            # 2. 批量编码（显式传入embeddings，与查询使用同一个模型）
+            embeddings = self.encode_texts(documents, batch_size=encode_batch_size)
+            
+            # 3. 分块upsert
+            for start in range(0, len(doc_ids), chunk_size):
+                end = start + chunk_size
+                self.collection.upsert(
+                    ids=doc_ids[start:end],
+                    documents=documents[start:end],
+                    embeddings=embeddings[start:end],
+                    metadatas=metadatas[start:end]
+                )
             
-            print(f"✅ 内容向量存储成功: {title[:30]}... (ID: {content_id})")
+            print(f"✅ 批量向量存储成功: {len(doc_ids)}条")
+            return len(doc_ids)
             
         except Exception as e:
-            print(f"❌ 内容向量存储失败: {e}")
+            print(f"❌ 批量向量存储失败: {e}")
             raise
     
+    def encode_texts(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """
+        批量编码文本（优先读取向量缓存，只对未命中的文本运行模型）
+        
+        Args:
+            texts: 文本列表
+            batch_size: 模型编码的批大小
+            
+        Returns:
+            List[List[float]]: 与输入顺序一致的向量列表
+        """
+        if not texts:
+            return []
+        
+        embeddings = self.embedding_cache.get_many(texts)
+        missing = [i for i, vector in enumerate(embeddings) if vector is None]
+        
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            vectors = self.model.encode(
+                missing_texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            ).astype(np.float32)
+            self.embedding_cache.put_many(missing_texts, vectors)
+            for i, vector in zip(missing, vectors.tolist()):
+                embeddings[i] = vector
+        
+        print(f"🔤 文本编码完成: {len(texts)}条, 缓存命中{len(texts) - len(missing)}条")
+        return embeddings
+    
+    def get_embedding(self, text: str) -> List[float]:
+        """
+        获取单条文本的向量（经过向量缓存）
+        
+        Args:
+            text: 文本
+            
+        Returns:
+            List[float]: 向量
+        """
+        return self.encode_texts([text])[0]
+    
+    def _build_content_record(self, content_id: int, title: str, summary: str,
+                              topics: str, tags: List[str], platform: str = "",
+                              publish_date: str = "", original_link: str = ""):
+        """组装单条内容的文档ID、向量化文本和元数据"""
+        title = title or ""
+        summary = summary or ""
+        topics = topics or ""
+        tags = tags or []
+        
+        # 1. 组装向量化文本（四个核心元素）
+        vectorization_text = self._prepare_vectorization_text(
+            title, summary, topics, tags
+        )
+        
+        # 2. 准备元数据
+        metadata = {
+            'content_id': content_id,
+            'title': title[:100],  # ChromaDB字符串长度限制
+            'summary': summary[:200],
+            'topics': topics[:50],
+            'tags': json.dumps(tags, ensure_ascii=False)[:300],
+            'platform': platform or "",
+            'publish_date': publish_date or "",
+            'original_link': original_link or "",
+            'created_at': datetime.now().isoformat(),
+            'vector_type': 'content'  # 标识向量类型
+        }
+        
+        # 3. 生成文档ID
+        return f"content_{content_id}", vectorization_text, metadata
+    
     def _prepare_vectorization_text(self, title: str, summary: str, 
                                    topics: str, tags: List[str]) -> str:
         """
@@ -217,9 +423,9 @@ class VectorSearchService:
             if topics_filter:
                 where_filter["topics"] = topics_filter
             
-            # ChromaDB查询
+            # ChromaDB查询（使用与入库相同的模型编码查询）
             results = self.collection.query(
-                query_texts=[query_text],
+                query_embeddings=[self.encode_user_query(query_text)],
                 n_results=top_k,
                 where=where_filter,
                 include=['metadatas', 'documents', 'distances']
@@ -304,7 +510,9 @@ class VectorSearchService:
                 'recent_items': recent_items[:5],
                 'collection_name': self.collection_name,
                 'persist_directory': self.persist_directory,
-                'model_name': 'paraphrase-multilingual-MiniLM-L12-v2'
+                'model_name': self.model_name,
+                'embedding_cache': self.embedding_cache.get_stats(),
+                'legacy_migration': dict(self._migration_stats)
             }
             
         except Exception as e:
@@ -315,12 +523,25 @@ class VectorSearchService:
         """删除指定内容的向量"""
         try:
             doc_id = f"content_{content_id}"
-            self.collection.delete(ids=[doc_id])
+            self._delete_vectors([doc_id])
             print(f"🗑️ 已删除内容向量: content_id={content_id}")
         except Exception as e:
             print(f"❌ 删除向量失败: {e}")
             raise
     
+    def delete_content_vectors(self, content_ids: List[int]) -> int:
+        """批量删除内容向量（过期清理场景），不存在的ID会被忽略"""
+        doc_ids = [f"content_{content_id}" for content_id in content_ids]
+        if not doc_ids:
+            return 0
+        try:
+            self._delete_vectors(doc_ids)
+            print(f"🗑️ 已删除内容向量: {len(doc_ids)}条")
+            return len(doc_ids)
+        except Exception as e:
+            print(f"❌ 批量删除向量失败: {e}")
+            raise
+    
     def reset_collection(self):
         """重置向量集合（用于测试）"""
         try:
@@ -330,7 +551,7 @@ class VectorSearchService:
             # 重新创建集合
             self.collection = self.client.create_collection(
                 name=self.collection_name,
-                metadata={"description": "RSS内容统一向量化存储"}
+                metadata=self._collection_metadata()
             )
             print(f"🆕 重新创建ChromaDB集合: {self.collection_name}")
             
@@ -0,0 +1,54 @@
+"""
+测试公共夹具
+服务模块导入时即按相对路径data/rss_subscriber.db创建全局实例，数据库管理器、写队列和异步数据库层也是进程级单例，
+所以整个测试会话共用一个临时工作目录：先切换目录并建好共享内容、用户和订阅表，各测试再在夹具中导入其余app模块。
+测试之间用不同的用户、订阅、内容哈希和Feed URL区分数据
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / 'app' / 'database' / 'shared_content_schema.sql'
+
+
+@pytest.fixture(scope='session', autouse=True)
+def app_workdir(tmp_path_factory):
+    """会话级临时工作目录，建好共享内容、用户、订阅和拉取配置表"""
+    workdir = tmp_path_factory.mktemp('app')
+    (workdir / 'data').mkdir()
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+
+    with sqlite3.connect('data/rss_subscriber.db') as conn:
+        conn.executescript(SCHEMA_PATH.read_text(encoding='utf-8'))
+
+    # 用户和订阅服务默认使用backend目录下的数据库，这里显式指向临时数据库建表
+    from app.services.user_service import UserService
+    from app.services.subscription_service import SubscriptionService
+
+    db_path = str(workdir / 'data' / 'rss_subscriber.db')
+    UserService(db_path=db_path)
+    SubscriptionService(db_path=db_path)
+
+    yield workdir
+
+    os.chdir(previous_cwd)
+
+
+@pytest.fixture(scope='session')
+def add_subscriptions(app_workdir):
+    """创建用户及其订阅：add_subscriptions(user_id, {subscription_id: rss_url, ...})"""
+    def _add(user_id, subscriptions):
+        with sqlite3.connect('data/rss_subscriber.db') as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO users (user_id, username, email, password_hash) VALUES (?, ?, ?, '')",
+                (user_id, f'user{user_id}', f'user{user_id}@example.com')
+            )
+            conn.executemany(
+                "INSERT INTO user_subscriptions (id, user_id, template_id, target_user_id, rss_url) VALUES (?, ?, 'test', '', ?)",
+                [(subscription_id, user_id, rss_url) for subscription_id, rss_url in subscriptions.items()]
+            )
+    return _add
@@ -0,0 +1,102 @@
+"""
+AI预处理任务队列测试
+租约领取的原子性、租约过期后重新领取、失败按指数退避重排并在达到最大次数后标记失败
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def make_queue():
+    from app.core.database_manager import get_db_transaction
+    from app.services.ai_job_queue_service import AIJobQueueService
+
+    with get_db_transaction() as conn:
+        conn.execute("DELETE FROM ai_processing_jobs")
+
+    return lambda **kwargs: AIJobQueueService(**kwargs)
+
+
+def _job(content_id):
+    from app.core.database_manager import get_db_connection
+
+    with get_db_connection() as conn:
+        row = conn.execute("""
+            SELECT status, attempts, available_at, lease_until, worker_id, last_error
+            FROM ai_processing_jobs WHERE content_id = ?
+        """, (content_id,)).fetchone()
+    return dict(zip(('status', 'attempts', 'available_at', 'lease_until', 'worker_id', 'last_error'), row))
+
+
+def _make_available(content_id):
+    from app.core.database_manager import get_db_transaction
+
+    with get_db_transaction() as conn:
+        conn.execute(
+            "UPDATE ai_processing_jobs SET available_at = ? WHERE content_id = ?",
+            (datetime.now() - timedelta(seconds=1), content_id)
+        )
+
+
+def test_lease_is_exclusive_until_it_expires(make_queue):
+    queue = make_queue()
+
+    assert queue.enqueue([101, 102, 103], subscription_id=7) == 3
+    # 等待中或运行中的任务重复入队不会被重置
+    assert queue.enqueue([101]) == 0
+
+    # RETURNING不保证顺序
+    leased = queue.lease('worker-a', batch_size=2, lease_seconds=300)
+    assert sorted(leased) == [(101, 7), (102, 7)]
+    assert queue.lease('worker-b', batch_size=5, lease_seconds=300) == [(103, 7)]
+    assert queue.lease('worker-c', batch_size=5) == []
+
+    # 租约过期的运行中任务可被其他工作者重新领取，尝试次数累加
+    queue.enqueue([104])
+    assert queue.lease('worker-d', batch_size=5, lease_seconds=0) == [(104, None)]
+    assert queue.lease('worker-e', batch_size=5) == [(104, None)]
+    job = _job(104)
+    assert (job['worker_id'], job['attempts']) == ('worker-e', 2)
+
+    queue.complete([101])
+    assert _job(101)['status'] == 'done'
+    assert _job(102)['status'] == 'running'
+
+
+def test_fail_backs_off_exponentially_then_gives_up(make_queue):
+    queue = make_queue(max_attempts=3, retry_base_seconds=60)
+    queue.enqueue([201])
+
+    expected_delays = [60, 120]
+    for delay in expected_delays:
+        assert queue.lease('worker', batch_size=1) == [(201, None)]
+        before = datetime.now()
+        queue.fail([201], '超时')
+
+        job = _job(201)
+        available_at = datetime.fromisoformat(job['available_at'])
+        assert job['status'] == 'pending'
+        assert job['lease_until'] is None
+        assert job['last_error'] == '超时'
+        assert before + timedelta(seconds=delay - 1) <= available_at <= datetime.now() + timedelta(seconds=delay)
+        # 退避期内不可领取
+        assert queue.lease('worker', batch_size=1) == []
+
+        _make_available(201)
+
+    # 第三次失败达到最大尝试次数
+    assert queue.lease('worker', batch_size=1) == [(201, None)]
+    queue.fail([201], '超时')
+    assert _job(201)['status'] == 'failed'
+    assert queue.lease('worker', batch_size=1) == []
+
+    # 已结束的任务重新入队时重置尝试次数
+    assert queue.enqueue([201]) == 1
+    job = _job(201)
+    assert (job['status'], job['attempts']) == ('pending', 0)
+
+    stats = queue.get_stats()
+    assert stats['pending'] == 1 and stats['running'] == 0
+
@@ -0,0 +1,93 @@
+"""
+异步数据库访问层测试
+查询在专用线程池中执行，事务失败整体回滚，关闭后可以重新使用
+"""
+
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def async_db(tmp_path):
+    from app.core.async_database import AsyncDatabase
+
+    db = AsyncDatabase(db_path=str(tmp_path / 'async.db'), max_workers=2)
+    asyncio.run(db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)"))
+    yield db
+    db.close()
+
+
+def _insert(conn, *names):
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [(name,) for name in names])
+    return threading.current_thread().name
+
+
+def test_queries_run_on_pool_threads(async_db):
+    async def _work():
+        thread_name = await async_db.run(_insert, 'a', 'b')
+        rows = await async_db.fetch_all("SELECT id, name FROM items ORDER BY id")
+        row = await async_db.fetch_one("SELECT name FROM items WHERE id = ?", (2,))
+        missing = await async_db.fetch_one("SELECT name FROM items WHERE id = ?", (99,))
+        updated = await async_db.execute("UPDATE items SET name = name || '!'")
+        return thread_name, rows, row, missing, updated
+
+    thread_name, rows, row, missing, updated = asyncio.run(_work())
+
+    assert thread_name.startswith('async-db')
+    assert [tuple(r) for r in rows] == [(1, 'a'), (2, 'b')]
+    assert row['name'] == 'b'
+    assert missing is None
+    assert updated == 2
+
+
+def test_transaction_rolls_back_on_error(async_db):
+    def _insert_then_fail(conn):
+        _insert(conn, 'kept?')
+        _insert(conn, 'dup', 'dup')
+
+    async def _work():
+        with pytest.raises(sqlite3.IntegrityError):
+            await async_db.run_in_transaction(_insert_then_fail)
+        await async_db.run_in_transaction(_insert, 'committed')
+        return await async_db.fetch_all("SELECT name FROM items")
+
+    assert [row['name'] for row in asyncio.run(_work())] == ['committed']
+
+
+def test_concurrent_transactions_are_isolated(async_db):
+    # 两个事务分别在各自的线程和连接上执行，一个回滚不影响另一个
+    both_started = threading.Barrier(2, timeout=5)
+
+    def _commit(conn):
+        _insert(conn, 'ok')
+        both_started.wait()
+
+    def _rollback(conn):
+        both_started.wait()
+        raise RuntimeError('回滚')
+
+    async def _work():
+        results = await asyncio.gather(
+            async_db.run_in_transaction(_commit),
+            async_db.run_in_transaction(_rollback),
+            return_exceptions=True
+        )
+        return results, await async_db.fetch_all("SELECT name FROM items")
+
+    results, rows = asyncio.run(_work())
+
+    assert results[0] is None
+    assert isinstance(results[1], RuntimeError)
+    assert [row['name'] for row in rows] == ['ok']
+
+
+def test_reusable_after_close(async_db):
+    asyncio.run(async_db.run(_insert, 'before'))
+    async_db.close()
+
+    rows = asyncio.run(async_db.fetch_all("SELECT name FROM items"))
+
+    assert [row['name'] for row in rows] == ['before']
@@ -0,0 +1,74 @@
+"""
+自动拉取调度测试
+跳过的未到期订阅源不计入成功数和总数，没有订阅源需要拉取时不消耗每日配额
+"""
+
+import sqlite3
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+USER_ID = 7
+SUBSCRIPTIONS = {71: '/auto/a', 72: '/auto/b', 73: '/auto/c'}
+
+
+@pytest.fixture(scope='module')
+def scheduler(add_subscriptions):
+    add_subscriptions(USER_ID, SUBSCRIPTIONS)
+    with sqlite3.connect('data/rss_subscriber.db') as conn:
+        conn.execute("INSERT INTO user_fetch_configs (user_id, auto_fetch_enabled) VALUES (?, 1)", (USER_ID,))
+
+    from app.services.auto_fetch_scheduler import AutoFetchScheduler
+
+    return AutoFetchScheduler('data/rss_subscriber.db')
+
+
+@pytest.fixture
+def fetched(scheduler, monkeypatch):
+    """替换拉取引擎：每个请求的订阅源都拉取成功，记录每次请求的批次"""
+    batches = []
+
+    def _run_users(batch):
+        batches.append(batch)
+        return {user_id: SimpleNamespace(success_count=len(subs)) for user_id, subs in batch.items()}
+
+    monkeypatch.setattr(scheduler, 'fetch_engine', SimpleNamespace(run_users=_run_users))
+    return batches
+
+
+def _run_task(scheduler, monkeypatch, task_key, not_due):
+    from app.services.auto_fetch_scheduler import FetchTask
+
+    monkeypatch.setattr(scheduler.poll_schedule, 'get_not_due_subscriptions', lambda subscription_ids: set(not_due))
+    assert scheduler._save_task(FetchTask(user_id=USER_ID, task_type='auto', task_key=task_key, scheduled_at=datetime.now()))
+    scheduler._execute_batch_fetch([task_key])
+    return scheduler._get_task(task_key)
+
+
+def _used_quota(scheduler):
+    return scheduler.limit_service.get_user_quota(USER_ID).current_count
+
+
+def test_skipped_feeds_are_not_counted_as_fetched(scheduler, fetched, monkeypatch):
+    from app.services.auto_fetch_scheduler import TaskStatus
+
+    used = _used_quota(scheduler)
+    task = _run_task(scheduler, monkeypatch, 'auto_7_partial', not_due={72})
+
+    assert fetched == [{USER_ID: [(71, '/auto/a'), (73, '/auto/c')]}]
+    assert task.status == TaskStatus.SUCCESS
+    assert (task.success_count, task.total_count) == (2, 2)
+    assert _used_quota(scheduler) == used + 1
+
+
+def test_all_skipped_does_not_consume_quota(scheduler, fetched, monkeypatch):
+    from app.services.auto_fetch_scheduler import TaskStatus
+
+    used = _used_quota(scheduler)
+    task = _run_task(scheduler, monkeypatch, 'auto_7_skipped', not_due=SUBSCRIPTIONS)
+
+    assert fetched == []
+    assert task.status == TaskStatus.CANCELLED
+    assert (task.success_count, task.total_count) == (0, 0)
+    assert _used_quota(scheduler) == used
@@ -0,0 +1,132 @@
+"""
+过期内容清理器测试
+分块删除过期关系和孤立内容（连同媒体项），仍被其他关系引用的内容保留，向量删除失败时留到后续重试
+"""
+
+import pytest
+
+USER_ID = 3
+
+
+@pytest.fixture(scope='module')
+def services(add_subscriptions):
+    add_subscriptions(USER_ID, {31: '/reaper/a', 32: '/reaper/b'})
+
+    from app.core.database_manager import get_db_transaction
+    from app.services.shared_content_service import SharedContentService
+    from app.services.expiry_reaper import ExpiryReaper
+    from app.services.ai_service_manager import ai_service_manager
+
+    return {
+        'shared': SharedContentService(),
+        'reaper': ExpiryReaper(chunk_size=2, pause_seconds=0),
+        'ai_service_manager': ai_service_manager,
+        'transaction': get_db_transaction
+    }
+
+
+def _items(*hashes):
+    return {
+        h: {
+            'title': f'内容{h}',
+            'original_link': f'https://example.com/{h}',
+            'published_at': '2026-01-01 00:00:00',
+            'media_items': [{'url': f'https://example.com/{h}.jpg'}] if h == 'reap-1' else []
+        }
+        for h in hashes
+    }
+
+
+def test_reaps_expired_relations_and_orphan_contents(services, monkeypatch):
+    shared, transaction = services['shared'], services['transaction']
+    hashes = [f'reap-{i}' for i in range(1, 6)]
+
+    with transaction() as conn:
+        shared._bulk_ingest(conn, _items(*hashes), 5, subscription_id=31, user_id=USER_ID)
+        shared._bulk_ingest(conn, _items('reap-5'), 1, subscription_id=32, user_id=USER_ID)
+        content_ids = shared._select_ids_by_hash(conn.cursor(), hashes)
+        conn.execute(
+            "UPDATE user_content_relations SET expires_at = '2000-01-01 00:00:00' WHERE subscription_id = 31"
+        )
+
+    # 第一次删除向量失败，失败的ID并入后续批次重试
+    calls = []
+
+    def _delete_content_vectors(ids):
+        calls.append(list(ids))
+        if len(calls) == 1:
+            raise RuntimeError('向量服务暂不可用')
+        return len(ids)
+
+    monkeypatch.setattr(services['ai_service_manager'], 'delete_content_vectors', _delete_content_vectors)
+
+    report = services['reaper'].run_once()
+
+    orphan_ids = {content_ids[h] for h in hashes[:4]}
+    assert report['relations_deleted'] == 5
+    assert report['contents_deleted'] == 4
+    assert report['media_deleted'] == 1
+    assert report['vectors_deleted'] == 4
+    assert report['chunks'] > 3
+    assert not report['interrupted']
+    assert {content_id for call in calls[1:] for content_id in call} == orphan_ids
+    assert services['reaper'].get_stats()['pending_vectors'] == 0
+
+    with transaction() as conn:
+        remaining = shared._select_ids_by_hash(conn.cursor(), hashes)
+        relations = conn.execute(
+            "SELECT subscription_id FROM user_content_relations WHERE user_id = ?", (USER_ID,)
+        ).fetchall()
+        media = conn.execute(
+            "SELECT COUNT(*) FROM shared_content_media_items WHERE content_id = ?", (content_ids['reap-1'],)
+        ).fetchone()[0]
+
+    # 仍被订阅32引用的内容保留
+    assert remaining == {'reap-5': content_ids['reap-5']}
+    assert [row[0] for row in relations] == [32]
+    assert media == 0
+
+    # 再跑一轮没有可清理的内容
+    report = services['reaper'].run_once()
+    assert (report['relations_deleted'], report['contents_deleted']) == (0, 0)
+
+
+def test_expired_relation_counts_until_reaped(services, add_subscriptions):
+    """标签计数在关系被清理器删除时才减少：过期到清理之间仍计入，清理后计数归零并标记缓存失效"""
+    from app.services.content_tag_index_service import content_tag_index_service
+    from app.services.tag_cache_service import TagCacheService
+
+    user_id = 4
+    add_subscriptions(user_id, {41: '/reaper/tags'})
+    shared, transaction = services['shared'], services['transaction']
+    tag_cache = TagCacheService()
+
+    def _counts():
+        with transaction() as conn:
+            tags = conn.execute("""
+                SELECT c.recent_7d + c.recent_30d + c.older
+                FROM user_tag_counters c JOIN tag_dictionary d ON d.id = c.tag_id
+                WHERE c.user_id = ? AND d.name = '清理'
+            """, (user_id,)).fetchone()
+            dirty = conn.execute(
+                "SELECT COUNT(*) FROM tag_cache_dirty_users WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+            content_count = tag_cache._get_user_content_count(conn.cursor(), user_id)
+        return (tags[0] if tags else 0), dirty, content_count
+
+    with transaction() as conn:
+        shared._bulk_ingest(conn, _items('reap-tagged'), 1, subscription_id=41, user_id=user_id)
+        content_id = shared._select_ids_by_hash(conn.cursor(), ['reap-tagged'])['reap-tagged']
+        content_tag_index_service.index_content_tags(conn, content_id, ['清理'], None)
+        conn.execute(
+            "UPDATE user_content_relations SET expires_at = '2000-01-01 00:00:00' WHERE user_id = ?", (user_id,)
+        )
+    tag_cache.update_user_tags_cache(user_id)
+
+    # 已过期但尚未清理：计数和内容数同一口径，仍然计入
+    assert _counts() == (1, 0, 1)
+
+    services['reaper'].run_once()
+
+    assert _counts() == (0, 1, 0)
+    assert tag_cache.update_user_tags_cache(user_id) == []
@@ -0,0 +1,118 @@
+"""
+Feed熔断测试
+closed -> open -> half_open -> closed 的状态转换、探测名额的独占和指数退避，
+以及请求内重试只在探测请求和即将熔断时关闭
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+T0 = datetime(2026, 4, 1, 9, 0, 0)
+
+
+@pytest.fixture(scope='module')
+def health():
+    from app.services.feed_health_service import FeedHealthService
+
+    return FeedHealthService(
+        failure_threshold=3, base_backoff_minutes=5, max_backoff_minutes=60, probe_timeout_minutes=5
+    )
+
+
+def _state(feed_url):
+    from app.core.database_manager import get_db_connection
+
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT state, consecutive_failures FROM feed_health WHERE feed_url = ?", (feed_url,)
+        ).fetchone()
+    return tuple(row) if row else None
+
+
+def test_breaker_state_transitions(health):
+    from app.services.feed_health_service import BreakerState
+
+    feed = 'http://rsshub/health/flaky'
+    minutes = lambda m: T0 + timedelta(minutes=m)
+
+    permit = health.allow_request(feed, now=T0)
+    assert (permit.allowed, permit.probe, permit.consecutive_failures) == (True, False, 0)
+
+    # 未达到阈值：仍为closed，照常请求
+    assert health.record_failure(feed, 'ReadTimeout', '超时', now=T0) is None
+    assert health.record_failure(feed, 'ReadTimeout', '超时', now=T0) is None
+    permit = health.allow_request(feed, now=T0)
+    assert (permit.allowed, permit.probe, permit.consecutive_failures) == (True, False, 2)
+    assert _state(feed) == (BreakerState.CLOSED, 2)
+
+    # 第三次失败熔断，退避期内跳过
+    assert health.record_failure(feed, 'ReadTimeout', '超时', now=T0) == minutes(5)
+    assert _state(feed) == (BreakerState.OPEN, 3)
+    permit = health.allow_request(feed, now=minutes(1))
+    assert not permit.allowed
+    assert permit.next_allowed_at == minutes(5)
+    assert permit.last_error_class == 'ReadTimeout'
+
+    # 退避到期：只放行一个探测请求
+    permit = health.allow_request(feed, now=minutes(5))
+    assert (permit.allowed, permit.probe) == (True, True)
+    assert _state(feed) == (BreakerState.HALF_OPEN, 3)
+    assert not health.allow_request(feed, now=minutes(5)).allowed
+
+    # 探测失败：重新熔断，退避翻倍
+    assert health.record_failure(feed, 'http_502', '网关错误', now=minutes(6)) == minutes(16)
+    assert _state(feed) == (BreakerState.OPEN, 4)
+    assert not health.allow_request(feed, now=minutes(15)).allowed
+
+    # 探测请求超时未回报结果时可以再次探测
+    assert health.allow_request(feed, now=minutes(16)).probe
+    assert not health.allow_request(feed, now=minutes(20)).allowed
+    assert health.allow_request(feed, now=minutes(21)).probe
+
+    # 探测成功：恢复closed，计数清零
+    health.record_success(feed, now=minutes(22))
+    assert _state(feed) == (BreakerState.CLOSED, 0)
+    permit = health.allow_request(feed, now=minutes(22))
+    assert (permit.allowed, permit.probe, permit.consecutive_failures) == (True, False, 0)
+
+    stats = health.get_stats()
+    assert stats['by_state'].get(BreakerState.CLOSED, 0) >= 1
+
+
+def test_backoff_is_capped(health):
+    assert health.backoff_seconds(3) == 5 * 60
+    assert health.backoff_seconds(4) == 10 * 60
+    assert health.backoff_seconds(100) == 60 * 60
+
+
+@pytest.mark.parametrize('failures, days_ago, expected_max_retries', [
+    (0, 0, None),   # 健康Feed：使用默认重试
+    (1, 0, None),   # 偶发一次失败：仍保留重试
+    (2, 0, 0),      # 再失败一次就熔断：不重试
+    (3, 1, 0),      # 退避到期的探测请求：不重试
+])
+def test_in_request_retries_follow_breaker(monkeypatch, failures, days_ago, expected_max_retries):
+    from app.services import rss_content_service
+    from app.services.feed_health_service import feed_health_service
+    from app.services.rss_fetch_engine import FeedFetchResult
+
+    feed = f'http://rsshub/health/retries-{failures}'
+    failed_at = datetime.now() - timedelta(days=days_ago)
+    for _ in range(failures):
+        feed_health_service.record_failure(feed, 'ReadTimeout', '超时', now=failed_at)
+
+    calls = []
+
+    async def _fetch(url, conditional_headers=None, max_retries=None):
+        calls.append(max_retries)
+        return FeedFetchResult(url=url, error='超时', error_class='ReadTimeout')
+
+    monkeypatch.setattr(rss_content_service.fetch_engine, 'fetch', _fetch)
+
+    snapshot = asyncio.run(rss_content_service._load_feed_snapshot(feed, None, True))
+
+    assert calls == [expected_max_retries]
+    assert snapshot.error and not snapshot.circuit_open
+    assert _state(feed)[1] == failures + 1
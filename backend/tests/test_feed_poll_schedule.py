@@ -0,0 +1,114 @@
+"""
+Feed自适应轮询调度测试
+轮询间隔跟随发布间隔的EWMA，Feed安静或没有发布时间时放宽，拉取失败保持当前间隔，到期领取不会重复
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+USER_ID = 5
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture(scope='module')
+def schedule():
+    from app.services.feed_poll_schedule_service import FeedPollScheduleService
+
+    return FeedPollScheduleService(min_interval_minutes=15, max_interval_minutes=12 * 60, default_interval_minutes=60)
+
+
+def _row(feed_url):
+    from app.core.database_manager import get_db_connection
+
+    with get_db_connection() as conn:
+        row = conn.execute("""
+            SELECT ewma_interval, poll_interval, last_item_at, next_poll_at, unchanged_polls
+            FROM feed_poll_schedule WHERE feed_url = ?
+        """, (feed_url,)).fetchone()
+    return dict(zip(('ewma', 'poll_interval', 'last_item_at', 'next_poll_at', 'unchanged_polls'), row))
+
+
+def _hourly(count, end):
+    return [end - timedelta(hours=i) for i in range(count)]
+
+
+def test_interval_follows_publish_cadence(schedule):
+    feed = 'http://rsshub/poll/hourly'
+
+    # 每小时发布一条：轮询间隔为发布间隔的一半
+    assert schedule.record_poll(feed, _hourly(6, NOW - timedelta(minutes=10)), now=NOW) == 1800
+    row = _row(feed)
+    assert row['ewma'] == pytest.approx(3600)
+    assert datetime.fromisoformat(row['next_poll_at']) == NOW + timedelta(seconds=1800)
+
+    # 未变化且静默时长已超过发布间隔：按静默时长放宽
+    later = NOW + timedelta(hours=5)
+    assert schedule.record_poll(feed, None, now=later) == pytest.approx((5 * 3600 + 600) / 2)
+    assert _row(feed)['unchanged_polls'] == 1
+
+    # 只有比已知最新条目更新的发布时间计入节奏，未来时间被忽略
+    newer = NOW + timedelta(hours=5, minutes=50)
+    interval = schedule.record_poll(
+        feed, [NOW - timedelta(minutes=10), newer, later + timedelta(days=1)], now=later + timedelta(hours=1)
+    )
+    row = _row(feed)
+    assert datetime.fromisoformat(row['last_item_at']) == newer
+    assert row['unchanged_polls'] == 0
+    assert interval == pytest.approx(row['ewma'] / 2)
+
+
+def test_interval_is_clamped(schedule):
+    busy = 'http://rsshub/poll/busy'
+    minutes = [NOW - timedelta(minutes=i) for i in range(10)]
+    assert schedule.record_poll(busy, minutes, now=NOW) == 15 * 60
+
+    quiet = 'http://rsshub/poll/quiet'
+    weekly = [NOW - timedelta(days=7 * i) for i in range(1, 4)]
+    assert schedule.record_poll(quiet, weekly, now=NOW) == 12 * 3600
+
+
+def test_feed_without_dates_uses_default_interval(schedule):
+    feed = 'http://rsshub/poll/dateless'
+
+    # 没有真实发布时间的Feed不能被当成高频Feed
+    assert schedule.record_poll(feed, [], now=NOW) == 3600
+    assert schedule.record_poll(feed, [], now=NOW + timedelta(hours=1)) == 3600
+    assert _row(feed)['ewma'] is None
+
+
+def test_failure_keeps_current_interval(schedule):
+    feed = 'http://rsshub/poll/failing'
+    schedule.record_poll(feed, _hourly(4, NOW), now=NOW)
+
+    failed_at = NOW + timedelta(minutes=40)
+    schedule.record_failure(feed, now=failed_at)
+    assert datetime.fromisoformat(_row(feed)['next_poll_at']) == failed_at + timedelta(seconds=1800)
+
+    # 没有计划的Feed失败后按默认间隔重试
+    schedule.record_failure('http://rsshub/poll/unknown', now=failed_at)
+    assert _row('http://rsshub/poll/unknown')['poll_interval'] == 3600
+
+
+def test_claim_due_subscriptions_once(schedule, add_subscriptions):
+    due, not_due = 'http://rsshub/poll/claim-due', 'http://rsshub/poll/claim-later'
+    add_subscriptions(USER_ID, {51: '/claim/due', 52: '/claim/later', 53: '/claim/new'})
+    with sqlite3.connect('data/rss_subscriber.db') as conn:
+        conn.execute("INSERT INTO user_fetch_configs (user_id, auto_fetch_enabled) VALUES (?, 1)", (USER_ID,))
+        conn.executemany(
+            "INSERT INTO subscription_feed_state (subscription_id, feed_url, body_hash) VALUES (?, ?, '')",
+            [(51, due), (52, not_due)]
+        )
+
+    schedule.record_poll(due, _hourly(4, NOW), now=NOW)
+    schedule.record_poll(not_due, _hourly(4, NOW), now=NOW + timedelta(hours=2))
+
+    check_at = NOW + timedelta(hours=1)
+    # 从未入库过的订阅（53）没有Feed映射，视为到期
+    assert schedule.get_not_due_subscriptions([51, 52, 53], now=check_at) == {52}
+
+    assert schedule.claim_due_subscriptions(now=NOW + timedelta(days=30)).get(USER_ID) == [
+        (51, '/claim/due'), (52, '/claim/later')
+    ]
+    assert schedule.claim_due_subscriptions(now=NOW + timedelta(days=30, minutes=1)).get(USER_ID) is None
@@ -0,0 +1,130 @@
+"""
+内容列表键集分页测试
+大量发布时间相同、同一内容出现在多个订阅中的关系，逐页翻完既不重复也不遗漏；无效游标返回400
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+USER_ID = 6
+SUBSCRIPTION_IDS = (61, 62, 63)
+
+
+@pytest.fixture(scope='module')
+def relations(add_subscriptions):
+    """25条内容，其中20条发布时间相同，每条都出现在三个订阅中"""
+    add_subscriptions(USER_ID, {subscription_id: f'/keyset/{subscription_id}' for subscription_id in SUBSCRIPTION_IDS})
+
+    from app.core.database_manager import get_db_transaction
+    from app.services.shared_content_service import SharedContentService
+
+    shared = SharedContentService()
+    items = {
+        f'keyset-{i}': {
+            'title': f'内容{i}',
+            'original_link': f'https://example.com/keyset/{i}',
+            'published_at': '2026-02-01 08:00:00' if i < 20 else f'2026-02-0{i - 18} 08:00:00'
+        }
+        for i in range(25)
+    }
+    with get_db_transaction() as conn:
+        for subscription_id in SUBSCRIPTION_IDS:
+            shared._bulk_ingest(conn, items, len(items), subscription_id=subscription_id, user_id=USER_ID)
+        rows = conn.execute("""
+            SELECT published_at, content_id, subscription_id FROM user_content_relations
+            WHERE user_id = ?
+            ORDER BY published_at DESC, content_id DESC, subscription_id DESC
+        """, (USER_ID,)).fetchall()
+
+    return [(row[1], row[2]) for row in rows]
+
+
+def _collect(fetch_page):
+    """翻完所有页，返回按页顺序的(content_id, subscription_id)"""
+    seen, cursor, pages = [], None, 0
+    while True:
+        keys, cursor = asyncio.run(fetch_page(cursor))
+        seen.extend(keys)
+        pages += 1
+        if not cursor:
+            return seen, pages
+        assert pages < 100, "游标没有前进"
+
+
+@pytest.mark.parametrize('limit', [1, 7, 20, 75])
+def test_shared_content_pages_cover_every_relation_once(relations, limit):
+    from app.services.shared_content_service import SharedContentService
+
+    shared = SharedContentService()
+
+    async def _fetch_page(cursor):
+        page = await shared.get_user_contents_page(USER_ID, limit=limit, cursor=cursor)
+        assert page['has_more'] == bool(page['next_cursor'])
+        return [(c['content_id'], c['subscription_id']) for c in page['contents']], page['next_cursor']
+
+    seen, pages = _collect(_fetch_page)
+
+    assert len(relations) == 75
+    assert seen == relations
+    assert pages == -(-len(relations) // limit)
+
+
+@pytest.mark.parametrize('limit', [4, 25])
+def test_user_content_endpoint_pages_cover_every_relation_once(relations, limit):
+    from app.api.api_v1.endpoints.user_content import get_user_content
+
+    async def _fetch_page(cursor):
+        response = await get_user_content(user_id=USER_ID, tag=None, page=1, limit=limit, cursor=cursor)
+        content = response.content
+        assert content.has_next == bool(content.next_cursor)
+        return [(item.content_id, item.subscription_id) for item in content.items], content.next_cursor
+
+    seen, _ = _collect(_fetch_page)
+
+    assert seen == relations
+
+
+def _tampered_cursors():
+    from app.core.pagination import encode_cursor
+
+    valid = encode_cursor('2026-02-01 08:00:00', 10, 62)
+    return [
+        'not-a-cursor!!',
+        valid[:len(valid) // 2],      # 截断
+        'WyIyMDI2IiwiYWJjIiwxXQ',     # ["2026","abc",1]：内容ID不是整数
+        'WyIyMDI2IiwxXQ',             # ["2026",1]：字段数量不对
+        'aGVsbG8',                    # 不是JSON
+    ]
+
+
+def test_decode_cursor_round_trip_and_rejects_tampering():
+    from app.core.pagination import decode_cursor, encode_cursor
+
+    assert decode_cursor(None) is None
+    assert decode_cursor('') is None
+    assert decode_cursor(encode_cursor('2026-02-01 08:00:00', 10, 62)) == ('2026-02-01 08:00:00', 10, 62)
+
+    for cursor in _tampered_cursors():
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+@pytest.mark.parametrize('cursor', _tampered_cursors())
+def test_tampered_cursor_returns_400(relations, cursor):
+    from app.api.api_v1.endpoints.user_content import get_user_content
+    from app.api.api_v1.endpoints.user_content_api import get_user_contents
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_user_content(user_id=USER_ID, tag=None, page=1, limit=20, cursor=cursor))
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_user_contents(
+            user_id=USER_ID, platform=None, subscription_id=None, is_read=None, is_favorited=None,
+            content_type=None, limit=20, offset=0, cursor=cursor,
+            current_user=SimpleNamespace(user_id=USER_ID)
+        ))
+    assert error.value.status_code == 400
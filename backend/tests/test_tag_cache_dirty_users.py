@@ -0,0 +1,73 @@
+"""
+标签缓存脏标记触发器回归测试
+用户已被标记为脏时，再入库已打标签的内容（计数UPSERT链触发脏标记）不能因唯一约束失败
+"""
+
+import pytest
+
+USER_ID = 1
+
+
+@pytest.fixture(scope='module')
+def services(add_subscriptions):
+    add_subscriptions(USER_ID, {1: '/weibo/user/1', 2: '/weibo/user/2'})
+
+    from app.core.database_manager import get_db_transaction
+    from app.services.shared_content_service import SharedContentService
+    from app.services.content_tag_index_service import content_tag_index_service
+    from app.services.user_tag_counter_service import UserTagCounterService
+    from app.services.tag_cache_service import TagCacheService
+
+    # 关系表的published_at列就绪后再建计数和脏标记触发器
+    shared = SharedContentService()
+    UserTagCounterService()
+    tag_cache = TagCacheService()
+
+    return {
+        'shared': shared,
+        'tag_index': content_tag_index_service,
+        'tag_cache': tag_cache,
+        'transaction': get_db_transaction
+    }
+
+
+def _items(*hashes):
+    return {
+        h: {'title': f'内容{h}', 'original_link': f'https://example.com/{h}', 'published_at': '2026-01-01 00:00:00'}
+        for h in hashes
+    }
+
+
+def _scalar(transaction, sql, params=()):
+    with transaction() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def test_ingest_tagged_items_for_dirty_user(services):
+    shared, transaction = services['shared'], services['transaction']
+
+    # 订阅1入库两条内容并写入AI标签，用户被标记为脏
+    with transaction() as conn:
+        shared._bulk_ingest(conn, _items('tag-h1', 'tag-h2'), 2, subscription_id=1, user_id=USER_ID)
+        content_ids = shared._select_ids_by_hash(conn.cursor(), ['tag-h1', 'tag-h2']).values()
+        for content_id in content_ids:
+            services['tag_index'].index_content_tags(conn, content_id, ['科技', 'AI'], '科技')
+    assert _scalar(transaction, "SELECT COUNT(*) FROM tag_cache_dirty_users WHERE user_id = ?", (USER_ID,)) == 1
+
+    # 订阅2再入库同样两条已打标签的内容：新关系触发计数UPSERT和脏标记
+    with transaction() as conn:
+        result = shared._bulk_ingest(conn, _items('tag-h1', 'tag-h2'), 2, subscription_id=2, user_id=USER_ID)
+
+    assert result['reused_content'] == 2
+    assert _scalar(transaction, "SELECT COUNT(*) FROM user_content_relations WHERE user_id = ?", (USER_ID,)) == 4
+    assert _scalar(transaction, "SELECT COUNT(*) FROM tag_cache_dirty_users WHERE user_id = ?", (USER_ID,)) == 1
+    assert _scalar(transaction, """
+        SELECT c.recent_7d + c.recent_30d + c.older
+        FROM user_tag_counters c JOIN tag_dictionary d ON d.id = c.tag_id
+        WHERE c.user_id = ? AND d.name = 'AI'
+    """, (USER_ID,)) == 4
+
+    # 刷新缓存后脏标记清除，标签来自计数
+    tags = services['tag_cache'].update_user_tags_cache(USER_ID)
+    assert {tag['name'] for tag in tags} == {'科技', 'AI'}
+    assert _scalar(transaction, "SELECT COUNT(*) FROM tag_cache_dirty_users WHERE user_id = ?", (USER_ID,)) == 0
@@ -0,0 +1,112 @@
+"""
+SQLite写队列测试
+同组中失败的写操作只回滚自己的SAVEPOINT，写操作内部再次提交时在写线程的当前事务中直接执行
+"""
+
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'write_queue.db'
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+    return path
+
+
+@pytest.fixture
+def write_queue(db_path):
+    from app.core.write_queue import WriteQueue
+
+    queue = WriteQueue(db_path=str(db_path), max_batch_size=16, max_latency_ms=200)
+    yield queue
+    queue.stop()
+
+
+def _names(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT name FROM items")}
+
+
+def _insert(conn, name):
+    return conn.execute("INSERT INTO items (name) VALUES (?)", (name,)).lastrowid
+
+
+def test_failing_operation_rolls_back_only_its_savepoint(write_queue, db_path):
+    # 第一个操作占住写线程，它执行期间提交的三个操作会被收集到同一组
+    started, release = threading.Event(), threading.Event()
+
+    def _block(conn):
+        started.set()
+        release.wait(5)
+        return _insert(conn, 'blocker')
+
+    blocker = write_queue.submit(_block)
+    assert started.wait(5)
+
+    def _insert_then_fail(conn):
+        _insert(conn, 'partial')
+        _insert(conn, 'b')  # 与同组前一个操作冲突
+
+    futures = [
+        write_queue.submit(_insert, 'b'),
+        write_queue.submit(_insert_then_fail),
+        write_queue.submit(_insert, 'd')
+    ]
+    release.set()
+
+    blocker.result(timeout=5)
+    futures[0].result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(timeout=5)
+    futures[2].result(timeout=5)
+
+    assert _names(db_path) == {'blocker', 'b', 'd'}
+    stats = write_queue.get_stats()
+    assert stats['commits'] == 2
+    assert stats['max_group_size'] == 3
+    assert stats['failed_operations'] == 1
+    assert stats['failed_commits'] == 0
+
+
+def test_nested_submit_runs_inline_on_writer_thread(write_queue, db_path):
+    def _outer(conn):
+        inner = write_queue.run_sync(
+            lambda inner_conn: (inner_conn is conn, threading.current_thread().name, _insert(inner_conn, 'inner'))
+        )
+        _insert(conn, 'outer')
+        return inner
+
+    # 不内联执行时写线程会等待自己，这里用超时让测试失败而不是挂起
+    same_conn, thread_name, _ = write_queue.submit(_outer).result(timeout=5)
+
+    assert same_conn
+    assert thread_name == 'sqlite-writer'
+    assert _names(db_path) == {'inner', 'outer'}
+
+
+def test_nested_submit_shares_outer_savepoint(write_queue, db_path):
+    def _outer(conn):
+        write_queue.run_sync(_insert, 'nested')
+        raise RuntimeError('外层操作失败')
+
+    with pytest.raises(RuntimeError):
+        write_queue.submit(_outer).result(timeout=5)
+
+    # 内层写入属于外层操作的SAVEPOINT，随外层一起回滚
+    assert _names(db_path) == set()
+
+
+def test_async_callers_are_group_committed(write_queue, db_path):
+    async def _run_all():
+        return await asyncio.gather(*(write_queue.run(_insert, f'item{i}') for i in range(20)))
+
+    ids = asyncio.run(_run_all())
+
+    assert sorted(ids) == list(range(1, 21))
+    assert len(_names(db_path)) == 20
+    assert write_queue.get_stats()['commits'] < 20